@@ -5,3 +5,8 @@ class CustomersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'customers'
 
+    def ready(self):
+        from helpdesk_system.cache import register_model_invalidation
+        from .models import Customer
+        register_model_invalidation(Customer)
+        from . import signals  # noqa: F401
@@ -0,0 +1,61 @@
+# Generated by Django 5.0.8 on 2026-10-19 12:39
+
+from django.db import migrations, models
+
+BACKFILL_SQL = """
+UPDATE customers AS c SET
+    total_tickets = s.total_tickets,
+    open_tickets = s.open_tickets,
+    last_ticket_at = s.last_ticket_at,
+    resolved_tickets = s.resolved_tickets,
+    resolution_seconds_total = s.resolution_seconds_total
+FROM (
+    SELECT
+        t.customer_id,
+        COUNT(*) AS total_tickets,
+        COUNT(*) FILTER (WHERE t.status IN ('New', 'Open', 'In Progress', 'Reopened')) AS open_tickets,
+        MAX(t.created_at) AS last_ticket_at,
+        COUNT(t.resolved_at) AS resolved_tickets,
+        COALESCE(SUM(EXTRACT(EPOCH FROM t.resolved_at - t.created_at)), 0)::bigint AS resolution_seconds_total
+    FROM tickets AS t
+    GROUP BY t.customer_id
+) AS s
+WHERE c.id = s.customer_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0001_initial'),
+        ('tickets', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='last_ticket_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='open_tickets',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='resolution_seconds_total',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='resolved_tickets',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='total_tickets',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.8 on 2026-10-19 12:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def link_customers_to_users(apps, schema_editor):
+    """Link each customer to the non-staff user with the same email (oldest account wins)"""
+    Customer = apps.get_model('customers', 'Customer')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    customers_table = schema_editor.quote_name(Customer._meta.db_table)
+    users_table = schema_editor.quote_name(User._meta.db_table)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {customers_table} AS c SET user_id = u.id
+            FROM (
+                SELECT DISTINCT ON (email) id, email
+                FROM {users_table}
+                WHERE email <> '' AND NOT is_staff
+                ORDER BY email, id
+            ) AS u
+            WHERE c.user_id IS NULL AND c.email = u.email
+            """
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_customer_ticket_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='user',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='customer_profile', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(link_customers_to_users, migrations.RunPython.noop),
+    ]
@@ -9,12 +9,23 @@ class Customer(models.Model):
     Tenant Schema Model - Customer information for each tenant
     """
     email = models.EmailField(unique=True)
+    # Portal account for this customer; queries resolve the customer through this unique index
+    user = models.OneToOneField(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='customer_profile'
+    )
     name = models.CharField(max_length=200)
     phone = models.CharField(max_length=20, blank=True)
     company = models.CharField(max_length=200, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalized ticket aggregates, maintained by customers.services.CustomerStatsService
+    total_tickets = models.PositiveIntegerField(default=0)
+    open_tickets = models.PositiveIntegerField(default=0)
+    last_ticket_at = models.DateTimeField(null=True, blank=True)
+    resolved_tickets = models.PositiveIntegerField(default=0)
+    resolution_seconds_total = models.BigIntegerField(default=0)
+
     class Meta:
         db_table = 'customers'
         ordering = ['-created_at']
@@ -22,3 +33,10 @@ class Customer(models.Model):
     def __str__(self):
         return f"{self.name} ({self.email})"
 
+    @property
+    def avg_resolution_seconds(self):
+        """Average time from creation to resolution over resolved tickets"""
+        if not self.resolved_tickets:
+            return None
+        return self.resolution_seconds_total // self.resolved_tickets
+
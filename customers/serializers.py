@@ -1,26 +1,26 @@
 from rest_framework import serializers
+from helpdesk_system.sparse_fields import DynamicFieldsMixin
 from .models import Customer
 
 
-class CustomerSerializer(serializers.ModelSerializer):
-    ticket_count = serializers.SerializerMethodField()
+class CustomerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    # Served from the denormalized aggregates, no per-row ticket queries
+    ticket_count = serializers.IntegerField(source='total_tickets', read_only=True)
+    avg_resolution_seconds = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Customer
         fields = [
             'id', 'email', 'name', 'phone', 'company',
-            'ticket_count', 'created_at', 'updated_at'
+            'ticket_count', 'open_tickets', 'last_ticket_at', 'avg_resolution_seconds',
+            'created_at', 'updated_at'
         ]
-        read_only_fields = ('created_at', 'updated_at')
-    
-    def get_ticket_count(self, obj):
-        """Get number of tickets for this customer"""
-        return obj.tickets.count()
+        read_only_fields = ('created_at', 'updated_at', 'open_tickets', 'last_ticket_at')
 
 
-class CustomerListSerializer(serializers.ModelSerializer):
+class CustomerListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Lightweight serializer for list views"""
     class Meta:
         model = Customer
-        fields = ['id', 'name', 'email', 'company', 'created_at']
+        fields = ['id', 'name', 'email', 'company', 'total_tickets', 'open_tickets', 'last_ticket_at', 'created_at']
 
@@ -0,0 +1,165 @@
+"""
+Business logic for customer ticket aggregates
+"""
+from datetime import timedelta
+
+from django.db import transaction
+
+from helpdesk_system.cache import invalidate_models
+from helpdesk_system.sharding import tenant_connection, tenant_db_alias
+from .models import Customer
+
+OPEN_STATUSES = ('New', 'Open', 'In Progress', 'Reopened')
+
+AGGREGATE_FIELDS = (
+    'total_tickets', 'open_tickets', 'last_ticket_at', 'resolved_tickets', 'resolution_seconds_total'
+)
+
+# Recompute aggregates for every customer in one statement. Archived tickets
+# still count. Only rows whose values actually changed are written.
+_REFRESH_SQL = """
+UPDATE customers AS c SET
+    total_tickets = s.total_tickets,
+    open_tickets = s.open_tickets,
+    last_ticket_at = s.last_ticket_at,
+    resolved_tickets = s.resolved_tickets,
+    resolution_seconds_total = s.resolution_seconds_total
+FROM (
+    SELECT
+        cu.id AS customer_id,
+        COUNT(t.id) AS total_tickets,
+        COUNT(t.id) FILTER (WHERE t.status = ANY(%(open_statuses)s)) AS open_tickets,
+        MAX(t.created_at) AS last_ticket_at,
+        COUNT(t.resolved_at) AS resolved_tickets,
+        COALESCE(SUM(FLOOR(EXTRACT(EPOCH FROM t.resolved_at - t.created_at))), 0)::bigint AS resolution_seconds_total
+    FROM customers AS cu
+    LEFT JOIN (
+        SELECT id, customer_id, status, created_at, resolved_at FROM tickets
+        UNION ALL
+        SELECT id, customer_id, status, created_at, resolved_at FROM tickets_archive
+    ) AS t ON t.customer_id = cu.id
+    GROUP BY cu.id
+) AS s
+WHERE c.id = s.customer_id
+  AND (c.total_tickets, c.open_tickets, c.last_ticket_at, c.resolved_tickets, c.resolution_seconds_total)
+      IS DISTINCT FROM
+      (s.total_tickets, s.open_tickets, s.last_ticket_at, s.resolved_tickets, s.resolution_seconds_total)
+RETURNING c.id
+"""
+
+# Shift the aggregates of several customers by per-customer deltas in one
+# statement, locking the rows in id order. last_ticket_at only moves forward; a
+# removed ticket leaves it for reconcile() to correct.
+_APPLY_SQL = """
+UPDATE customers AS c SET
+    total_tickets = GREATEST(c.total_tickets + d.total_tickets, 0),
+    open_tickets = GREATEST(c.open_tickets + d.open_tickets, 0),
+    last_ticket_at = GREATEST(c.last_ticket_at, d.last_ticket_at),
+    resolved_tickets = GREATEST(c.resolved_tickets + d.resolved_tickets, 0),
+    resolution_seconds_total = c.resolution_seconds_total + d.resolution_seconds_total
+FROM unnest(
+    %(ids)s::bigint[], %(total)s::integer[], %(open)s::integer[],
+    %(last)s::timestamptz[], %(resolved)s::integer[], %(seconds)s::bigint[]
+) AS d(customer_id, total_tickets, open_tickets, last_ticket_at, resolved_tickets, resolution_seconds_total)
+WHERE c.id = d.customer_id
+  AND c.id IN (SELECT id FROM customers WHERE id = ANY(%(ids)s) ORDER BY id FOR UPDATE)
+"""
+
+
+class CustomerService:
+    """Resolve the Customer row behind a portal user"""
+
+    @staticmethod
+    def get_for_user(user, create: bool = False):
+        """
+        Customer linked to this user. Customers created before the link existed
+        (e.g. by an agent, matched by email) are linked on first use.
+        """
+        customer = Customer.objects.filter(user=user).first()
+        if customer is not None:
+            return customer
+
+        if user.email:
+            linked = Customer.objects.filter(email=user.email, user__isnull=True).update(user=user)
+            if linked:
+                return Customer.objects.get(user=user)
+
+        if create:
+            customer, _ = Customer.objects.get_or_create(
+                email=user.email,
+                defaults={'name': user.get_full_name() or user.username, 'user': user}
+            )
+            return customer
+        return None
+
+    @staticmethod
+    def get_id_for_user(user):
+        customer = CustomerService.get_for_user(user)
+        return customer.id if customer else None
+
+
+class CustomerStatsService:
+    """
+    Keeps Customer ticket aggregates in step with the tickets and tickets_archive tables.
+
+    Ticket writes apply deltas (total_tickets = total_tickets + 1, open and
+    resolved transitions from the old and new status) inside the writer's
+    transaction. The UPDATE reads the committed row under its lock, so
+    concurrent writers add up instead of overwriting each other. Deltas are
+    only as good as the old state the writer knew, so reconcile() recomputes
+    every customer periodically to correct writes that bypass the ORM and
+    the explicit hooks.
+    """
+
+    @staticmethod
+    def apply(changes) -> int:
+        """
+        Shift aggregates by ticket changes, returns the number of customers updated.
+        `changes` yields (old, new) pairs of (customer_id, status, created_at,
+        resolved_at) tuples; old is None for an inserted ticket, new is None for
+        a deleted one.
+        """
+        deltas = {}
+        for old, new in changes:
+            for state, sign in ((old, -1), (new, 1)):
+                if state is None or state[0] is None:
+                    continue
+                customer_id, status, created_at, resolved_at = state
+                delta = deltas.setdefault(customer_id, {'total': 0, 'open': 0, 'last': None, 'resolved': 0, 'seconds': 0})
+                delta['total'] += sign
+                delta['open'] += sign if status in OPEN_STATUSES else 0
+                # last_ticket_at only needs a push when the ticket is new to this customer (or its created_at moved)
+                if sign > 0 and created_at is not None and (old is None or old[0] != customer_id or old[2] != created_at):
+                    delta['last'] = max(delta['last'] or created_at, created_at)
+                if resolved_at is not None:
+                    delta['resolved'] += sign
+                    if created_at is not None:
+                        delta['seconds'] += sign * ((resolved_at - created_at) // timedelta(seconds=1))
+
+        # A change that moves nothing (e.g. a title edit) writes nothing: no row lock, no cache bump
+        deltas = {
+            customer_id: delta for customer_id, delta in sorted(deltas.items())
+            if delta['last'] is not None or any(delta[key] for key in ('total', 'open', 'resolved', 'seconds'))
+        }
+        if not deltas:
+            return 0
+        params = {'ids': list(deltas)}
+        for key in ('total', 'open', 'last', 'resolved', 'seconds'):
+            params[key] = [delta[key] for delta in deltas.values()]
+        with transaction.atomic(using=tenant_db_alias()), tenant_connection().cursor() as cursor:
+            cursor.execute(_APPLY_SQL, params)
+            changed = cursor.rowcount
+        # Raw UPDATE bypasses post_save
+        if changed:
+            invalidate_models(Customer)
+        return changed
+
+    @staticmethod
+    def reconcile() -> int:
+        """Recompute aggregates for every customer of the current tenant, returns the number of rows changed"""
+        with transaction.atomic(using=tenant_db_alias()), tenant_connection().cursor() as cursor:
+            cursor.execute(_REFRESH_SQL, {'open_statuses': list(OPEN_STATUSES)})
+            changed = cursor.rowcount
+        if changed:
+            invalidate_models(Customer)
+        return changed
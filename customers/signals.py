@@ -0,0 +1,35 @@
+"""
+Keep customer aggregates current on ORM ticket writes
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from tickets.models import Ticket
+from .models import Customer
+from .services import CustomerStatsService
+
+
+@receiver(post_save, sender=Ticket, dispatch_uid='customer-stats-ticket-save')
+def apply_stats_on_ticket_save(sender, instance, created, update_fields=None, **kwargs):
+    # Runs inside Ticket.save()'s transaction; a moved ticket shifts both customers
+    previous = None if created else getattr(instance, '_loaded_stats', None)
+    current = instance.customer_stats()
+    if previous is not None and update_fields is not None:
+        # Columns left out of update_fields keep their stored value
+        saved = {Ticket._meta.get_field(name).attname for name in update_fields}
+        current = tuple(
+            value if field in saved else old
+            for field, value, old in zip(Ticket.CUSTOMER_STATS_FIELDS, current, previous)
+        )
+    if created or previous is not None:
+        # An update of an instance that was never loaded has no known old state; reconcile() covers it
+        CustomerStatsService.apply([(previous, current)])
+    instance._loaded_stats = current
+
+
+@receiver(post_delete, sender=Ticket, dispatch_uid='customer-stats-ticket-delete')
+def apply_stats_on_ticket_delete(sender, instance, origin=None, **kwargs):
+    # Tickets deleted by cascade from their customer need no update
+    if isinstance(origin, Customer):
+        return
+    CustomerStatsService.apply([(getattr(instance, '_loaded_stats', None) or instance.customer_stats(), None)])
@@ -0,0 +1,23 @@
+"""
+Celery tasks for customer data
+"""
+from celery import shared_task
+
+from tenants.models import Client
+from tenants.sharding import tenant_shard_context, tenants_by_shard
+from .services import CustomerStatsService
+
+
+@shared_task
+def reconcile_customer_stats():
+    """
+    Periodic safety net that recomputes every customer's ticket aggregates
+    Runs hourly via Celery Beat; only rows that drifted are written.
+    Tenants in maintenance mode (being moved between shards) are skipped
+    """
+    summary = []
+    for tenants in tenants_by_shard(Client.objects.filter(is_active=True, maintenance_mode=False)).values():
+        for tenant in tenants:
+            with tenant_shard_context(tenant):
+                summary.append(f"{tenant.schema_name}: {CustomerStatsService.reconcile()}")
+    return f"Reconciled customer aggregates. Rows corrected: {', '.join(summary)}"
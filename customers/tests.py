@@ -1,4 +1,49 @@
-from django.test import TestCase
+from datetime import datetime, timedelta, timezone
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
 
+from tickets.models import Ticket
+from .services import CustomerStatsService
+from .signals import apply_stats_on_ticket_save
+
+CREATED_AT = datetime(2024, 3, 1, 9, 0, tzinfo=timezone.utc)
+
+
+class CustomerStatsServiceApplyTests(SimpleTestCase):
+    """Delta computation in CustomerStatsService.apply (the database is mocked)"""
+
+    def setUp(self):
+        self.connection = mock.patch('customers.services.tenant_connection').start()
+        self.cursor = self.connection.return_value.cursor.return_value.__enter__.return_value
+        self.cursor.rowcount = 1
+        mock.patch('customers.services.transaction.atomic').start()
+        self.invalidate = mock.patch('customers.services.invalidate_models').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_noop_save_issues_no_update(self):
+        state = (7, 'Open', CREATED_AT, None)
+        self.assertEqual(CustomerStatsService.apply([(state, state)]), 0)
+        self.cursor.execute.assert_not_called()
+        self.invalidate.assert_not_called()
+
+    def test_noop_ticket_save_signal_issues_no_update(self):
+        ticket = Ticket(pk=1, customer_id=7, status='Open', created_at=CREATED_AT)
+        ticket._loaded_stats = ticket.customer_stats()
+        ticket.title = 'Renamed'
+        apply_stats_on_ticket_save(Ticket, ticket, created=False)
+        self.cursor.execute.assert_not_called()
+
+    def test_resolving_moves_open_and_resolved_counters(self):
+        resolved_at = CREATED_AT + timedelta(hours=2)
+        CustomerStatsService.apply([((7, 'Open', CREATED_AT, None), (7, 'Resolved', CREATED_AT, resolved_at))])
+        params = self.cursor.execute.call_args[0][1]
+        self.assertEqual(params['ids'], [7])
+        self.assertEqual((params['total'], params['open'], params['last']), ([0], [-1], [None]))
+        self.assertEqual((params['resolved'], params['seconds']), ([1], [7200]))
+        self.invalidate.assert_called_once()
+
+    def test_new_ticket_pushes_last_ticket_at(self):
+        CustomerStatsService.apply([(None, (7, 'New', CREATED_AT, None))])
+        params = self.cursor.execute.call_args[0][1]
+        self.assertEqual((params['total'], params['open'], params['last']), ([1], [1], [CREATED_AT]))
@@ -3,14 +3,18 @@ from django.db.models import Q
 from .models import Customer
 from .serializers import CustomerSerializer, CustomerListSerializer
 from tickets.permissions import IsTenantMember
+from helpdesk_system.db_routers import ReplicaReadMixin
+from helpdesk_system.export import ExportMixin
+from helpdesk_system.sparse_fields import SparseFieldsetMixin
 
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(ReplicaReadMixin, SparseFieldsetMixin, ExportMixin, viewsets.ModelViewSet):
     """
     ViewSet for Customer CRUD operations
     """
     permission_classes = [permissions.IsAuthenticated, IsTenantMember]
     serializer_class = CustomerSerializer
+    export_resource = 'customers'
     
     def get_queryset(self):
         """Filter customers with search"""
@@ -23,7 +27,7 @@ class CustomerViewSet(viewsets.ModelViewSet):
                 Q(name__icontains=search) | Q(email__icontains=search) | Q(company__icontains=search)
             )
         
-        return queryset.prefetch_related('tickets')
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -19,6 +19,7 @@ urlpatterns = [
     path('customer/tickets/<int:ticket_id>/', views.customer_ticket_detail, name='customer_ticket_detail'),
     path('customer/knowledge-base/', views.customer_knowledge_base, name='customer_knowledge_base'),
     path('customer/knowledge-base/<int:article_id>/', views.customer_kb_article, name='customer_kb_article'),
+    path('customer/events/', views.ticket_events, {'panel': 'customer'}, name='customer_ticket_events'),
     
     # Admin panel
     path('admin-login/', views.admin_login, name='admin_login'),
@@ -31,5 +32,6 @@ urlpatterns = [
     path('admin-panel/knowledge-base/create/', views.admin_kb_article_create, name='admin_kb_article_create'),
     path('admin-panel/knowledge-base/<int:article_id>/', views.admin_kb_article_detail, name='admin_kb_article_detail'),
     path('admin-panel/knowledge-base/<int:article_id>/delete/', views.admin_kb_article_delete, name='admin_kb_article_delete'),
+    path('admin-panel/events/', views.ticket_events, {'panel': 'admin'}, name='admin_ticket_events'),
 ]
 
@@ -1,19 +1,35 @@
 """
 Frontend views for admin and customer panels using Django templates with token authentication
 """
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import user_passes_test
 from django.contrib.auth import authenticate
 from django.contrib import messages
 from django.db.models import Q, Count
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, Http404, StreamingHttpResponse
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
 from tickets.models import Ticket, SLAPolicy
 from customers.models import Customer
+from customers.services import CustomerService
 from knowledgebase.models import KnowledgeBase
-from tickets.services import TicketService
+from knowledgebase.services import ArticleViewService
+from tickets.services import TicketAssignmentService, TicketService
+from helpdesk_system.cache import cached
+from helpdesk_system.db_routers import use_replica
+from helpdesk_system.events import subscribe
+from tenants.sharding import tenant_shard_context
+from helpdesk_system.conditional import (
+    PRIVATE_CACHE_CONTROL, apply_cache_headers, check_not_modified, compute_etag, public_cache_control
+)
 
 User = get_user_model()
 
@@ -31,6 +47,58 @@ def is_staff_user(user):
     return user and user.is_authenticated and user.is_staff
 
 
+@cached(models=(KnowledgeBase,), protected=True)
+def get_kb_categories(published_only=True):
+    """Unique, non-empty KB categories (cached per tenant until an article changes)"""
+    articles = KnowledgeBase.objects.all()
+    if published_only:
+        articles = articles.filter(is_published=True)
+    categories = articles.values_list('category', flat=True).distinct()
+    return [c for c in categories if c]  # Remove empty
+
+
+@cached(timeout=60, models=(Ticket,), protected=True)
+def get_dashboard_stats(today):
+    """Ticket statistics for the admin dashboard (one recompute per tenant at a time)"""
+    return {
+        'total_tickets': Ticket.objects.count(),
+        'open_tickets': Ticket.objects.filter(status__in=['New', 'Open', 'In Progress']).count(),
+        'resolved_today': Ticket.objects.filter(status='Resolved', resolved_at__date=today).count(),
+        'overdue_count': Ticket.objects.filter(TicketService.overdue_q()).count(),
+        'tickets_by_status': list(Ticket.objects.values('status').annotate(count=Count('id'))),
+        'tickets_by_priority': list(Ticket.objects.values('priority').annotate(count=Count('id'))),
+    }
+
+
+def build_ticket_rows(queryset):
+    """
+    Rows for the ticket list templates, built from the needed columns only.
+    is_overdue is computed by the database and one clock is used for every timer.
+    """
+    now = timezone.now()
+    rows = TicketService.annotate_is_overdue(queryset).values(
+        'id', 'title', 'status', 'priority', 'due_at', 'created_at',
+        'customer__name', 'assignee__username', 'is_overdue'
+    )
+    return [
+        {
+            'ticket': {
+                'id': row['id'],
+                'title': row['title'],
+                'status': row['status'],
+                'priority': row['priority'],
+                'due_at': row['due_at'],
+                'created_at': row['created_at'],
+                'customer': {'name': row['customer__name']},
+                'assignee': {'username': row['assignee__username']} if row['assignee__username'] else None,
+            },
+            'is_overdue': row['is_overdue'],
+            'sla_timer': TicketService.format_escalation(row['status'], row['due_at'], now),
+        }
+        for row in rows
+    ]
+
+
 # ==================== Customer Panel Views ====================
 
 def root_view(request):
@@ -68,11 +136,14 @@ def customer_register(request):
             last_name=' '.join(name.split()[1:]) if name and len(name.split()) > 1 else ''
         )
         
-        # Create customer record
-        Customer.objects.create(
+        # Create the customer record, or claim the one an agent already created for this email
+        customer, created = Customer.objects.get_or_create(
             email=email,
-            name=name,
+            defaults={'name': name, 'user': user},
         )
+        if not created and customer.user_id is None:
+            customer.user = user
+            customer.save(update_fields=['user', 'updated_at'])
         
         messages.success(request, 'Account created successfully! Please login.')
         return redirect('customer_login')
@@ -114,6 +185,7 @@ def customer_logout(request):
     return render(request, 'frontend/customer/logout.html')
 
 
+@use_replica
 def customer_dashboard(request):
     """Customer dashboard with quick stats and recent tickets"""
     user = get_user_from_token(request)
@@ -125,7 +197,7 @@ def customer_dashboard(request):
         return redirect('admin_dashboard')
     
     tickets_qs = Ticket.objects.filter(
-        customer__email=user.email
+        customer_id=CustomerService.get_id_for_user(user)
     ).select_related('customer', 'assignee', 'sla_policy').order_by('-created_at')
     
     tickets = list(tickets_qs[:20])  # limit for calculations
@@ -154,6 +226,7 @@ def customer_dashboard(request):
     return render(request, 'frontend/customer/dashboard.html', context)
 
 
+@use_replica
 def customer_tickets(request):
     """Customer tickets list with filters"""
     user = get_user_from_token(request)
@@ -164,10 +237,10 @@ def customer_tickets(request):
         messages.error(request, 'Admins must use the admin portal.')
         return redirect('admin_dashboard')
     
-    # Get tickets for this customer (by email match)
+    # Get tickets for this customer (indexed customer_id, resolved once per request)
     tickets = Ticket.objects.filter(
-        customer__email=user.email
-    ).select_related('customer', 'assignee', 'sla_policy').order_by('-created_at')
+        customer_id=CustomerService.get_id_for_user(user)
+    ).order_by('-created_at')
     
     # Filter by status if provided
     status_filter = request.GET.get('status')
@@ -186,15 +259,7 @@ def customer_tickets(request):
             Q(title__icontains=search) | Q(description__icontains=search)
         )
     
-    # Calculate overdue status
-    ticket_list = []
-    for ticket in tickets:
-        is_overdue = TicketService.check_sla_breach(ticket)
-        ticket_list.append({
-            'ticket': ticket,
-            'is_overdue': is_overdue,
-            'sla_timer': TicketService.format_time_to_escalation(ticket),
-        })
+    ticket_list = build_ticket_rows(tickets)
     
     context = {
         'tickets': ticket_list,
@@ -224,10 +289,7 @@ def customer_create_ticket(request):
         priority = request.POST.get('priority', 'Medium')
         
         # Get or create customer
-        customer, _ = Customer.objects.get_or_create(
-            email=user.email,
-            defaults={'name': user.get_full_name() or user.username}
-        )
+        customer = CustomerService.get_for_user(user, create=True)
         
         # Create ticket
         ticket = Ticket.objects.create(
@@ -238,8 +300,9 @@ def customer_create_ticket(request):
             status='New'
         )
         
-        # Calculate due_at
-        ticket.due_at = TicketService.calculate_due_at(ticket)
+        # Calculate SLA deadlines and pick an agent (tenants with auto-assignment)
+        TicketService.set_sla_deadlines(ticket, recalculate=True)
+        TicketAssignmentService.auto_assign(ticket)
         ticket.save()
         
         messages.success(request, f'Ticket #{ticket.id} created successfully!')
@@ -271,7 +334,7 @@ def customer_ticket_detail(request, ticket_id):
     )
     
     # Check if user has access
-    if ticket.customer.email != user.email:
+    if ticket.customer.user_id != user.pk and ticket.customer_id != CustomerService.get_id_for_user(user):
         messages.error(request, 'You do not have permission to view this ticket')
         return redirect('customer_dashboard')
     
@@ -286,6 +349,7 @@ def customer_ticket_detail(request, ticket_id):
     return render(request, 'frontend/customer/ticket_detail.html', context)
 
 
+@use_replica
 def customer_knowledge_base(request):
     """Customer knowledge base"""
     articles = KnowledgeBase.objects.filter(is_published=True).select_related('created_by')
@@ -302,9 +366,7 @@ def customer_knowledge_base(request):
             Q(title__icontains=search) | Q(content__icontains=search) | Q(tags__icontains=search)
         )
     
-    # Get unique categories
-    categories = KnowledgeBase.objects.filter(is_published=True).values_list('category', flat=True).distinct()
-    categories = [c for c in categories if c]  # Remove empty
+    categories = get_kb_categories(published_only=True)
     
     context = {
         'articles': articles,
@@ -315,18 +377,36 @@ def customer_knowledge_base(request):
     return render(request, 'frontend/customer/knowledge_base.html', context)
 
 
+@use_replica
 def customer_kb_article(request, article_id):
     """Customer view knowledge base article"""
-    article = get_object_or_404(KnowledgeBase, pk=article_id, is_published=True)
+    validators = KnowledgeBase.objects.filter(
+        pk=article_id, is_published=True
+    ).values_list('updated_at', 'view_count').first()
+    if validators is None:
+        raise Http404('Article not found')
+    updated_at, view_count = validators
+    
+    # Staff see a different navbar link, everything else is identical for all visitors.
+    # The page shows view_count, which changes without touching updated_at
+    is_staff = request.user.is_authenticated and request.user.is_staff
+    etag = compute_etag('customer_kb_article', article_id, updated_at, view_count, is_staff)
+    cache_control = PRIVATE_CACHE_CONTROL if is_staff else public_cache_control()
+    
+    # Counted in Redis, not with an UPDATE: a write would pin this publicly cacheable response to the primary
+    ArticleViewService.record(article_id)
+    
+    not_modified = check_not_modified(request, etag, updated_at)
+    if not_modified is not None:
+        return apply_cache_headers(not_modified, etag, updated_at, cache_control, vary=('Cookie',))
     
-    # Increment view count
-    article.view_count += 1
-    article.save()
+    article = get_object_or_404(KnowledgeBase, pk=article_id, is_published=True)
     
     context = {
         'article': article,
     }
-    return render(request, 'frontend/customer/kb_article.html', context)
+    response = render(request, 'frontend/customer/kb_article.html', context)
+    return apply_cache_headers(response, etag, updated_at, cache_control, vary=('Cookie',))
 
 
 # ==================== Admin Panel Views ====================
@@ -464,6 +544,7 @@ def admin_logout(request):
     return render(request, 'frontend/admin/logout.html')
 
 
+@use_replica
 def admin_dashboard(request):
     """Admin dashboard"""
     user = get_user_from_token(request)
@@ -477,16 +558,7 @@ def admin_dashboard(request):
     tenant_name = tenant.name if tenant else 'Unknown Tenant'
     
     # Get statistics
-    total_tickets = Ticket.objects.count()
-    open_tickets = Ticket.objects.filter(status__in=['New', 'Open', 'In Progress']).count()
-    resolved_today = Ticket.objects.filter(
-        status='Resolved',
-        resolved_at__date=timezone.now().date()
-    ).count()
-    
-    # Get overdue tickets
-    all_tickets = Ticket.objects.select_related('customer', 'assignee', 'sla_policy')
-    overdue_count = sum(1 for t in all_tickets if TicketService.check_sla_breach(t))
+    stats = get_dashboard_stats(timezone.now().date())
     
     # Recent tickets
     recent_tickets_qs = Ticket.objects.select_related('customer', 'assignee').order_by('-created_at')[:10]
@@ -499,26 +571,16 @@ def admin_dashboard(request):
         for ticket in recent_tickets_qs
     ]
     
-    # Tickets by status
-    tickets_by_status = Ticket.objects.values('status').annotate(count=Count('id'))
-    
-    # Tickets by priority
-    tickets_by_priority = Ticket.objects.values('priority').annotate(count=Count('id'))
-    
     context = {
-        'total_tickets': total_tickets,
-        'open_tickets': open_tickets,
-        'resolved_today': resolved_today,
-        'overdue_count': overdue_count,
+        **stats,
         'recent_tickets': recent_tickets,
-        'tickets_by_status': tickets_by_status,
-        'tickets_by_priority': tickets_by_priority,
         'user': user,
         'tenant_name': tenant_name,
     }
     return render(request, 'frontend/admin/dashboard.html', context)
 
 
+@use_replica
 def admin_tickets(request):
     """Admin tickets list"""
     user = get_user_from_token(request)
@@ -526,7 +588,7 @@ def admin_tickets(request):
         messages.error(request, 'Please login as admin')
         return redirect('admin_login')
     
-    tickets = Ticket.objects.select_related('customer', 'assignee', 'sla_policy').order_by('-created_at')
+    tickets = Ticket.objects.order_by('-created_at')
     
     # Filters
     status_filter = request.GET.get('status')
@@ -547,15 +609,7 @@ def admin_tickets(request):
             Q(title__icontains=search) | Q(description__icontains=search) | Q(customer__name__icontains=search)
         )
     
-    # Calculate overdue status
-    ticket_list = []
-    for ticket in tickets:
-        is_overdue = TicketService.check_sla_breach(ticket)
-        ticket_list.append({
-            'ticket': ticket,
-            'is_overdue': is_overdue,
-            'sla_timer': TicketService.format_time_to_escalation(ticket),
-        })
+    ticket_list = build_ticket_rows(tickets)
     
     # Get all users for assignee filter
     users = User.objects.filter(is_staff=True)
@@ -607,7 +661,7 @@ def admin_ticket_detail(request, ticket_id):
             new_priority = request.POST.get('priority')
             if new_priority and new_priority in dict(Ticket.PRIORITY_CHOICES):
                 ticket.priority = new_priority
-                ticket.save()
+                ticket.save(actor=user)
                 messages.success(request, f'Ticket priority changed to {new_priority}')
             else:
                 messages.error(request, 'Invalid priority selected')
@@ -617,14 +671,14 @@ def admin_ticket_detail(request, ticket_id):
             if assignee_id:
                 try:
                     assignee = User.objects.get(pk=assignee_id)
-                    TicketService.assign_ticket(ticket, assignee)
+                    TicketService.assign_ticket(ticket, assignee, user=user)
                     messages.success(request, f'Ticket assigned to {assignee.username}')
                 except User.DoesNotExist:
                     messages.error(request, 'Assignee not found')
             else:
                 # Unassign ticket
                 ticket.assignee = None
-                ticket.save()
+                ticket.save(actor=user)
                 messages.success(request, 'Ticket unassigned')
         
         return redirect('admin_ticket_detail', ticket_id=ticket.id)
@@ -652,6 +706,7 @@ def admin_ticket_detail(request, ticket_id):
     return render(request, 'frontend/admin/ticket_detail.html', context)
 
 
+@use_replica
 def admin_customers(request):
     """Admin customers list"""
     user = get_user_from_token(request)
@@ -659,7 +714,8 @@ def admin_customers(request):
         messages.error(request, 'Please login as admin')
         return redirect('admin_login')
     
-    customers = Customer.objects.annotate(ticket_count=Count('tickets')).order_by('-created_at')
+    # Ticket counts come from the denormalized aggregates, no join over tickets
+    customers = Customer.objects.order_by('-created_at')
     
     search = request.GET.get('search')
     if search:
@@ -681,6 +737,7 @@ def admin_customers(request):
     return render(request, 'frontend/admin/customers.html', context)
 
 
+@use_replica
 def admin_knowledge_base(request):
     """Admin knowledge base management"""
     user = get_user_from_token(request)
@@ -714,9 +771,7 @@ def admin_knowledge_base(request):
             Q(title__icontains=search) | Q(content__icontains=search)
         )
     
-    # Get unique categories
-    categories = KnowledgeBase.objects.values_list('category', flat=True).distinct()
-    categories = [c for c in categories if c]  # Remove empty
+    categories = get_kb_categories(published_only=False)
     
     context = {
         'articles': articles,
@@ -853,3 +908,58 @@ def admin_kb_article_detail(request, article_id):
         'tenant_name': tenant_name,
     }
     return render(request, 'frontend/admin/kb_article_detail.html', context)
+
+
+def _customer_id_for(tenant, user):
+    with tenant_shard_context(tenant):
+        return CustomerService.get_id_for_user(user)
+
+
+async def _ticket_event_stream(schema_name, customer_id=None):
+    """SSE frames for the tenant's ticket events, for EVENTS_STREAM_SECONDS (EventSource then reconnects)"""
+    deadline = time.monotonic() + settings.EVENTS_STREAM_SECONDS
+    events = subscribe(schema_name)
+    try:
+        yield 'retry: 3000\n\n'
+        async for event in events:
+            if event is None:
+                yield ': ping\n\n'
+            elif customer_id is None or event.get('customer_id') == customer_id:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            if time.monotonic() >= deadline:
+                break
+    finally:
+        await events.aclose()
+
+
+async def ticket_events(request, panel):
+    """
+    Server-Sent Events stream of ticket changes for the admin and customer
+    panels. Admins get every event of their tenant, customers only those of
+    their own tickets. Holding a connection open per viewer needs the ASGI
+    app; under WSGI the view answers 204, which stops EventSource from
+    reconnecting, and the pages behave as before.
+    """
+    user = get_user_from_token(request)
+    if not user or user.is_staff != (panel == 'admin'):
+        return HttpResponse(status=403)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    customer_id = None
+    if panel == 'customer':
+        customer_id = await sync_to_async(_customer_id_for)(request.tenant, user)
+        if customer_id is None:
+            return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(
+        _ticket_event_stream(request.tenant.schema_name, customer_id), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx must not buffer the stream
+    return response
+
+
+# ATOMIC_REQUESTS (PgBouncer mode) cannot wrap async views; the stream runs no queries
+for _alias in settings.DATABASES:
+    ticket_events = transaction.non_atomic_requests(using=_alias)(ticket_events)
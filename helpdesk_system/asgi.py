@@ -2,6 +2,9 @@
 ASGI config for helpdesk_system project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+It serves the Server-Sent Events endpoints (frontend.views.ticket_events).
+Run it with ``gunicorn -k uvicorn.workers.UvicornWorker``, next to the
+WSGI app.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -0,0 +1,315 @@
+"""
+Tenant-namespaced caching
+Every cache key is scoped to the active schema (connection.schema_name) by
+django_tenants.cache.make_key, installed as CACHES['default']['KEY_FUNCTION'].
+Cached values additionally embed generation counters: one per tenant and
+one per model. Bumping a counter (a single INCR) makes every dependent key
+unreachable, so lists never need to be tracked or deleted one by one.
+
+Expensive aggregates use get_or_set_protected, which guards against cache
+stampedes: one request per key recomputes (single-flight lock), everyone
+else is served the previous value while it does, and keys are refreshed a
+little before they expire (probabilistic early expiry).
+"""
+import functools
+import hashlib
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+from .sharding import shard_context, tenant_db_alias
+
+logger = logging.getLogger(__name__)
+
+TENANT_GENERATION = 'tenant'
+
+# Sentinel so None can be cached
+_MISSING = object()
+# _acquire_lock result when the cache backend itself failed (not a lost race)
+_NO_BACKEND = object()
+# Share of the lock TTL a request waits for another request's cold-miss computation
+LOCK_WAIT_FRACTION = 0.1
+
+
+def _generation_key(scope):
+    return f'gen:{scope}'
+
+
+def _model_scope(model):
+    return f'model:{model._meta.label_lower}'
+
+
+def get_generations(*scopes):
+    """Current generation per scope, fetched in one round trip"""
+    keys = [_generation_key(scope) for scope in scopes]
+    values = cache.get_many(keys)
+    return [values.get(key, 0) for key in keys]
+
+
+def bump_generation(scope):
+    key = _generation_key(scope)
+    # add() is a no-op when the counter exists; incr() is atomic in Redis
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Counter evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
+        return 1
+
+
+def invalidate_models(*models, using=None):
+    """
+    Invalidate every cached value that depends on any of these models (current
+    tenant). The bump waits for the write transaction on `using` (default: the
+    tenant's shard) to commit, so readers cannot cache pre-commit data under
+    the new generation.
+    """
+    def bump():
+        for model in models:
+            bump_generation(_model_scope(model))
+    transaction.on_commit(bump, using=using or tenant_db_alias())
+
+
+def invalidate_tenant():
+    """Invalidate everything cached for the current tenant"""
+    bump_generation(TENANT_GENERATION)
+
+
+def _digest(parts):
+    raw = '|'.join(str(part) for part in parts)
+    return hashlib.md5(raw.encode('utf-8'), usedforsecurity=False).hexdigest() if raw else '-'
+
+
+def _version(models):
+    scopes = [TENANT_GENERATION] + [_model_scope(model) for model in models]
+    return '.'.join(str(gen) for gen in get_generations(*scopes))
+
+
+def make_key(name, *parts, models=()):
+    """Build a versioned key for name/parts that depends on the given models"""
+    return f'{name}:{_version(models)}:{_digest(parts)}'
+
+
+def get_or_set(name, compute, timeout=DEFAULT_TIMEOUT, models=(), parts=()):
+    """Return the cached value for name/parts, computing and storing it on a miss"""
+    key = make_key(name, *parts, models=models)
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+def _acquire_lock(key, lock_timeout):
+    """
+    Single-flight lock: SET NX with a TTL, so a crashed holder cannot block the key.
+    Returns the token, None when another request holds the lock, or _NO_BACKEND
+    when the cache is unreachable (add() returns None under IGNORE_EXCEPTIONS).
+    """
+    token = uuid.uuid4().hex
+    added = cache.add(f'lock:{key}', token, lock_timeout)
+    if added is None:
+        return _NO_BACKEND
+    return token if added else None
+
+
+def _release_lock(key, token):
+    lock_key = f'lock:{key}'
+    if cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def _store(key, version, compute, timeout, stale_ttl):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    # The entry outlives its freshness window by stale_ttl so it can be served while refreshing
+    cache.set(key, (value, version, time.time() + timeout, delta), timeout + stale_ttl)
+    return value
+
+
+def _refresh_in_background(key, version, compute, timeout, stale_ttl, token):
+    tenant = getattr(connection, 'tenant', None)
+    # Context variables are not inherited by new threads: carry the shard over explicitly
+    alias = tenant_db_alias()
+
+    def run():
+        try:
+            if tenant is not None:
+                connection.set_tenant(tenant)
+            with shard_context(alias, tenant=tenant):
+                _store(key, version, compute, timeout, stale_ttl)
+        except Exception:
+            logger.exception(f'[cache] Background refresh of {key} failed')
+        finally:
+            _release_lock(key, token)
+            connection.close()
+            if alias != DEFAULT_DB_ALIAS:
+                connections[alias].close()
+
+    threading.Thread(target=run, name=f'cache-refresh:{key}', daemon=True).start()
+
+
+def get_or_set_protected(name, compute, timeout=None, models=(), parts=(), stale_ttl=None,
+                         lock_timeout=None, beta=None, background=True):
+    """
+    get_or_set for expensive computations, safe against cache stampedes.
+
+    - Fresh value: returned, except that each reader may volunteer to refresh
+      it early with a probability that grows as expiry approaches (XFetch),
+      so a hot key is recomputed by one request before it ever expires.
+    - Expired, or invalidated by a model change: the request that wins the
+      lock recomputes (in a background thread when background=True); all other
+      requests keep getting the previous value for up to stale_ttl seconds.
+    - Nothing cached at all: the lock winner computes, the others wait a
+      short share of lock_timeout for its result before computing themselves.
+      When the cache is unreachable every request simply computes.
+    """
+    timeout = timeout if timeout is not None else getattr(settings, 'CACHE_PROTECTED_TIMEOUT', 60)
+    stale_ttl = stale_ttl if stale_ttl is not None else getattr(settings, 'CACHE_STALE_TTL', 300)
+    lock_timeout = lock_timeout if lock_timeout is not None else getattr(settings, 'CACHE_LOCK_TIMEOUT', 30)
+    beta = beta if beta is not None else getattr(settings, 'CACHE_EARLY_EXPIRY_BETA', 1.0)
+
+    # The entry key is stable across generations so a stale value survives invalidation
+    key = f'swr:{name}:{_digest(parts)}'
+    version = _version(models)
+    entry = cache.get(key)
+
+    if entry is not None:
+        value, entry_version, expires_at, delta = entry
+        early = delta * beta * -math.log(1.0 - random.random())
+        if entry_version == version and time.time() + early < expires_at:
+            return value
+
+        token = _acquire_lock(key, lock_timeout)
+        if token is None or token is _NO_BACKEND:
+            # Someone else is already refreshing this key, or the cache just went away
+            return value
+        if background:
+            _refresh_in_background(key, version, compute, timeout, stale_ttl, token)
+            return value
+        try:
+            return _store(key, version, compute, timeout, stale_ttl)
+        finally:
+            _release_lock(key, token)
+
+    token = _acquire_lock(key, lock_timeout)
+    if token is _NO_BACKEND:
+        # Cache outage: degrade to a plain miss rather than waiting on a lock nobody holds
+        return compute()
+    if token is None:
+        deadline = time.monotonic() + lock_timeout * LOCK_WAIT_FRACTION
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[0]
+        # The lock holder died or is too slow; fall through and compute
+    try:
+        return _store(key, version, compute, timeout, stale_ttl)
+    finally:
+        if token is not None:
+            _release_lock(key, token)
+
+
+def cached(timeout=DEFAULT_TIMEOUT, models=(), name=None, protected=False, stale_ttl=None):
+    """
+    Decorator for functions whose result depends only on their arguments,
+    the active tenant and the given models.
+    protected=True routes through get_or_set_protected for expensive aggregates.
+    """
+    def decorator(func):
+        key_name = name or f'{func.__module__}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            parts = list(args) + sorted(kwargs.items())
+            compute = functools.partial(func, *args, **kwargs)
+            if protected:
+                protected_timeout = None if timeout is DEFAULT_TIMEOUT else timeout
+                return get_or_set_protected(key_name, compute, protected_timeout, models, parts, stale_ttl=stale_ttl)
+            return get_or_set(key_name, compute, timeout, models, parts)
+        return wrapper
+    return decorator
+
+
+def _user_key(request):
+    user = getattr(request, 'user', None)
+    return user.pk if user is not None and user.is_authenticated else 'anonymous'
+
+
+def cache_view(timeout=DEFAULT_TIMEOUT, models=(), per_user=True):
+    """
+    Cache successful GET responses of a function view.
+    Only status, content type and body are stored; cookies and messages are not.
+    """
+    def decorator(view_func):
+        key_name = f'view:{view_func.__module__}.{view_func.__qualname__}'
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view_func(request, *args, **kwargs)
+
+            parts = [request.get_full_path(), _user_key(request) if per_user else '']
+            key = make_key(key_name, *parts, models=models)
+            hit = cache.get(key)
+            if hit is not None:
+                status_code, content_type, content = hit
+                return HttpResponse(content, content_type=content_type, status=status_code)
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                if hasattr(response, 'render') and not response.is_rendered:
+                    response.render()
+                cache.set(key, (response.status_code, response['Content-Type'], response.content), timeout)
+            return response
+        return wrapper
+    return decorator
+
+
+def cache_response_data(timeout=DEFAULT_TIMEOUT, models=(), per_user=True):
+    """
+    Cache the serialized data of a DRF view method (e.g. list/retrieve).
+    The key covers the full path (filters, page) and, by default, the user.
+    """
+    def decorator(method):
+        key_name = f'drf:{method.__module__}.{method.__qualname__}'
+
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            parts = [request.get_full_path(), _user_key(request) if per_user else '', sorted(kwargs.items())]
+            key = make_key(key_name, *parts, models=models)
+            data = cache.get(key, _MISSING)
+            if data is not _MISSING:
+                return Response(data)
+
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout)
+            return response
+        return wrapper
+    return decorator
+
+
+def _invalidate_sender(sender, using=None, **kwargs):
+    invalidate_models(sender, using=using)
+
+
+def register_model_invalidation(*models):
+    """Bump a model's generation whenever one of its rows is saved or deleted"""
+    for model in models:
+        post_save.connect(_invalidate_sender, sender=model, dispatch_uid=f'cache-gen-save-{model._meta.label_lower}')
+        post_delete.connect(_invalidate_sender, sender=model, dispatch_uid=f'cache-gen-delete-{model._meta.label_lower}')
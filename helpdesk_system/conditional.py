@@ -0,0 +1,127 @@
+"""
+HTTP conditional requests (ETag / Last-Modified) and cache headers
+Validators are computed from updated_at with one cheap query, so unchanged
+resources are answered with 304 before anything is serialized or rendered.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+# Private responses must be revalidated every time; the 304 keeps that cheap
+PRIVATE_CACHE_CONTROL = 'private, no-cache'
+
+
+def compute_etag(*parts) -> str:
+    """Strong ETag over the given parts, always scoped to the active tenant"""
+    raw = '|'.join(str(part) for part in (connection.schema_name,) + parts)
+    return '"' + hashlib.md5(raw.encode('utf-8'), usedforsecurity=False).hexdigest() + '"'
+
+
+def check_not_modified(request, etag, last_modified=None):
+    """Return a 304/412 response if the request preconditions say so, else None"""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def apply_cache_headers(response, etag, last_modified=None, cache_control=PRIVATE_CACHE_CONTROL,
+                        vary=('Authorization', 'Cookie')):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Cache-Control'] = cache_control
+    patch_vary_headers(response, vary)
+    return response
+
+
+def latest(*values):
+    values = [value for value in values if value]
+    return max(values) if values else None
+
+
+class ConditionalGetMixin:
+    """
+    ViewSet mixin adding ETag/Last-Modified to list and retrieve.
+
+    - retrieve: validator is the row's updated_at (plus validator_fields)
+    - list: validator is max(updated_at) and count over the filtered queryset,
+      combined with the query string so each page/filter gets its own ETag
+    - counter_fields: serialized counters that only ever grow without
+      touching updated_at (e.g. view counts); they go into the ETag (the
+      row's value, or the sum for lists) but not into Last-Modified
+    """
+    conditional_actions = ('list', 'retrieve')
+    validator_fields = ('updated_at',)
+    counter_fields = ()
+
+    def get_etag_user_key(self, request):
+        """What about the user changes the response (visibility rules)"""
+        return request.user.pk if request.user.is_authenticated else 'anonymous'
+
+    def get_cache_control(self, request):
+        return PRIVATE_CACHE_CONTROL
+
+    def _etag(self, request, *parts):
+        return compute_etag(
+            self.__class__.__name__,
+            self.action,
+            self.get_serializer_class().__name__,
+            self.get_etag_user_key(request),
+            request.get_full_path(),
+            *parts
+        )
+
+    def _conditional(self, request, etag, last_modified, handler, *args, **kwargs):
+        response = check_not_modified(request, etag, last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if not 200 <= response.status_code < 300:
+                return response
+        return apply_cache_headers(response, etag, last_modified, self.get_cache_control(request))
+
+    def list(self, request, *args, **kwargs):
+        if 'list' not in self.conditional_actions:
+            return super().list(request, *args, **kwargs)
+
+        aggregates = {f'max_{index}': Max(field) for index, field in enumerate(self.validator_fields)}
+        counters = {f'sum_{index}': Sum(field) for index, field in enumerate(self.counter_fields)}
+        stats = self.filter_queryset(self.get_queryset()).order_by().aggregate(
+            row_count=Count('pk'), **aggregates, **counters
+        )
+        last_modified = latest(*(stats[key] for key in aggregates))
+        etag = self._etag(request, stats['row_count'], last_modified, *(stats[key] for key in counters))
+        return self._conditional(request, etag, last_modified, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if 'retrieve' not in self.conditional_actions:
+            return super().retrieve(request, *args, **kwargs)
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            row = (
+                self.get_queryset()
+                .filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+                .values_list(*self.validator_fields, *self.counter_fields)
+                .first()
+            )
+        except (TypeError, ValueError, ValidationError):
+            row = None
+        if row is None:
+            # Let the normal path produce the 404
+            return super().retrieve(request, *args, **kwargs)
+
+        last_modified = latest(*row[:len(self.validator_fields)])
+        etag = self._etag(request, *row)
+        return self._conditional(request, etag, last_modified, super().retrieve, *args, **kwargs)
+
+
+def public_cache_control():
+    """Cache-Control for content that shared proxies may store (keyed by tenant host via the URL)"""
+    return (
+        f"public, max-age={getattr(settings, 'KB_CACHE_MAX_AGE', 60)}, "
+        f"s-maxage={getattr(settings, 'KB_SHARED_CACHE_MAX_AGE', 300)}"
+    )
@@ -0,0 +1,256 @@
+"""
+Tenant-aware database routing: tenant shards and the read replica
+
+Reads go to the replica only inside an explicit replica_reads() scope
+(read-only views, reporting tasks). Everything else, every write and every
+read that follows a write in the same unit of work stays on the primary.
+The replica connection is switched to the same tenant as the primary before
+it is handed out, so search_path is always correct.
+
+Tenants whose schema lives on another shard (see helpdesk_system.sharding)
+are routed there by ShardRouter before the replica is considered.
+"""
+import contextvars
+import functools
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.cache import cc_delim_re
+from django_tenants.routers import TenantSyncRouter
+from django_tenants.utils import get_public_schema_name
+from rest_framework.permissions import SAFE_METHODS
+
+from .sharding import get_shards, tenant_db_alias
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE_NAME = 'db_pin_primary'
+
+_routing_state = contextvars.ContextVar('replica_routing_state', default=None)
+_replica_health = {'checked_at': 0.0, 'fresh': False}
+
+_REPLICA_LAG_SQL = (
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+def get_replica_alias():
+    alias = getattr(settings, 'REPLICA_DATABASE_ALIAS', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+def _new_state(pinned=False):
+    return {'use_replica': False, 'pinned': pinned, 'wrote': False}
+
+
+def replica_is_fresh():
+    """
+    True when the replica lags the primary by less than REPLICA_MAX_LAG_SECONDS.
+    The check runs at most once per REPLICA_LAG_CHECK_INTERVAL per process.
+    """
+    interval = getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5)
+    now = time.monotonic()
+    if now - _replica_health['checked_at'] < interval:
+        return _replica_health['fresh']
+
+    _replica_health['checked_at'] = now
+    try:
+        with connections[get_replica_alias()].cursor() as cursor:
+            cursor.execute(_REPLICA_LAG_SQL)
+            lag = cursor.fetchone()[0]
+        fresh = lag is not None and float(lag) <= getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 5)
+    except DatabaseError as exc:
+        logger.warning(f'[replica] Lag check failed, falling back to primary: {exc}')
+        fresh = False
+    if not fresh and _replica_health['fresh']:
+        logger.warning('[replica] Replica is lagging or unavailable, routing reads to primary')
+    _replica_health['fresh'] = fresh
+    return fresh
+
+
+def _sync_tenant(alias):
+    """Point the replica connection at the primary connection's tenant"""
+    primary = connections[DEFAULT_DB_ALIAS]
+    replica = connections[alias]
+    if (replica.schema_name != primary.schema_name
+            or replica.include_public_schema != primary.include_public_schema):
+        replica.set_tenant(primary.tenant, primary.include_public_schema)
+
+
+@contextmanager
+def replica_reads():
+    """
+    Allow reads inside this block to be served by the replica.
+    Outside a request (Celery tasks, commands) the block is its own unit of work.
+    """
+    state = _routing_state.get()
+    token = None
+    if state is None:
+        state = _new_state()
+        token = _routing_state.set(state)
+    previous = state['use_replica']
+    state['use_replica'] = True
+    try:
+        yield
+    finally:
+        state['use_replica'] = previous
+        if token is not None:
+            _routing_state.reset(token)
+
+
+def mark_written():
+    """
+    Record a write in this unit of work: the rest of it (and, via the pin
+    cookie, the next few seconds) stays on the primary. ORM writes do this
+    through ReplicaRouter.db_for_write; raw-cursor writes must call it.
+    """
+    state = _routing_state.get()
+    if state is not None:
+        state['pinned'] = True
+        state['wrote'] = True
+
+
+def use_replica(view_func):
+    """Decorator for read-only function views and reporting tasks"""
+    @functools.wraps(view_func)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view_func(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaReadMixin:
+    """
+    ViewSet mixin: safe-method requests for the actions in replica_actions
+    may read from the replica. Detail views stay on the primary by default
+    because API clients expect to read back what they just wrote.
+    """
+    replica_actions = ('list',)
+
+    def dispatch(self, request, *args, **kwargs):
+        action = getattr(self, 'action_map', {}).get(request.method.lower())
+        if request.method in SAFE_METHODS and action in self.replica_actions:
+            with replica_reads():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+
+class ReplicaRouter:
+    """
+    Routes opted-in reads to the replica. Works alongside
+    django_tenants.routers.TenantSyncRouter, which keeps handling allow_migrate.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _routing_state.get()
+        if not state or not state['use_replica'] or state['pinned']:
+            return None
+
+        alias = get_replica_alias()
+        if alias is None or not replica_is_fresh():
+            return None
+
+        _sync_tenant(alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # Read-your-own-writes (see mark_written)
+        mark_written()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primary and replica hold the same data
+        return True
+
+
+def _is_public(response):
+    """True when shared caches may store the response (and hand its cookies to everyone)"""
+    directives = cc_delim_re.split(response.get('Cache-Control', ''))
+    return any(directive.strip().lower() == 'public' for directive in directives)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Resets routing state per request and pins clients that just wrote to the
+    primary for REPLICA_MAX_LAG_SECONDS so they never read stale data.
+    Publicly cacheable responses never carry the pin cookie.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _routing_state.set(_new_state(pinned=PIN_COOKIE_NAME in request.COOKIES))
+        try:
+            response = self.get_response(request)
+            if _routing_state.get()['wrote'] and not _is_public(response):
+                response.set_cookie(
+                    PIN_COOKIE_NAME,
+                    '1',
+                    max_age=int(getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 5)) + 1,
+                    httponly=True,
+                    samesite='Lax',
+                )
+            return response
+        finally:
+            _routing_state.reset(token)
+
+
+# Apps that only live in the public schema of the default database
+CATALOG_APP_LABELS = ('tenants',)
+
+
+@functools.lru_cache(maxsize=None)
+def _tenant_app_labels():
+    from django.apps import apps
+    tenant_apps = set(settings.TENANT_APPS)
+    return frozenset(config.label for config in apps.get_app_configs() if config.name in tenant_apps)
+
+
+def _is_tenant_model(model):
+    return model._meta.app_label in _tenant_app_labels()
+
+
+class ShardRouter:
+    """
+    Sends tenant-schema models to the active tenant's shard. Returns None on
+    the default shard so ReplicaRouter keeps deciding there.
+    """
+
+    def _route(self, model):
+        alias = tenant_db_alias()
+        if alias == DEFAULT_DB_ALIAS or not _is_tenant_model(model):
+            return None
+        return alias
+
+    def db_for_read(self, model, **hints):
+        return self._route(model)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model)
+
+
+class ShardedTenantSyncRouter(TenantSyncRouter):
+    """
+    TenantSyncRouter that also migrates the other shards: the tenant apps in
+    tenant schemas, the shared apps (minus the tenant catalog) in public.
+    """
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS or db not in get_shards():
+            return super().allow_migrate(db, app_label, model_name, **hints)
+
+        if connections[db].schema_name == get_public_schema_name():
+            if app_label in CATALOG_APP_LABELS:
+                return False
+            installed_apps = settings.SHARED_APPS
+        else:
+            installed_apps = settings.TENANT_APPS
+        if not self.app_in_list(app_label, installed_apps):
+            return False
+        return None
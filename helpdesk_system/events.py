@@ -0,0 +1,92 @@
+"""
+Real-time ticket events over Redis pub/sub
+Writers publish small JSON events to one channel per tenant once their
+transaction commits; the SSE endpoint (frontend.views.ticket_events, served
+by the ASGI app) subscribes to the tenant's channel and forwards them, so
+open panels patch themselves instead of re-running their queries.
+"""
+import asyncio
+import json
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+TICKET_CREATED = 'ticket.created'
+TICKET_UPDATED = 'ticket.updated'
+TICKET_BREACHED = 'ticket.breached'
+TICKETS_IMPORTED = 'tickets.imported'
+
+_publisher = None
+
+
+def channel_for(schema_name):
+    return f'{settings.EVENTS_CHANNEL_PREFIX}:{schema_name}'
+
+
+def _get_publisher():
+    global _publisher
+    if _publisher is None:
+        import redis
+        _publisher = redis.Redis.from_url(settings.EVENTS_REDIS_URL, socket_timeout=1, socket_connect_timeout=1)
+    return _publisher
+
+
+def publish(schema_name, event_type, **data):
+    """Send one event now. Real-time updates are best effort: Redis errors are logged, not raised."""
+    publish_many(schema_name, [(event_type, data)])
+
+
+def publish_many(schema_name, events):
+    """Send (event_type, data) pairs in one round trip"""
+    if not events:
+        return
+    channel = channel_for(schema_name)
+    try:
+        pipeline = _get_publisher().pipeline(transaction=False)
+        for event_type, data in events:
+            pipeline.publish(channel, json.dumps({'type': event_type, **data}, cls=DjangoJSONEncoder))
+        pipeline.execute()
+    except Exception as exc:
+        logger.warning(f'[events] Could not publish {len(events)} events for {schema_name}: {exc}')
+
+
+def publish_on_commit(schema_name, event_type, using=None, **data):
+    """Send the event once the surrounding transaction commits (right away outside one)"""
+    transaction.on_commit(lambda: publish(schema_name, event_type, **data), using=using)
+
+
+def publish_many_on_commit(schema_name, events, using=None):
+    transaction.on_commit(lambda: publish_many(schema_name, events), using=using)
+
+
+async def subscribe(schema_name, heartbeat=None):
+    """
+    Yield the tenant's events as dicts, and None every `heartbeat` seconds
+    without one so the caller can keep the connection alive
+    """
+    import redis.asyncio as aioredis
+
+    heartbeat = heartbeat or settings.EVENTS_HEARTBEAT_SECONDS
+    client = aioredis.Redis.from_url(settings.EVENTS_REDIS_URL)
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    try:
+        await pubsub.subscribe(channel_for(schema_name))
+        while True:
+            try:
+                message = await pubsub.get_message(timeout=heartbeat)
+            except asyncio.TimeoutError:
+                message = None
+            if message is None:
+                yield None
+                continue
+            try:
+                yield json.loads(message['data'])
+            except (TypeError, ValueError):
+                continue
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
@@ -0,0 +1,196 @@
+"""
+Streaming export of tenant data
+Rows are read through a server-side cursor and written as NDJSON or CSV
+in bounded chunks, so memory stays constant regardless of tenant size.
+"""
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+DEFAULT_CHUNK_SIZE = 2000
+
+# Flush the output buffer once it grows past this many characters
+_FLUSH_THRESHOLD = 64 * 1024
+
+# Exportable fields per resource: output name -> ORM lookup
+EXPORT_FIELDS = {
+    'tickets': {
+        'id': 'id',
+        'title': 'title',
+        'description': 'description',
+        'status': 'status',
+        'priority': 'priority',
+        'customer_id': 'customer_id',
+        'customer_email': 'customer__email',
+        'assignee_id': 'assignee_id',
+        'assignee_username': 'assignee__username',
+        'sla_policy_id': 'sla_policy_id',
+        'due_at': 'due_at',
+        'response_due_at': 'response_due_at',
+        'first_response_at': 'first_response_at',
+        'resolved_at': 'resolved_at',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+        'tags': 'tags',
+        'attachments': 'attachments',
+    },
+    'customers': {
+        'id': 'id',
+        'email': 'email',
+        'name': 'name',
+        'phone': 'phone',
+        'company': 'company',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    },
+    'knowledgebase': {
+        'id': 'id',
+        'title': 'title',
+        'content': 'content',
+        'category': 'category',
+        'tags': 'tags',
+        'is_published': 'is_published',
+        'view_count': 'view_count',
+        'created_by_id': 'created_by_id',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    },
+}
+
+
+class ExportError(ValueError):
+    """Raised for unknown resources, formats or fields"""
+
+
+def resolve_fields(resource: str, requested=None):
+    """
+    Return the (output names, ORM lookups) to export.
+    requested is a comma-separated string or list; defaults to every field.
+    """
+    available = EXPORT_FIELDS.get(resource)
+    if available is None:
+        raise ExportError(f'Unknown export resource: {resource}')
+
+    if isinstance(requested, str):
+        requested = [name.strip() for name in requested.split(',') if name.strip()]
+    names = list(requested) if requested else list(available)
+
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ExportError(f"Unknown fields for {resource}: {', '.join(unknown)}")
+    return names, [available[name] for name in names]
+
+
+class _Echo:
+    """File-like object that hands back whatever csv.writer writes"""
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, lookups, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Stream value tuples. On PostgreSQL .iterator() uses a named (server-side)
+    cursor, fetching chunk_size rows per round trip.
+    """
+    return queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def iter_export(queryset, resource: str, fmt: str = 'ndjson', fields=None,
+                chunk_size: int = DEFAULT_CHUNK_SIZE, compress: bool = False):
+    """Yield encoded export chunks (bytes)"""
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"Export format must be one of {', '.join(EXPORT_FORMATS)}")
+    names, lookups = resolve_fields(resource, fields)
+    rows = iter_rows(queryset, lookups, chunk_size)
+
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        lines = _iter_csv(writer, names, rows)
+    else:
+        lines = _iter_ndjson(names, rows)
+
+    compressor = zlib.compressobj(wbits=31) if compress else None  # 31 = gzip container
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= _FLUSH_THRESHOLD:
+            data = ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+            data = compressor.compress(data) if compressor else data
+            if data:
+                yield data
+    data = ''.join(buffer).encode('utf-8')
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
+
+
+def _iter_csv(writer, names, rows):
+    yield writer.writerow(names)
+    for row in rows:
+        yield writer.writerow(
+            [json.dumps(value) if isinstance(value, (list, dict)) else value for value in row]
+        )
+
+
+def _iter_ndjson(names, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(names, row))) + '\n'
+
+
+def streaming_export_response(queryset, resource: str, fmt: str = 'ndjson', fields=None,
+                              compress: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Build a StreamingHttpResponse for an export; validation errors raise ExportError"""
+    # Resolve eagerly so bad input fails before the response starts streaming
+    resolve_fields(resource, fields)
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"Export format must be one of {', '.join(EXPORT_FORMATS)}")
+
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    filename = f'{resource}.{fmt}'
+    if compress:
+        content_type = 'application/gzip'
+        filename += '.gz'
+
+    response = StreamingHttpResponse(
+        iter_export(queryset, resource, fmt, fields, chunk_size, compress),
+        content_type=content_type
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+class ExportMixin:
+    """
+    Adds GET .../export/ to a ViewSet, streaming get_queryset() so the
+    viewset's own filters and visibility rules apply.
+    Query params: output (ndjson|csv), fields (comma-separated), compress (gzip)
+    """
+    export_resource = None
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        try:
+            return streaming_export_response(
+                self.get_queryset(),
+                self.export_resource,
+                fmt=request.query_params.get('output', 'ndjson'),
+                fields=request.query_params.get('fields'),
+                compress=request.query_params.get('compress') == 'gzip',
+            )
+        except ExportError as exc:
+            return Response(
+                {'code': 'VALIDATION_ERROR', 'message': str(exc)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
@@ -0,0 +1,74 @@
+"""
+gunicorn configuration
+Usage: gunicorn -c python:helpdesk_system.gunicorn_conf helpdesk_system.wsgi:application
+
+The application is preloaded and warmed (helpdesk_system.warmup) in the
+master, then the heap is frozen so forked workers share it copy-on-write.
+Workers are gthread by default, sized from the CPU count. Each worker logs
+its RSS/PSS right after fork and after its first request, together with
+that request's latency.
+"""
+import gc
+import multiprocessing
+import os
+import time
+
+_cpus = multiprocessing.cpu_count()
+
+bind = f'0.0.0.0:{os.environ.get("PORT", "8000")}'
+preload_app = True
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', max(2, _cpus)))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+keepalive = 5
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+
+
+def _memory_kb():
+    """(RSS, PSS) of this process in kB; PSS splits shared pages between sharers"""
+    values = {}
+    for path in ('/proc/self/status', '/proc/self/smaps_rollup'):
+        try:
+            with open(path) as handle:
+                for line in handle:
+                    key, _, rest = line.partition(':')
+                    if key in ('VmRSS', 'Pss'):
+                        values[key] = int(rest.split()[0])
+        except OSError:
+            continue
+    return values.get('VmRSS'), values.get('Pss')
+
+
+def when_ready(server):
+    from helpdesk_system.warmup import warm_up
+
+    timings = warm_up()
+    server.log.info('Warm-up: ' + ', '.join(f'{name} {seconds * 1000:.0f}ms' for name, seconds in timings.items()))
+    # Keep the warmed objects out of the collector so its refcount writes don't unshare pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    rss, pss = _memory_kb()
+    worker._first_request_pending = True
+    server.log.info(f'Worker {worker.pid} forked: rss={rss}kB pss={pss}kB')
+
+
+def pre_request(worker, req):
+    req._started = time.perf_counter()
+
+
+def post_request(worker, req, environ, resp):
+    if not getattr(worker, '_first_request_pending', False):
+        return
+    worker._first_request_pending = False
+    rss, pss = _memory_kb()
+    latency = (time.perf_counter() - req._started) * 1000
+    worker.log.info(
+        f'Worker {worker.pid} first request {req.path} took {latency:.1f}ms: rss={rss}kB pss={pss}kB'
+    )
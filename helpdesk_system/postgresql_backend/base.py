@@ -0,0 +1,121 @@
+"""
+django-tenants PostgreSQL backend with search_path reuse on persistent connections
+
+django-tenants forgets the applied search_path on every set_tenant(), so
+TenantMainMiddleware makes each request issue SET search_path even when the
+connection already points at the same tenant. This backend remembers what is
+actually set on the server session and skips the SET while it still matches.
+
+Pooled tenants (Client.tenancy == 'pooled', see tenants.pooling) share the
+TENANT_POOL_SCHEMA tables: their search_path points at the pool schema and
+the session runs as TENANT_POOL_ROLE with app.tenant_id set to the tenant id,
+which the row-level security policies on the pool tables filter on.
+"""
+import django.db.utils
+import psycopg2
+from django.conf import settings
+from django_tenants.postgresql_backend.base import DatabaseWrapper as TenantDatabaseWrapper
+from django_tenants.utils import get_limit_set_calls, get_public_schema_name
+
+# Pool session state of a connection whose last pool SET failed
+_UNKNOWN = object()
+
+
+class DatabaseWrapper(TenantDatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        # search_path currently applied on the server session, if known
+        self.server_search_path = None
+        # (role, tenant id) currently applied on the server session, None when reset
+        self.server_pool_session = None
+        super().__init__(*args, **kwargs)
+
+    def set_tenant(self, tenant, include_public=True):
+        super().set_tenant(tenant, include_public)
+        # Only skip the SET when the tenant actually stayed the same
+        if (self.server_search_path and self._can_reuse_search_path()
+                and self._get_cursor_search_paths() == self.server_search_path):
+            self.search_path_set_schemas = self.server_search_path
+
+    def _can_reuse_search_path(self):
+        # With transaction-mode PgBouncer the next transaction may run on a
+        # different server connection, so session state cannot be cached.
+        return get_limit_set_calls() and not getattr(settings, 'PGBOUNCER_TRANSACTION_POOLING', False)
+
+    def _get_cursor_search_paths(self):
+        if getattr(self.tenant, 'is_pooled', False):
+            return [settings.TENANT_POOL_SCHEMA, get_public_schema_name()]
+        return super()._get_cursor_search_paths()
+
+    def _cursor(self, name=None):
+        cursor = super()._cursor(name=name)
+        # None here means the SET failed and the session state is unknown
+        self.server_search_path = self.search_path_set_schemas
+        # Pooled tenants always get their session; the setting only spares
+        # deployments without them the per-cursor check under PgBouncer
+        if (settings.TENANT_POOLED_TENANCY or self.server_pool_session is not None
+                or getattr(self.tenant, 'is_pooled', False)):
+            self._apply_pool_session(cursor, name)
+        return cursor
+
+    def _apply_pool_session(self, cursor, name):
+        """Switch role and app.tenant_id when the tenant's pool session differs from the server's"""
+        if getattr(self.tenant, 'is_pooled', False):
+            wanted = (settings.TENANT_POOL_ROLE, str(self.tenant.pk))
+        else:
+            wanted = None
+        if wanted == self.server_pool_session and self._can_reuse_search_path():
+            return
+
+        # Named cursor can only be used once, as for the search_path
+        pool_cursor = self.connection.cursor() if name else cursor
+        try:
+            if wanted:
+                pool_cursor.execute(
+                    "SET ROLE {}; SELECT set_config('app.tenant_id', %s, false)".format(
+                        self.ops.quote_name(wanted[0])),
+                    [wanted[1]]
+                )
+            else:
+                pool_cursor.execute("RESET ROLE; SELECT set_config('app.tenant_id', '', false)")
+        except (django.db.utils.DatabaseError, psycopg2.Error) as exc:
+            self.server_pool_session = _UNKNOWN
+            if name:
+                pool_cursor.close()
+            if wanted:
+                # Fail closed: never hand out a cursor that would run as the
+                # owner role with search_path on the shared pool schema
+                self.close()
+                raise django.db.utils.DatabaseError(
+                    f'Could not apply the pool session of tenant {wanted[1]}'
+                ) from exc
+            # Still running as the pool role, which RLS restricts; retried on the next cursor
+            return
+        self.server_pool_session = wanted
+        if name:
+            pool_cursor.close()
+
+    def connect(self):
+        super().connect()
+        # Fresh server session: nothing has been SET on it yet
+        self.server_search_path = None
+        self.search_path_set_schemas = None
+        self.server_pool_session = None
+
+    def close(self):
+        self.server_search_path = None
+        self.server_pool_session = None
+        super().close()
+
+    def _rollback(self):
+        # A SET issued inside the rolled back transaction is undone as well
+        self.server_search_path = None
+        self.search_path_set_schemas = None
+        self.server_pool_session = _UNKNOWN
+        return super()._rollback()
+
+    def _savepoint_rollback(self, sid):
+        self.server_search_path = None
+        self.search_path_set_schemas = None
+        self.server_pool_session = _UNKNOWN
+        return super()._savepoint_rollback(sid)
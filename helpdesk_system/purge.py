@@ -0,0 +1,82 @@
+"""
+Batched, throttled deletes for retention jobs
+A purge is one DELETE ... WHERE id IN (SELECT id ... LIMIT n FOR UPDATE SKIP
+LOCKED) RETURNING ... run repeatedly, each batch in its own short
+transaction with a lock_timeout, and a pause between batches. Rows locked
+by live requests are skipped, and a batch that would wait on a lock gives
+up and is retried later, so the live workload is never blocked for long.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+from .sharding import tenant_connection, tenant_db_alias
+
+logger = logging.getLogger(__name__)
+
+# Consecutive lock timeouts after which a purge stops until its next run
+MAX_LOCK_TIMEOUTS = 5
+# SQLSTATE lock_not_available, raised when lock_timeout expires
+LOCK_NOT_AVAILABLE = '55P03'
+
+
+class BatchedDelete:
+    """
+    Run `sql` (a DELETE with a LIMIT %(limit)s subquery and a RETURNING
+    clause) until it deletes fewer rows than the batch size, the time budget
+    is spent or it keeps timing out on locks. on_batch(rows) runs inside each
+    batch's transaction; on_commit(rows) after it committed.
+    """
+
+    def __init__(self, sql, params, batch_size=None, pause=None, max_seconds=None, on_batch=None, on_commit=None):
+        self.sql = sql
+        self.params = dict(params, limit=batch_size or settings.RETENTION_BATCH_SIZE)
+        self.pause = settings.RETENTION_BATCH_PAUSE if pause is None else pause
+        self.max_seconds = settings.RETENTION_MAX_SECONDS if max_seconds is None else max_seconds
+        self.on_batch = on_batch
+        self.on_commit = on_commit
+        self.deleted = 0
+        self.batches = 0
+        self.finished = False
+
+    def run(self, progress_callback=None) -> int:
+        """Delete until done or out of budget, returns the rows deleted by this run"""
+        started = time.monotonic()
+        lock_timeouts = 0
+        while time.monotonic() - started < self.max_seconds:
+            try:
+                rows = self._delete_batch()
+            except OperationalError as exc:
+                if getattr(exc.__cause__, 'pgcode', None) != LOCK_NOT_AVAILABLE:
+                    raise
+                # Something holds a table lock (e.g. a migration); back off
+                lock_timeouts += 1
+                logger.warning(f'[purge] Batch gave up on a lock ({exc}), attempt {lock_timeouts}')
+                if lock_timeouts >= MAX_LOCK_TIMEOUTS:
+                    break
+                time.sleep(self.pause * 2 ** lock_timeouts)
+                continue
+            lock_timeouts = 0
+
+            self.deleted += len(rows)
+            self.batches += 1
+            if self.on_commit and rows:
+                self.on_commit(rows)
+            if progress_callback:
+                progress_callback(self.deleted, self.batches)
+            if len(rows) < self.params['limit']:
+                self.finished = True
+                break
+            time.sleep(self.pause)
+        return self.deleted
+
+    def _delete_batch(self):
+        with transaction.atomic(using=tenant_db_alias()), tenant_connection().cursor() as cursor:
+            cursor.execute("SET LOCAL lock_timeout = %s", [f'{settings.RETENTION_LOCK_TIMEOUT_MS}ms'])
+            cursor.execute(self.sql, self.params)
+            rows = cursor.fetchall()
+            if self.on_batch and rows:
+                self.on_batch(rows)
+        return rows
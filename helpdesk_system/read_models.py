@@ -0,0 +1,86 @@
+"""
+Read models for hot list endpoints
+Rows are fetched as tuples with values_list() (only the listed columns, no
+model instances) and turned into response dicts by a mapper whose column
+order and converters are fixed when it is defined, not per row.
+"""
+from rest_framework import serializers
+from rest_framework.response import Response
+
+
+def _datetime_converter():
+    # Same output as DRF's DateTimeField (ISO 8601, current timezone, 'Z' for UTC)
+    return serializers.DateTimeField().to_representation
+
+
+CONVERTERS = {
+    'datetime': _datetime_converter,
+}
+
+
+class RowMapper:
+    """
+    Precompiled row -> dict mapping.
+
+    columns is a sequence of (output name, ORM lookup or annotation, converter),
+    where converter is None, a callable, or a key of CONVERTERS.
+    """
+
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        self.names = tuple(name for name, _, _ in columns)
+        self.lookups = tuple(lookup for _, lookup, _ in columns)
+        self._converters = tuple(
+            (name, CONVERTERS[converter]() if isinstance(converter, str) else converter)
+            for name, _, converter in columns
+            if converter is not None
+        )
+
+    def select(self, names):
+        """Mapper for a subset of the columns, in this mapper's order"""
+        wanted = set(names)
+        return RowMapper([column for column in self.columns if column[0] in wanted])
+
+    def rows(self, queryset):
+        """values_list() queryset with exactly this mapper's lookups"""
+        return queryset.values_list(*self.lookups)
+
+    def map(self, rows):
+        names = self.names
+        converters = self._converters
+        result = []
+        for row in rows:
+            item = dict(zip(names, row))
+            for name, convert in converters:
+                value = item[name]
+                if value is not None:
+                    item[name] = convert(value)
+            result.append(item)
+        return result
+
+
+class ReadModelListMixin:
+    """
+    ViewSet mixin serving the list action from a RowMapper instead of a
+    serializer. The viewset's filters, visibility rules and pagination still
+    apply; get_read_model_queryset() may add annotations the mapper selects.
+    """
+    read_model = None
+
+    def get_read_model(self):
+        return self.read_model
+
+    def get_read_model_queryset(self, queryset):
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        read_model = self.get_read_model()
+        if read_model is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = read_model.rows(self.get_read_model_queryset(queryset))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(read_model.map(page))
+        return Response(read_model.map(rows))
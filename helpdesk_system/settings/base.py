@@ -51,8 +51,9 @@ TENANT_APPS = [
 INSTALLED_APPS = list(SHARED_APPS) + [app for app in TENANT_APPS if app not in SHARED_APPS]
 
 MIDDLEWARE = [
-    'django_tenants.middleware.main.TenantMainMiddleware',  # Must be first
+    'tenants.middleware.CachedTenantMainMiddleware',  # Must be first (TenantMainMiddleware + domain cache)
     'frontend.middleware_debug.DebugTenantMiddleware',  # Debug middleware right after tenant routing
+    'helpdesk_system.db_routers.ReplicaRoutingMiddleware',  # Per-request replica routing state
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -91,12 +92,12 @@ if 'DATABASE_URL' in os.environ:
     DATABASES = {
         'default': env.db()
     }
-    # Ensure we use the django-tenants backend
-    DATABASES['default']['ENGINE'] = 'django_tenants.postgresql_backend'
+    # Ensure we use the django-tenants based backend
+    DATABASES['default']['ENGINE'] = 'helpdesk_system.postgresql_backend'
 else:
     DATABASES = {
         'default': {
-            'ENGINE': 'django_tenants.postgresql_backend',
+            'ENGINE': 'helpdesk_system.postgresql_backend',
             'NAME': env('DB_NAME', default='helpdesk_db'),
             'USER': env('DB_USER', default='postgres'),
             'PASSWORD': env('DB_PASSWORD', default='postgres'),
@@ -105,15 +106,94 @@ else:
         }
     }
 
+# Persistent, health-checked connections
+# Without CONN_MAX_AGE every request opens a new PostgreSQL connection.
+DATABASES['default']['CONN_MAX_AGE'] = env.int('DB_CONN_MAX_AGE', default=600)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Set PGBOUNCER_TRANSACTION_POOLING=true when connecting through a
+# transaction-mode PgBouncer. Session state (search_path, WITH HOLD cursors)
+# does not survive across transactions there, so requests run in a single
+# transaction and search_path is re-issued on every cursor.
+PGBOUNCER_TRANSACTION_POOLING = env.bool('PGBOUNCER_TRANSACTION_POOLING', default=False)
+if PGBOUNCER_TRANSACTION_POOLING:
+    DATABASES['default']['ATOMIC_REQUESTS'] = True
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# Optional read replica (REPLICA_DATABASE_URL or DB_REPLICA_HOST)
+# Read-only views and reporting tasks opt in via helpdesk_system.db_routers;
+# reads fall back to the primary when the replica lags more than
+# REPLICA_MAX_LAG_SECONDS.
+REPLICA_DATABASE_ALIAS = 'replica'
+REPLICA_MAX_LAG_SECONDS = env.float('REPLICA_MAX_LAG_SECONDS', default=5.0)
+REPLICA_LAG_CHECK_INTERVAL = env.float('REPLICA_LAG_CHECK_INTERVAL', default=5.0)
+if 'REPLICA_DATABASE_URL' in os.environ:
+    DATABASES[REPLICA_DATABASE_ALIAS] = env.db('REPLICA_DATABASE_URL')
+elif env('DB_REPLICA_HOST', default=''):
+    DATABASES[REPLICA_DATABASE_ALIAS] = dict(
+        DATABASES['default'],
+        HOST=env('DB_REPLICA_HOST'),
+        PORT=env('DB_REPLICA_PORT', default=DATABASES['default'].get('PORT', '5432')),
+        NAME=env('DB_REPLICA_NAME', default=DATABASES['default'].get('NAME', '')),
+    )
+if REPLICA_DATABASE_ALIAS in DATABASES:
+    DATABASES[REPLICA_DATABASE_ALIAS].update({
+        'ENGINE': 'helpdesk_system.postgresql_backend',
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'CONN_HEALTH_CHECKS': True,
+        'ATOMIC_REQUESTS': False,
+        'TEST': {'MIRROR': 'default'},
+    })
+
+# Tenant shards: extra PostgreSQL databases holding tenant schemas
+# SHARD_DATABASE_URLS="shard1=postgres://...,shard2=postgres://..."
+# The tenant catalog (Client, Domain) stays on 'default', which is also a
+# shard; Client.shard names the alias a tenant's schema lives on.
+for _shard_spec in env.list('SHARD_DATABASE_URLS', default=[]):
+    _alias, _, _url = _shard_spec.partition('=')
+    DATABASES[_alias.strip()] = dict(
+        env.db_url_config(_url.strip()),
+        ENGINE='helpdesk_system.postgresql_backend',
+        CONN_MAX_AGE=DATABASES['default']['CONN_MAX_AGE'],
+        CONN_HEALTH_CHECKS=True,
+        ATOMIC_REQUESTS=DATABASES['default'].get('ATOMIC_REQUESTS', False),
+        DISABLE_SERVER_SIDE_CURSORS=DATABASES['default'].get('DISABLE_SERVER_SIDE_CURSORS', False),
+    )
+TENANT_SHARDS = ['default'] + [
+    alias for alias in DATABASES if alias not in ('default', REPLICA_DATABASE_ALIAS)
+]
+# New tenants go to this shard, or to the one with the fewest tenants when empty
+TENANT_NEW_SHARD = env('TENANT_NEW_SHARD', default='')
+
 DATABASE_ROUTERS = (
-    'django_tenants.routers.TenantSyncRouter',
+    'helpdesk_system.db_routers.ShardRouter',
+    'helpdesk_system.db_routers.ReplicaRouter',
+    'helpdesk_system.db_routers.ShardedTenantSyncRouter',
 )
+TENANT_SYNC_ROUTER = 'helpdesk_system.db_routers.ShardedTenantSyncRouter'
 
 # django-tenants configuration
 TENANT_MODEL = "tenants.Client"
 TENANT_DOMAIN_MODEL = "tenants.Domain"
 SHOW_PUBLIC_IF_NO_TENANT_FOUND = True
 PUBLIC_SCHEMA_URLCONF = 'helpdesk_system.urls'  # Explicitly set URL conf for public schema
+# Only issue SET search_path when the tenant on a connection changes
+# (see helpdesk_system.postgresql_backend)
+TENANT_LIMIT_SET_CALLS = not PGBOUNCER_TRANSACTION_POOLING
+# Seconds a hostname -> tenant lookup is cached per process
+TENANT_DOMAIN_CACHE_TIMEOUT = env.int('TENANT_DOMAIN_CACHE_TIMEOUT', default=60)
+
+# New tenants are cloned from this pre-migrated schema (see tenants.provisioning)
+TENANT_TEMPLATE_SCHEMA = env('TENANT_TEMPLATE_SCHEMA', default='tenant_template')
+TENANT_SPARE_POOL_SIZE = env.int('TENANT_SPARE_POOL_SIZE', default=2)
+# Tenant schemas migrated concurrently by manage.py migrate_tenants
+TENANT_MIGRATION_WORKERS = env.int('TENANT_MIGRATION_WORKERS', default=4)
+# Pooled tenants share the tables of this schema, isolated by row-level
+# security under TENANT_POOL_ROLE (see tenants.pooling). Off: no pool session
+# statements are issued at all.
+TENANT_POOLED_TENANCY = env.bool('TENANT_POOLED_TENANCY', default=False)
+TENANT_POOL_SCHEMA = env('TENANT_POOL_SCHEMA', default='tenant_pool')
+TENANT_POOL_ROLE = env('TENANT_POOL_ROLE', default='helpdesk_pooled_tenant')
 
 # Debug: Log all URL resolution attempts
 import logging
@@ -204,7 +284,55 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'tickets.tasks.monitor_sla_deadlines',
         'schedule': 60.0,  # Run every minute
     },
+    'reconcile-customer-stats': {
+        'task': 'customers.tasks.reconcile_customer_stats',
+        'schedule': 3600.0,  # Run every hour
+    },
+    'refill-tenant-spare-pool': {
+        'task': 'tenants.tasks.refill_tenant_spare_pool',
+        'schedule': 300.0,  # Run every 5 minutes
+    },
+    'archive-closed-tickets': {
+        'task': 'tickets.tasks.archive_closed_tickets',
+        'schedule': 86400.0,  # Run daily
+    },
+    'purge-expired-data': {
+        'task': 'tickets.tasks.purge_expired_data',
+        'schedule': 86400.0,  # Run daily
+    },
+    'auto-assign-tickets': {
+        'task': 'tickets.tasks.auto_assign_tickets',
+        'schedule': 60.0,  # Run every minute
+    },
+    'flush-article-views': {
+        'task': 'knowledgebase.tasks.flush_article_views',
+        'schedule': 300.0,  # Run every 5 minutes
+    },
 }
+# Resolved/Closed tickets untouched this long move to tickets_archive
+# (see tickets.services.TicketArchiveService), this many per transaction
+TICKET_ARCHIVE_AFTER_DAYS = env.int('TICKET_ARCHIVE_AFTER_DAYS', default=365)
+TICKET_ARCHIVE_BATCH_SIZE = env.int('TICKET_ARCHIVE_BATCH_SIZE', default=1000)
+# Retention purges (see helpdesk_system.purge): rows per batch, seconds to
+# pause between batches, longest wait for a lock before a batch gives up,
+# and time budget per resource and run
+RETENTION_BATCH_SIZE = env.int('RETENTION_BATCH_SIZE', default=500)
+RETENTION_BATCH_PAUSE = env.float('RETENTION_BATCH_PAUSE', default=0.2)
+RETENTION_LOCK_TIMEOUT_MS = env.int('RETENTION_LOCK_TIMEOUT_MS', default=1000)
+RETENTION_MAX_SECONDS = env.int('RETENTION_MAX_SECONDS', default=900)
+# Automatic assignment (see tickets.services.TicketAssignmentService): open
+# tickets an agent may hold unless the tenant sets Client.agent_capacity, and
+# how many unassigned tickets one periodic run assigns per tenant
+AUTO_ASSIGN_CAPACITY = env.int('AUTO_ASSIGN_CAPACITY', default=20)
+AUTO_ASSIGN_BACKLOG_BATCH = env.int('AUTO_ASSIGN_BACKLOG_BATCH', default=200)
+
+# Real-time ticket events (see helpdesk_system.events): Redis pub/sub
+# channel per tenant, SSE keep-alive interval and how long one SSE response
+# streams before the browser reconnects (and is re-authenticated)
+EVENTS_REDIS_URL = env('EVENTS_REDIS_URL', default=env('REDIS_URL', default='redis://localhost:6379/1'))
+EVENTS_CHANNEL_PREFIX = env('EVENTS_CHANNEL_PREFIX', default='helpdesk:events')
+EVENTS_HEARTBEAT_SECONDS = env.int('EVENTS_HEARTBEAT_SECONDS', default=15)
+EVENTS_STREAM_SECONDS = env.int('EVENTS_STREAM_SECONDS', default=300)
 
 # Caching
 CACHES = {
@@ -213,12 +341,27 @@ CACHES = {
         'LOCATION': env('REDIS_URL', default='redis://localhost:6379/1'),
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            # A cache outage degrades to cache misses instead of errors
+            'IGNORE_EXCEPTIONS': True,
         },
         'KEY_PREFIX': 'helpdesk',
+        # Scope every key to the active tenant schema (see helpdesk_system.cache)
+        'KEY_FUNCTION': 'django_tenants.cache.make_key',
+        'REVERSE_KEY_FUNCTION': 'django_tenants.cache.reverse_key',
         'TIMEOUT': 300,  # 5 minutes
     }
 }
 
+# Stampede protection for expensive cached aggregates (seconds)
+CACHE_PROTECTED_TIMEOUT = env.int('CACHE_PROTECTED_TIMEOUT', default=60)
+CACHE_STALE_TTL = env.int('CACHE_STALE_TTL', default=300)  # how long a stale value may be served
+CACHE_LOCK_TIMEOUT = env.int('CACHE_LOCK_TIMEOUT', default=30)
+CACHE_EARLY_EXPIRY_BETA = env.float('CACHE_EARLY_EXPIRY_BETA', default=1.0)
+
+# HTTP caching of published knowledge base content (seconds)
+KB_CACHE_MAX_AGE = env.int('KB_CACHE_MAX_AGE', default=60)
+KB_SHARED_CACHE_MAX_AGE = env.int('KB_SHARED_CACHE_MAX_AGE', default=300)
+
 # Email Configuration (for notifications)
 EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
 EMAIL_HOST = env('EMAIL_HOST', default='smtp.gmail.com')
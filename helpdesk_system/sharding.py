@@ -0,0 +1,60 @@
+"""
+Shard (database alias) of the active tenant
+
+Tenant schemas live on one of several PostgreSQL databases
+(settings.TENANT_SHARDS); the tenant catalog stays on 'default'. The shard
+of the active tenant is held in a context variable, set per request by
+tenants.middleware and elsewhere by tenants.sharding.tenant_shard_context().
+ShardRouter sends tenant models there; raw SQL and explicit transactions
+should use tenant_db_alias() / tenant_connection().
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_current_shard = contextvars.ContextVar('tenant_shard', default=None)
+
+
+def get_shards():
+    return list(getattr(settings, 'TENANT_SHARDS', [DEFAULT_DB_ALIAS]))
+
+
+def tenant_db_alias():
+    """Database alias holding the active tenant's schema"""
+    return _current_shard.get() or DEFAULT_DB_ALIAS
+
+
+def tenant_connection():
+    return connections[tenant_db_alias()]
+
+
+def activate_shard(alias, tenant=None, schema_name=None):
+    """
+    Make alias the active shard, pointing its connection at tenant (or
+    schema_name). Returns a token for deactivate_shard().
+    """
+    if alias != DEFAULT_DB_ALIAS:
+        if tenant is not None:
+            connections[alias].set_tenant(tenant)
+        elif schema_name is not None:
+            connections[alias].set_schema(schema_name)
+    return _current_shard.set(alias)
+
+
+def deactivate_shard(token):
+    _current_shard.reset(token)
+
+
+@contextmanager
+def shard_context(alias, tenant=None, schema_name=None):
+    """Run a block against alias; the shard connection's previous tenant is restored"""
+    previous = connections[alias].tenant if alias != DEFAULT_DB_ALIAS else None
+    token = activate_shard(alias, tenant=tenant, schema_name=schema_name)
+    try:
+        yield connections[alias]
+    finally:
+        deactivate_shard(token)
+        if previous is not None:
+            connections[alias].set_tenant(previous)
@@ -0,0 +1,155 @@
+"""
+Sparse fieldsets (?fields=) and include-controls (?expand=) for the REST API
+The queryset is narrowed to match: only() the columns behind the selected
+fields and select_related() only the relations they traverse, so a client
+asking for a few columns pays neither for joins nor for large text/JSON.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def parse_list_param(value):
+    return [item.strip() for item in value.split(',') if item.strip()] if value else []
+
+
+class DynamicFieldsMixin:
+    """
+    Serializer mixin accepting fields= and expand= keyword arguments.
+    Meta.expandable_fields maps a name to (serializer class, kwargs); when
+    expanded, the nested serializer replaces the plain field of that name.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in expand or ():
+            serializer_class, options = expandable[name]
+            self.fields[name] = serializer_class(read_only=True, **options)
+        if fields is not None:
+            keep = set(fields) | set(expand or ())
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+
+
+def _resolve_source(model, source_attrs):
+    """
+    Map a field source to (ORM path, relations to join), or None when it is
+    not a plain chain of forward relations ending in a concrete field.
+    """
+    related = []
+    path = []
+    for index, attr in enumerate(source_attrs):
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete:
+            return None
+        path.append(attr)
+        if index < len(source_attrs) - 1:
+            if not (model_field.many_to_one or model_field.one_to_one):
+                return None
+            related.append('__'.join(path))
+            model = model_field.related_model
+    return '__'.join(path), related
+
+
+def narrow_queryset(queryset, serializer, restrict_columns=True):
+    """
+    select_related() exactly the relations the serializer reads and, when
+    every field maps to a column, only() those columns.
+    """
+    model = queryset.model
+    related = set()
+    columns = {model._meta.pk.name}
+    exact = restrict_columns
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            exact = False
+            continue
+        resolved = _resolve_source(model, field.source_attrs)
+        if resolved is None:
+            exact = False
+            continue
+        path, joins = resolved
+        related.update(joins)
+        columns.update(joins)
+        columns.add(path)
+        if isinstance(field, serializers.BaseSerializer):
+            # Expanded relation: join it and load the related row in full
+            related.add(path)
+
+    if related:
+        queryset = queryset.select_related(*sorted(related))
+    if exact:
+        queryset = queryset.only(*sorted(columns))
+    return queryset
+
+
+class SparseFieldsetMixin:
+    """
+    ViewSet mixin adding ?fields=a,b,c and ?expand=x,y to read actions.
+
+    The queryset returned by get_queryset() should not select_related()
+    itself; filter_queryset() joins what the serializer needs, for every
+    action, and additionally restricts columns for sparse_actions.
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    def get_sparse_params(self):
+        if not hasattr(self, '_sparse_params'):
+            fields = expand = None
+            if self.action in self.sparse_actions:
+                fields = parse_list_param(self.request.query_params.get('fields')) or None
+                expand = parse_list_param(self.request.query_params.get('expand'))
+                self._validate_sparse_params(fields, expand)
+            self._sparse_params = (fields, expand or [])
+        return self._sparse_params
+
+    def _validate_sparse_params(self, fields, expand):
+        serializer_class = self.get_serializer_class()
+        expandable = getattr(serializer_class.Meta, 'expandable_fields', {})
+        unknown_expand = [name for name in expand if name not in expandable]
+        if unknown_expand:
+            raise serializers.ValidationError({
+                'expand': f"Unknown expansion(s): {', '.join(unknown_expand)}. "
+                          f"Available: {', '.join(expandable) or 'none'}"
+            })
+        if fields:
+            available = set(serializer_class.Meta.fields) | set(expandable)
+            unknown = [name for name in fields if name not in available]
+            if unknown:
+                raise serializers.ValidationError({
+                    'fields': f"Unknown field(s): {', '.join(unknown)}"
+                })
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_sparse_params()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        if expand:
+            kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return narrow_queryset(
+            queryset,
+            self.get_serializer(),
+            restrict_columns=self.action in self.sparse_actions,
+        )
+
+    def get_read_model(self):
+        """Read-model list path (see ReadModelListMixin), narrowed to ?fields="""
+        read_model = super().get_read_model()
+        fields, expand = self.get_sparse_params()
+        if read_model is None or expand:
+            # Nested objects need the serializer path
+            return None
+        if fields is not None:
+            return read_model.select(fields)
+        return read_model
@@ -0,0 +1,82 @@
+"""
+Per-process warm-up run before an application server accepts traffic
+
+With gunicorn's preload_app the master runs this once and every worker
+inherits the warmed state copy-on-write: URL resolvers, compiled templates
+and the hostname -> tenant map (see tenants.middleware). Database
+connections opened here are closed again so no socket is shared across
+fork().
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def warm_url_resolvers():
+    for urlconf in {settings.ROOT_URLCONF, getattr(settings, 'PUBLIC_SCHEMA_URLCONF', settings.ROOT_URLCONF)}:
+        resolver = get_resolver(urlconf)
+        # Builds the reverse/namespace dicts and compiles every pattern
+        resolver.reverse_dict
+        resolver.namespace_dict
+
+
+def _template_names():
+    from django.template.utils import get_app_template_dirs
+
+    dirs = [str(path) for engine in settings.TEMPLATES for path in engine.get('DIRS', ())]
+    dirs += [str(path) for path in get_app_template_dirs('templates')]
+    for root_dir in dirs:
+        for root, _, files in os.walk(root_dir):
+            for filename in files:
+                if filename.endswith(('.html', '.txt')):
+                    yield os.path.relpath(os.path.join(root, filename), root_dir).replace(os.sep, '/')
+
+
+def warm_templates():
+    """Compile every project and app template into the cached loader. Returns the count."""
+    count = 0
+    for name in sorted(set(_template_names())):
+        try:
+            get_template(name)
+            count += 1
+        except (TemplateDoesNotExist, TemplateSyntaxError):
+            continue
+    return count
+
+
+def warm_tenant_domains():
+    """Fill the hostname -> tenant cache from one query. Returns the count."""
+    from tenants.middleware import cache_tenant_for_hostname
+    from tenants.models import Domain
+
+    count = 0
+    for domain in Domain.objects.select_related('tenant'):
+        cache_tenant_for_hostname(domain.domain, domain.tenant)
+        count += 1
+    return count
+
+
+def warm_up():
+    """Run every warm-up step; a failing step is logged and skipped. Returns step timings."""
+    timings = {}
+    for name, step in (
+        ('url_resolvers', warm_url_resolvers),
+        ('templates', warm_templates),
+        ('tenant_domains', warm_tenant_domains),
+    ):
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception(f'[warmup] {name} failed')
+        timings[name] = time.perf_counter() - started
+    connections.close_all()
+    return timings
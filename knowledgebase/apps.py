@@ -5,3 +5,7 @@ class KnowledgebaseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'knowledgebase'
 
+    def ready(self):
+        from helpdesk_system.cache import register_model_invalidation
+        from .models import KnowledgeBase
+        register_model_invalidation(KnowledgeBase)
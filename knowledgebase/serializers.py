@@ -1,8 +1,10 @@
 from rest_framework import serializers
+from helpdesk_system.sparse_fields import DynamicFieldsMixin
+from tickets.serializers import UserSummarySerializer
 from .models import KnowledgeBase
 
 
-class KnowledgeBaseSerializer(serializers.ModelSerializer):
+class KnowledgeBaseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     created_by_username = serializers.CharField(source='created_by.username', read_only=True)
     
     class Meta:
@@ -13,6 +15,9 @@ class KnowledgeBaseSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ('view_count', 'created_at', 'updated_at', 'created_by')
+        expandable_fields = {
+            'created_by': (UserSummarySerializer, {}),
+        }
     
     def create(self, validated_data):
         """Set created_by to current user"""
@@ -20,9 +25,12 @@ class KnowledgeBaseSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class KnowledgeBaseListSerializer(serializers.ModelSerializer):
+class KnowledgeBaseListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Lightweight serializer for list views"""
     class Meta:
         model = KnowledgeBase
         fields = ['id', 'title', 'category', 'tags', 'view_count', 'created_at']
+        expandable_fields = {
+            'created_by': (UserSummarySerializer, {}),
+        }
 
@@ -0,0 +1,76 @@
+"""
+Business logic for knowledge base articles
+"""
+import logging
+
+from django_redis import get_redis_connection
+
+from helpdesk_system.sharding import tenant_connection
+from .models import KnowledgeBase
+
+logger = logging.getLogger(__name__)
+
+VIEWS_KEY_PREFIX = 'helpdesk:kb-views'
+
+# Take the pending counts and clear them in one step, so views recorded
+# during a flush are kept for the next one
+_TAKE_LUA = """
+local views = redis.call('HGETALL', KEYS[1])
+redis.call('DEL', KEYS[1])
+return views
+"""
+
+_FLUSH_SQL = f"""
+UPDATE {KnowledgeBase._meta.db_table} AS kb
+   SET view_count = kb.view_count + v.views
+  FROM unnest(%(ids)s::bigint[], %(views)s::integer[]) AS v(id, views)
+ WHERE kb.id = v.id
+"""
+
+
+class ArticleViewService:
+    """
+    Article view counting out of band of the page request.
+    Views are counted in a per-tenant Redis hash (one HINCRBY) and added to
+    KnowledgeBase.view_count by the periodic flush_article_views task, so a
+    read-only, publicly cacheable article view never writes to the database
+    (which would pin the visitor to the primary). view_count lags by up to
+    one flush interval; views counted while Redis is unreachable are lost.
+    """
+
+    @staticmethod
+    def _key():
+        return f'{VIEWS_KEY_PREFIX}:{tenant_connection().schema_name}'
+
+    @staticmethod
+    def record(article_id) -> int:
+        """Count one view, returns the views not yet flushed for this article"""
+        key = ArticleViewService._key()
+        try:
+            return get_redis_connection('default').hincrby(key, article_id, 1)
+        except Exception as exc:
+            logger.warning(f'[kb-views] Could not count a view of article {article_id} in {key}: {exc}')
+            return 0
+
+    @staticmethod
+    def flush() -> int:
+        """Add the pending views to view_count, returns the number of articles updated"""
+        key = ArticleViewService._key()
+        client = get_redis_connection('default')
+        values = client.eval(_TAKE_LUA, 1, key)
+        pending = {int(values[index]): int(values[index + 1]) for index in range(0, len(values), 2)}
+        if not pending:
+            return 0
+        ids = sorted(pending)
+        try:
+            # Raw UPDATE: leaves updated_at alone and nothing cached shows view_count
+            with tenant_connection().cursor() as cursor:
+                cursor.execute(_FLUSH_SQL, {'ids': ids, 'views': [pending[article_id] for article_id in ids]})
+                return cursor.rowcount
+        except Exception:
+            # Put the views back for the next flush
+            pipeline = client.pipeline()
+            for article_id, views in pending.items():
+                pipeline.hincrby(key, article_id, views)
+            pipeline.execute()
+            raise
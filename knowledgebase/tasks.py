@@ -0,0 +1,24 @@
+"""
+Celery tasks for knowledge base articles
+"""
+from celery import shared_task
+
+from tenants.models import Client
+from tenants.sharding import tenant_shard_context, tenants_by_shard
+from .services import ArticleViewService
+
+
+@shared_task
+def flush_article_views():
+    """
+    Add the article views counted in Redis to KnowledgeBase.view_count
+    Runs every 5 minutes via Celery Beat; tenants being moved keep their
+    counts until the next run
+    """
+    summary = []
+    tenants = Client.objects.filter(is_active=True, maintenance_mode=False)
+    for shard_tenants in tenants_by_shard(tenants).values():
+        for tenant in shard_tenants:
+            with tenant_shard_context(tenant):
+                summary.append(f"{tenant.schema_name}: {ArticleViewService.flush()}")
+    return f"Flushed article views. Articles updated: {', '.join(summary)}"
@@ -4,15 +4,25 @@ from rest_framework.response import Response
 from django.db.models import Q
 from .models import KnowledgeBase
 from .serializers import KnowledgeBaseSerializer, KnowledgeBaseListSerializer
+from .services import ArticleViewService
 from tickets.permissions import IsTenantMember
+from helpdesk_system.conditional import ConditionalGetMixin, PRIVATE_CACHE_CONTROL, public_cache_control
+from helpdesk_system.db_routers import ReplicaReadMixin
+from helpdesk_system.export import ExportMixin
+from helpdesk_system.sparse_fields import SparseFieldsetMixin
 
 
-class KnowledgeBaseViewSet(viewsets.ModelViewSet):
+class KnowledgeBaseViewSet(ReplicaReadMixin, ConditionalGetMixin, SparseFieldsetMixin, ExportMixin,
+                           viewsets.ModelViewSet):
     """
     ViewSet for Knowledge Base articles
     """
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsTenantMember]
     serializer_class = KnowledgeBaseSerializer
+    export_resource = 'knowledgebase'
+    replica_actions = ('list', 'retrieve')
+    # Both serializers show view_count, which flush_article_views bumps without touching updated_at
+    counter_fields = ('view_count',)
     
     def get_queryset(self):
         """Filter by published status and search"""
@@ -34,17 +44,28 @@ class KnowledgeBaseViewSet(viewsets.ModelViewSet):
                 Q(title__icontains=search) | Q(content__icontains=search) | Q(tags__icontains=search)
             )
         
-        return queryset.select_related('created_by')
+        # Joins and columns are narrowed to the serialized fields by SparseFieldsetMixin
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'list':
             return KnowledgeBaseListSerializer
         return KnowledgeBaseSerializer
     
+    def get_etag_user_key(self, request):
+        # Visibility only differs between anonymous and authenticated users
+        return request.user.is_authenticated
+    
+    def get_cache_control(self, request):
+        # Anonymous requests only ever see published content, which shared caches may store
+        if request.user.is_authenticated:
+            return PRIVATE_CACHE_CONTROL
+        return public_cache_control()
+    
     @action(detail=True, methods=['post'])
     def increment_view(self, request, pk=None):
         """Increment view count"""
         article = self.get_object()
-        article.view_count += 1
-        article.save()
-        return Response({'view_count': article.view_count})
+        # Counted like page views; view_count catches up at the next flush
+        pending = ArticleViewService.record(article.pk)
+        return Response({'view_count': article.view_count + pending})
@@ -5,3 +5,5 @@ class TenantsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tenants'
 
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,88 @@
+"""
+Default tenant setup run at container start (see manage.py bootstrap)
+
+The domain comes from DEFAULT_TENANT_DOMAIN, the Render service URL or the
+first public host in ALLOWED_HOSTS. The tenant is provisioned from the
+template schema when missing; either way its Domain record, SLA policies
+and admin user are ensured.
+"""
+import logging
+import os
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.management import call_command
+
+from .models import Client, Domain
+from .provisioning import provision_tenant
+from .sharding import tenant_shard_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADMIN = {
+    'username': 'root',
+    'password': 'varun16728...',
+    'email': 'admin@example.com',
+}
+
+
+def resolve_default_domain():
+    domain = os.environ.get('DEFAULT_TENANT_DOMAIN', '')
+    if domain:
+        return domain
+
+    render_url = os.environ.get('RENDER_SERVICE_URL') or os.environ.get('RENDER_EXTERNAL_URL')
+    if render_url and urlparse(render_url).netloc:
+        return urlparse(render_url).netloc
+
+    for host in getattr(settings, 'ALLOWED_HOSTS', None) or ():
+        if host and host != '*' and '.' in host and 'localhost' not in host.lower():
+            return host
+    return ''
+
+
+def _find_tenant(domain, schema_name):
+    domain_obj = Domain.objects.select_related('tenant').filter(domain=domain).first()
+    if domain_obj:
+        return domain_obj.tenant
+    return (Client.objects.filter(domain_url=domain).first()
+            or Client.objects.filter(schema_name=schema_name).first())
+
+
+def ensure_default_tenant(stdout=None):
+    """
+    Make sure the default tenant exists and is reachable on its domain.
+    Returns the tenant, or None when no domain could be determined.
+    """
+    write = stdout.write if stdout is not None else logger.info
+    domain = resolve_default_domain()
+    if not domain:
+        write('Could not determine a domain for the default tenant; set DEFAULT_TENANT_DOMAIN '
+              'or add a public host to ALLOWED_HOSTS')
+        return None
+
+    schema_name = os.environ.get('DEFAULT_TENANT_SCHEMA', 'default')
+    name = os.environ.get('DEFAULT_TENANT_NAME', 'Default Tenant')
+
+    tenant = _find_tenant(domain, schema_name)
+    if tenant is None:
+        # Cloned from the pre-migrated template, so nothing is migrated here
+        tenant, source = provision_tenant(schema_name, name, domain, refill_async=False)
+        write(f'Created default tenant "{name}" ({schema_name}) for {domain} from {source}')
+    else:
+        if tenant.domain_url != domain and tenant.schema_name == schema_name:
+            tenant.domain_url = domain
+            tenant.save(update_fields=['domain_url'])
+        Domain.objects.update_or_create(domain=domain, defaults={'tenant': tenant, 'is_primary': True})
+        write(f'Default tenant "{tenant.name}" ({tenant.schema_name}) serves {domain}')
+
+    with tenant_shard_context(tenant):
+        try:
+            call_command('setup_default_sla_policies', verbosity=0)
+        except Exception as exc:
+            write(f'SLA policy setup failed (non-critical): {exc}')
+        try:
+            call_command('create_admin_user', verbosity=0, **DEFAULT_ADMIN)
+        except Exception as exc:
+            write(f'Admin user setup failed (non-critical): {exc}')
+    return tenant
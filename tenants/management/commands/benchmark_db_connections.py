@@ -0,0 +1,80 @@
+"""
+Management command to compare per-request connections against persistent connections
+Usage: python manage.py benchmark_db_connections --schema_name acme [--requests 500] [--conn_max_age 600]
+
+Each simulated request follows the request lifecycle Django uses under gunicorn:
+close_old_connections() on request start, tenant activation, one short query,
+close_old_connections() on request finish.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from tenants.models import Client
+from tickets.models import Ticket
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark request latency with and without persistent DB connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema_name', type=str, required=True, help='Tenant schema to query')
+        parser.add_argument('--requests', type=int, default=500, help='Simulated requests per mode')
+        parser.add_argument('--conn_max_age', type=int, default=600,
+                          help='CONN_MAX_AGE used for the persistent run')
+
+    def handle(self, *args, **options):
+        tenant = Client.objects.filter(schema_name=options['schema_name']).first()
+        if not tenant:
+            raise CommandError(f'Tenant "{options["schema_name"]}" not found')
+
+        original_max_age = connection.settings_dict['CONN_MAX_AGE']
+        modes = [
+            ('per-request connections (CONN_MAX_AGE=0)', 0),
+            (f'persistent connections (CONN_MAX_AGE={options["conn_max_age"]})', options['conn_max_age']),
+        ]
+        try:
+            for label, max_age in modes:
+                self._run(label, max_age, tenant, options['requests'])
+        finally:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = original_max_age
+            connection.set_schema_to_public()
+
+    def _run(self, label, max_age, tenant, requests):
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        counts = {'connects': 0, 'set_search_path': 0}
+
+        def count_statements(execute, sql, params, many, context):
+            if sql.startswith('SET search_path'):
+                counts['set_search_path'] += 1
+            return execute(sql, params, many, context)
+
+        timings = []
+        with connection.execute_wrapper(count_statements):
+            for _ in range(requests):
+                started = time.perf_counter()
+                close_old_connections()
+                if connection.connection is None:
+                    counts['connects'] += 1
+                connection.set_tenant(tenant)
+                Ticket.objects.only('id').first()
+                close_old_connections()
+                timings.append((time.perf_counter() - started) * 1000)
+                connection.set_schema_to_public()
+
+        self.stdout.write(self.style.SUCCESS(label))
+        self.stdout.write(
+            f'  p50={_percentile(timings, 50):.2f}ms '
+            f'p99={_percentile(timings, 99):.2f}ms '
+            f'connects={counts["connects"]} '
+            f'SET search_path={counts["set_search_path"]}'
+        )
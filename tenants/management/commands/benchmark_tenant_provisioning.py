@@ -0,0 +1,71 @@
+"""
+Management command to compare tenant creation by migration against template cloning
+Usage: python manage.py benchmark_tenant_provisioning [--count 5]
+
+Creates --count throwaway tenants per path (bench_<path>_<n>), reports
+tenants per minute and drops them again.
+"""
+import time
+import uuid
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from tenants.models import Client, Domain
+from tenants.provisioning import ensure_template, migrate_schema_only, provision_tenant, refill_spare_pool
+from tenants.sharding import tenant_shard_context
+
+
+class Command(BaseCommand):
+    help = 'Benchmark tenants/minute: full migrate vs template clone vs spare pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=5, help='Tenants to create per path')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        run_id = uuid.uuid4().hex[:6]
+        ensure_template()
+
+        results = []
+        results.append(('migrate', self._run(count, f'bench_{run_id}_m', self._create_by_migrate)))
+        results.append(('template clone', self._run(
+            count, f'bench_{run_id}_c',
+            lambda schema: provision_tenant(schema, schema, f'{schema}.bench.local', use_spare=False,
+                                            shard='default')
+        )))
+
+        refill_spare_pool(count)
+        results.append(('spare pool', self._run(
+            count, f'bench_{run_id}_s',
+            lambda schema: provision_tenant(schema, schema, f'{schema}.bench.local', refill_async=False,
+                                            shard='default')
+        )))
+
+        for label, seconds in results:
+            rate = count / seconds * 60 if seconds else 0
+            self.stdout.write(f'{label:>15}: {seconds / count * 1000:8.0f} ms/tenant  {rate:8.1f} tenants/min')
+
+    @staticmethod
+    def _create_by_migrate(schema):
+        """The pre-template path, as create_tenant_custom --migrate and start.sh did it"""
+        tenant = Client(schema_name=schema, name=schema, domain_url=f'{schema}.bench.local')
+        tenant.save()
+        Domain.objects.create(domain=tenant.domain_url, tenant=tenant, is_primary=True)
+        migrate_schema_only(schema, using=tenant.shard)
+        with tenant_shard_context(tenant):
+            call_command('setup_default_sla_policies', verbosity=0)
+
+    def _run(self, count, prefix, create):
+        schemas = [f'{prefix}{index}' for index in range(count)]
+        started = time.perf_counter()
+        try:
+            for schema in schemas:
+                create(schema)
+            return time.perf_counter() - started
+        finally:
+            connection.set_schema_to_public()
+            for tenant in Client.objects.filter(schema_name__in=schemas):
+                tenant.domains.all().delete()
+                tenant.delete(force_drop=True)
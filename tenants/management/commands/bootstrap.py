@@ -0,0 +1,110 @@
+"""
+Management command running every container start step in one process, then exec'ing the app server
+Usage: python manage.py bootstrap [--bind 0.0.0.0:8000] [--no_server] [--force_static]
+
+Replaces the separate interpreters start.sh used to launch (each paying
+for django.setup()). Every step is timed; collectstatic is skipped when a
+content hash of the source static files matches the one stored with the
+last collection.
+"""
+import hashlib
+import os
+import shlex
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from tenants.bootstrap import ensure_default_tenant
+
+STATIC_HASH_FILENAME = '.static-hash'
+
+
+def static_files_hash():
+    """sha256 over the path and content of every file collectstatic would copy"""
+    digest = hashlib.sha256(str(getattr(settings, 'STATICFILES_STORAGE', '')).encode('utf-8'))
+    found = {}
+    for finder in get_finders():
+        for path, storage in finder.list(['CVS', '.*', '*~']):
+            # First finder wins, as in collectstatic
+            found.setdefault(path, storage)
+    for path in sorted(found):
+        digest.update(path.encode('utf-8'))
+        with found[path].open(path) as handle:
+            for chunk in iter(lambda: handle.read(65536), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = 'Migrate, ensure the default tenant, collect static files (if changed) and exec the app server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bind', type=str, default=f'0.0.0.0:{os.environ.get("PORT") or 8000}',
+                          help='Address the app server binds to (default: 0.0.0.0:$PORT)')
+        parser.add_argument('--server_command', type=str,
+                          default='gunicorn -c python:helpdesk_system.gunicorn_conf helpdesk_system.wsgi:application',
+                          help='App server command; --bind is appended')
+        parser.add_argument('--no_server', action='store_true', help='Run the start steps and exit')
+        parser.add_argument('--force_static', action='store_true', help='Run collectstatic even if unchanged')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        verbosity = max(options['verbosity'] - 1, 0)
+
+        with self._step('ensure_tables', critical=False):
+            call_command('ensure_tables', verbosity=verbosity)
+        with self._step('migrate_tenants'):
+            call_command('migrate_tenants', verbosity=verbosity)
+        with self._step('default tenant', critical=False):
+            ensure_default_tenant(self.stdout)
+        with self._step('collectstatic', critical=False):
+            self._collect_static(options['force_static'], verbosity)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Bootstrap finished in {time.perf_counter() - started:.2f}s '
+            f'(database: {settings.DATABASES["default"].get("HOST")}, DEBUG: {settings.DEBUG})'
+        ))
+        if options['no_server']:
+            return
+
+        argv = shlex.split(options['server_command']) + ['--bind', options['bind']]
+        self.stdout.write(f'exec {" ".join(argv)}')
+        self.stdout.flush()
+        # Sockets would otherwise be inherited by the server process
+        connections.close_all()
+        try:
+            os.execvp(argv[0], argv)
+        except OSError as exc:
+            raise CommandError(f'Could not start "{argv[0]}": {exc}')
+
+    @contextmanager
+    def _step(self, name, critical=True):
+        """Time a step; a failing non-critical step is reported and skipped"""
+        self.stdout.write(f'==> {name}')
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as exc:
+            if critical:
+                raise
+            self.stdout.write(self.style.WARNING(f'    {name} failed, continuing: {exc}'))
+        finally:
+            self.stdout.write(f'    {name}: {time.perf_counter() - started:.2f}s')
+
+    def _collect_static(self, force, verbosity):
+        marker = os.path.join(settings.STATIC_ROOT, STATIC_HASH_FILENAME)
+        current = static_files_hash()
+        if not force and os.path.exists(marker):
+            with open(marker) as handle:
+                if handle.read().strip() == current:
+                    self.stdout.write('    static files unchanged, skipping collectstatic')
+                    return
+
+        call_command('collectstatic', interactive=False, verbosity=verbosity)
+        with open(marker, 'w') as handle:
+            handle.write(current)
@@ -1,11 +1,16 @@
 """
 Management command to create a new tenant
-Usage: python manage.py create_tenant_custom --schema_name acme --name "Acme Corp" --domain_url acme.localhost
+Usage: python manage.py create_tenant_custom --schema_name acme --name "Acme Corp" --domain_url acme.localhost [--shard shard1] [--migrate | --pooled]
+
+By default the schema is cloned from the pre-migrated template (or taken from
+the spare pool); --migrate runs every migration against an empty schema instead.
+--pooled creates no schema: the tenant's rows go to the shard's shared pool
+schema (see tenants.pooling).
 """
-from django.core.management.base import BaseCommand
-from django.core.management import call_command
-from django_tenants.utils import tenant_context
+from django.core.management.base import BaseCommand, CommandError
 from tenants.models import Client, Domain
+from tenants.pooling import create_pooled_tenant
+from tenants.provisioning import ProvisioningError, migrate_schema_only, provision_tenant
 import json
 
 
@@ -17,6 +22,12 @@ class Command(BaseCommand):
         parser.add_argument('--name', type=str, required=True, help='Tenant name (e.g., Acme Corp)')
         parser.add_argument('--domain_url', type=str, required=True, help='Domain URL (e.g., acme.localhost)')
         parser.add_argument('--brand_colors', type=str, default='{}', help='Brand colors JSON (default: {})')
+        parser.add_argument('--shard', type=str, default=None,
+                          help='Database alias for the schema (default: TENANT_NEW_SHARD or least loaded shard)')
+        parser.add_argument('--migrate', action='store_true',
+                          help='Create an empty schema and run all migrations instead of cloning the template')
+        parser.add_argument('--pooled', action='store_true',
+                          help='Keep the tenant in the shared pool schema instead of its own schema')
 
     def handle(self, *args, **options):
         schema_name = options['schema_name']
@@ -40,6 +51,33 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING(f'Invalid JSON for brand_colors, using empty dict'))
             brand_colors = {}
 
+        if options['pooled']:
+            if options['migrate']:
+                raise CommandError('--pooled and --migrate are mutually exclusive')
+            try:
+                create_pooled_tenant(schema_name, name, domain_url, brand_colors, shard=options['shard'])
+            except ProvisioningError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(self.style.SUCCESS(
+                f'Successfully created pooled tenant "{name}" with domain "{domain_url}"'
+            ))
+            return
+
+        if not options['migrate']:
+            try:
+                tenant, source = provision_tenant(schema_name, name, domain_url, brand_colors,
+                                                  shard=options['shard'])
+            except ProvisioningError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(self.style.SUCCESS(
+                f'Successfully created tenant "{name}" with schema "{schema_name}" and domain "{domain_url}" '
+                f'(from {source})'
+            ))
+            return
+
+        if options['shard'] not in (None, 'default'):
+            raise CommandError('--migrate only creates tenants on the default shard')
+
         # Create tenant (this will auto-create the schema if auto_create_schema=True)
         tenant = Client(
             schema_name=schema_name,
@@ -59,8 +97,7 @@ class Command(BaseCommand):
 
         # Run migrations on the tenant schema
         self.stdout.write(self.style.WARNING(f'Running migrations on tenant schema "{schema_name}"...'))
-        with tenant_context(tenant):
-            call_command('migrate', verbosity=1, interactive=False)
+        migrate_schema_only(schema_name, verbosity=1, using=tenant.shard)
 
         self.stdout.write(self.style.SUCCESS(
             f'Successfully created tenant "{name}" with schema "{schema_name}" and domain "{domain_url}"'
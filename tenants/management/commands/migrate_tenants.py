@@ -0,0 +1,67 @@
+"""
+Management command to migrate the shared schema and every out-of-date tenant schema
+Usage: python manage.py migrate_tenants [--workers 4] [--force] [--shard shard1]
+
+Schemas whose stored migration fingerprint matches the code are skipped; the
+rest are migrated in parallel and timed individually, one shard after another.
+"""
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from helpdesk_system.sharding import get_shards
+from tenants.provisioning import migration_fingerprint
+from tenants.schema_migrations import (
+    migrate_schemas_in_parallel, public_schema_is_current, schemas_to_migrate
+)
+
+
+class Command(BaseCommand):
+    help = 'Migrate shared and tenant schemas, skipping schemas that are already current'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'TENANT_MIGRATION_WORKERS', 4),
+                          help='Schemas migrated concurrently (one DB connection each)')
+        parser.add_argument('--force', action='store_true', help='Migrate every schema regardless of fingerprint')
+        parser.add_argument('--shard', type=str, default=None, help='Only this shard (default: every shard)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        fingerprint = migration_fingerprint()
+        migrated = skipped = 0
+        failed = []
+
+        for shard in [options['shard']] if options['shard'] else get_shards():
+            stale, current = self._migrate_shard(shard, fingerprint, options, failed)
+            migrated += len(stale)
+            skipped += len(current)
+
+        elapsed = time.perf_counter() - started
+        if failed:
+            raise CommandError(f'{len(failed)} schema(s) failed to migrate: {", ".join(failed)} ({elapsed:.1f}s)')
+        self.stdout.write(self.style.SUCCESS(
+            f'Migrated {migrated} schema(s), skipped {skipped} in {elapsed:.1f}s'
+        ))
+
+    def _migrate_shard(self, shard, fingerprint, options, failed):
+        verbosity = max(options['verbosity'] - 1, 0)
+        if options['force'] or not public_schema_is_current(shard):
+            self.stdout.write(self.style.WARNING(f'[{shard}] Migrating shared schema...'))
+            call_command('migrate_schemas', shared=True, database=shard, interactive=False, verbosity=verbosity)
+        else:
+            self.stdout.write(f'[{shard}] Shared schema is current')
+
+        stale, current = schemas_to_migrate(fingerprint, force=options['force'], using=shard)
+        self.stdout.write(f'[{shard}] Tenant schemas: {len(current)} current, {len(stale)} to migrate')
+
+        for schema_name, seconds, error in migrate_schemas_in_parallel(
+            stale, fingerprint, options['workers'], verbosity=verbosity, using=shard
+        ):
+            if error:
+                failed.append(f'{shard}:{schema_name}')
+                self.stdout.write(self.style.ERROR(f'  {schema_name}: failed after {seconds:.2f}s ({error})'))
+            else:
+                self.stdout.write(f'  {schema_name}: {seconds:.2f}s')
+        return stale, current
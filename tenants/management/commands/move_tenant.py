@@ -0,0 +1,107 @@
+"""
+Management command to move a tenant to another shard with minimal downtime
+Usage: python manage.py move_tenant --schema_name acme --to shard2 [--workers 4] [--delta_passes 3] [--drop_source]
+
+1. Export the schema (parallel COPY, one snapshot) and import it on the target.
+2. Delta passes copy what changed meanwhile, while the tenant stays live.
+3. Maintenance mode, then a last locked delta, a checksum comparison of every
+   table and the switch of Client.shard. Requests get 503 only during step 3.
+The old schema is kept renamed (moved_<timestamp>_<schema>) unless --drop_source.
+"""
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from helpdesk_system.sharding import get_shards
+from tenants.models import Client
+from tenants.provisioning import drop_schema
+from tenants.transfer import (
+    TransferError, cut_over, export_tenant, import_tenant, open_archive, retire_schema, set_maintenance,
+    sync_delta
+)
+
+
+class Command(BaseCommand):
+    help = "Move a tenant's schema to another shard (export, import, delta catch-up, cut-over)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema_name', type=str, required=True, help='Tenant to move')
+        parser.add_argument('--to', type=str, required=True, help='Target database alias')
+        parser.add_argument('--workers', type=int, default=4, help='Tables copied concurrently')
+        parser.add_argument('--delta_passes', type=int, default=3, help='Catch-up passes before the cut-over')
+        parser.add_argument('--delta_threshold', type=int, default=100,
+                          help='Stop catching up once a pass copies fewer rows than this')
+        parser.add_argument('--freeze_wait', type=float,
+                          default=getattr(settings, 'TENANT_DOMAIN_CACHE_TIMEOUT', 60),
+                          help='Seconds to wait in maintenance mode so every process sees it')
+        parser.add_argument('--archive', type=str, default=None, help='Keep the archive at this path')
+        parser.add_argument('--drop_source', action='store_true', help='Drop the old schema instead of renaming it')
+
+    def handle(self, *args, **options):
+        tenant = Client.objects.filter(schema_name=options['schema_name']).first()
+        if not tenant:
+            raise CommandError(f'Tenant "{options["schema_name"]}" not found')
+        source, target = tenant.shard, options['to']
+        if target not in get_shards():
+            raise CommandError(f'"{target}" is not a configured tenant shard')
+        if target == source:
+            raise CommandError(f'Tenant "{tenant.schema_name}" is already on {target}')
+
+        started = time.perf_counter()
+        with tempfile.TemporaryDirectory() as directory:
+            archive = options['archive'] or os.path.join(directory, f'{tenant.schema_name}.tar')
+            with self._step('export'):
+                manifest = self._run(export_tenant, tenant, archive, workers=options['workers'])
+            with self._step(f'import into {target}'):
+                with open_archive(archive) as (manifest, unpacked):
+                    self._run(import_tenant, manifest, unpacked, target, workers=options['workers'])
+
+        try:
+            since = manifest['exported_at']
+            for number in range(1, options['delta_passes'] + 1):
+                with self._step(f'delta pass {number}'):
+                    since, copied, deleted = self._run(sync_delta, tenant, target, since)
+                    self.stdout.write(f'    {copied} rows copied, {deleted} deleted')
+                if copied < options['delta_threshold']:
+                    break
+
+            with self._step('cut-over'):
+                set_maintenance(tenant, True)
+                self.stdout.write(f'    maintenance mode on, waiting {options["freeze_wait"]:.0f}s for routing caches')
+                time.sleep(options['freeze_wait'])
+                copied, deleted = self._run(cut_over, tenant, target, since, workers=options['workers'])
+        except BaseException:
+            # Unless the catalog already points at the target, the tenant stays
+            # on the source; discard the partial copy
+            if Client.objects.filter(pk=tenant.pk, shard=source).exists():
+                set_maintenance(tenant, False)
+                drop_schema(tenant.schema_name, target)
+            raise
+        self.stdout.write(f'    {copied} rows copied, {deleted} deleted, checksums match')
+
+        with self._step(f'retire schema on {source}'):
+            retired = retire_schema(tenant.schema_name, source, drop=options['drop_source'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved "{tenant.schema_name}" from {source} to {target} in {time.perf_counter() - started:.1f}s'
+            + (f'; old schema kept as "{retired}"' if retired else '')
+        ))
+
+    @staticmethod
+    def _run(func, *args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except TransferError as exc:
+            raise CommandError(str(exc))
+
+    @contextmanager
+    def _step(self, name):
+        self.stdout.write(f'==> {name}')
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stdout.write(f'    {name}: {time.perf_counter() - started:.2f}s')
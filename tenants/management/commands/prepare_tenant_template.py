@@ -0,0 +1,27 @@
+"""
+Management command to build the tenant template schema and fill the spare pool
+Usage: python manage.py prepare_tenant_template [--spares 2] [--force] [--shard shard1]
+"""
+from django.core.management.base import BaseCommand
+
+from helpdesk_system.sharding import get_shards
+from tenants.provisioning import ensure_template, get_template_schema, refill_spare_pool
+
+
+class Command(BaseCommand):
+    help = 'Build (or refresh) the pre-migrated tenant template schema and its spare pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--spares', type=int, default=None,
+                          help='Spare schemas to keep ready (default: TENANT_SPARE_POOL_SIZE)')
+        parser.add_argument('--force', action='store_true', help='Rebuild the template even if it is current')
+        parser.add_argument('--shard', type=str, default=None, help='Only this shard (default: every shard)')
+
+    def handle(self, *args, **options):
+        for shard in [options['shard']] if options['shard'] else get_shards():
+            rebuilt = ensure_template(force=options['force'], verbosity=options['verbosity'] - 1, using=shard)
+            state = 'rebuilt' if rebuilt else 'already current'
+            self.stdout.write(self.style.SUCCESS(f'[{shard}] Template schema "{get_template_schema()}" {state}'))
+
+            created = refill_spare_pool(options['spares'], using=shard)
+            self.stdout.write(self.style.SUCCESS(f'[{shard}] Spare pool refilled ({created} created)'))
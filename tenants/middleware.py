@@ -0,0 +1,62 @@
+"""
+Tenant routing middleware
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django_tenants.middleware.main import TenantMainMiddleware
+
+from helpdesk_system.sharding import activate_shard
+
+_domain_cache = {}
+_domain_cache_lock = threading.Lock()
+
+
+def invalidate_domain_cache():
+    """Drop this process's hostname -> tenant cache (called on Client/Domain changes)"""
+    with _domain_cache_lock:
+        _domain_cache.clear()
+
+
+def cache_tenant_for_hostname(hostname, tenant):
+    timeout = getattr(settings, 'TENANT_DOMAIN_CACHE_TIMEOUT', 60)
+    with _domain_cache_lock:
+        _domain_cache[hostname] = (time.monotonic() + timeout, tenant)
+
+
+class CachedTenantMainMiddleware(TenantMainMiddleware):
+    """
+    TenantMainMiddleware with a short-lived per-process hostname -> tenant cache.
+
+    The stock middleware looks the domain up in the public schema on every
+    request, which also forces SET search_path to public and back to the
+    tenant. With the cache a repeat request for the same tenant on a
+    persistent connection needs no search_path round trip at all.
+
+    The tenant's shard becomes the active one for the request. Like the
+    tenant on the connection it is not reset afterwards, so streamed
+    responses keep reading from it. Tenants in maintenance mode get 503.
+    """
+
+    def process_request(self, request):
+        response = super().process_request(request)
+        tenant = getattr(request, 'tenant', None)
+        activate_shard(getattr(tenant, 'shard', None) or DEFAULT_DB_ALIAS, tenant=tenant)
+        if response is None and getattr(tenant, 'maintenance_mode', False):
+            response = HttpResponse('This helpdesk is briefly unavailable for maintenance.', status=503)
+            response['Retry-After'] = str(getattr(settings, 'TENANT_DOMAIN_CACHE_TIMEOUT', 60))
+        return response
+
+    def get_tenant(self, domain_model, hostname):
+        cached = _domain_cache.get(hostname)
+        if cached and cached[0] > time.monotonic():
+            # process_request mutates the tenant, so hand out a copy
+            return copy.copy(cached[1])
+
+        tenant = super().get_tenant(domain_model, hostname)
+        cache_tenant_for_hostname(hostname, tenant)
+        return copy.copy(tenant)
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.8 on 2026-10-19 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='shard',
+            field=models.CharField(db_index=True, default='default', help_text="DATABASES alias holding this tenant's schema (see tenants.sharding)", max_length=63),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.8 on 2026-10-19 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0002_client_shard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='maintenance_mode',
+            field=models.BooleanField(default=False, help_text='Requests get 503 while set, e.g. during the cut-over of a shard move (tenants.transfer)'),
+        ),
+    ]
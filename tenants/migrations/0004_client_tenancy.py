@@ -0,0 +1,18 @@
+# Generated by Django 5.0.8 on 2026-10-19 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0003_client_maintenance_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='tenancy',
+            field=models.CharField(choices=[('isolated', 'Own schema'), ('pooled', 'Shared pool schema')], default='isolated', help_text='Pooled tenants keep their rows in the shared TENANT_POOL_SCHEMA (tenants.pooling)', max_length=10),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.8 on 2026-10-19 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0004_client_tenancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='customer_retention_days',
+            field=models.PositiveIntegerField(blank=True, help_text='Delete customers without tickets unchanged for this many days', null=True),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='ticket_retention_days',
+            field=models.PositiveIntegerField(blank=True, help_text='Delete Resolved/Closed tickets (and their attachments) unchanged for this many days', null=True),
+        ),
+    ]
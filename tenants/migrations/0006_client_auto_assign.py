@@ -0,0 +1,23 @@
+# Generated by Django 5.0.8 on 2026-10-19 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0005_client_retention_policy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='agent_capacity',
+            field=models.PositiveIntegerField(blank=True, help_text='Open tickets an agent may hold before auto-assignment skips them; empty uses AUTO_ASSIGN_CAPACITY', null=True),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='auto_assign',
+            field=models.BooleanField(default=False, help_text='Assign new tickets to the least-loaded staff agent'),
+        ),
+    ]
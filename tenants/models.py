@@ -7,6 +7,13 @@ class Client(TenantMixin):
     Public Schema Model - Stores tenant information
     This table is queried first to route traffic to the correct schema
     """
+    TENANCY_ISOLATED = 'isolated'
+    TENANCY_POOLED = 'pooled'
+    TENANCY_CHOICES = [
+        (TENANCY_ISOLATED, 'Own schema'),
+        (TENANCY_POOLED, 'Shared pool schema'),
+    ]
+
     name = models.CharField(max_length=100)
     schema_name = models.CharField(max_length=63, unique=True, db_index=True)
     domain_url = models.CharField(max_length=255, unique=True, db_index=True)
@@ -14,6 +21,36 @@ class Client(TenantMixin):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    shard = models.CharField(
+        max_length=63, default='default', db_index=True,
+        help_text="DATABASES alias holding this tenant's schema (see tenants.sharding)"
+    )
+    maintenance_mode = models.BooleanField(
+        default=False,
+        help_text="Requests get 503 while set, e.g. during the cut-over of a shard move (tenants.transfer)"
+    )
+    tenancy = models.CharField(
+        max_length=10, choices=TENANCY_CHOICES, default=TENANCY_ISOLATED,
+        help_text="Pooled tenants keep their rows in the shared TENANT_POOL_SCHEMA (tenants.pooling)"
+    )
+    # Retention policy, applied by tickets.tasks.purge_expired_data; empty keeps data forever
+    ticket_retention_days = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="Delete Resolved/Closed tickets (and their attachments) unchanged for this many days"
+    )
+    customer_retention_days = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="Delete customers without tickets unchanged for this many days"
+    )
+    # Automatic assignment of new tickets (tickets.services.TicketAssignmentService)
+    auto_assign = models.BooleanField(
+        default=False,
+        help_text="Assign new tickets to the least-loaded staff agent"
+    )
+    agent_capacity = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="Open tickets an agent may hold before auto-assignment skips them; empty uses AUTO_ASSIGN_CAPACITY"
+    )
 
     # django-tenants settings
     auto_create_schema = True
@@ -25,6 +62,10 @@ class Client(TenantMixin):
     def __str__(self):
         return self.name
 
+    @property
+    def is_pooled(self):
+        return self.tenancy == self.TENANCY_POOLED
+
 
 class Domain(DomainMixin):
     """
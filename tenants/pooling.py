@@ -0,0 +1,215 @@
+"""
+Pooled tenancy: small tenants sharing one schema per shard
+
+A pooled tenant (Client.tenancy == 'pooled') has no schema of its own. Its
+tickets, customers, KB articles and users live in the tables of the shard's
+TENANT_POOL_SCHEMA next to every other pooled tenant's rows, told apart by a
+tenant_id column. Isolation is enforced by PostgreSQL row-level security,
+not by the ORM: the database backend (helpdesk_system.postgresql_backend)
+points pooled tenants' sessions at the pool schema, switches to the
+unprivileged TENANT_POOL_ROLE and sets app.tenant_id to Client.id, and the
+policies below only let that role see and write rows carrying the same id.
+Raw SQL (the importer, reports) is filtered the same way as ORM queries.
+
+RLS is forced, so the policies hold for the schema owner too: a session
+that failed to switch role still only sees the tenant in app.tenant_id,
+and one without app.tenant_id sees no pool rows at all. Migrations (DDL)
+are unaffected. A new tenant_id column defaults to app.tenant_id, so
+inserts need no code change. In the public schema the pool role only gets
+the shared tables a pooled request uses (SHARED_PUBLIC_GRANTS), never the
+tenant catalog.
+
+The pool schema is migrated with the tenant schemas and stamped with the
+migration fingerprint like them (see tenants.schema_migrations); the
+policies are re-applied after every migration so new tables and unique
+constraints are covered.
+"""
+import logging
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django_tenants.postgresql_backend.base import is_valid_schema_name
+from django_tenants.utils import schema_exists
+
+from helpdesk_system.sharding import get_shards
+
+from .models import Client, Domain
+from .provisioning import (ProvisioningError, advisory_lock, get_schema_fingerprint, get_template_schema,
+                           migrate_schema_only, migration_fingerprint, set_schema_fingerprint)
+from .sharding import pick_shard, tenant_shard_context
+
+logger = logging.getLogger(__name__)
+
+TENANT_COLUMN = 'tenant_id'
+POLICY_NAME = 'pooled_tenant_isolation'
+# Framework metadata shared by every pooled tenant, like the public schema's
+SHARED_POOL_TABLES = ('django_migrations', 'django_content_type', 'auth_permission')
+# Public tables without RLS that pooled requests use, and what they may do there
+SHARED_PUBLIC_GRANTS = {
+    'django_session': 'SELECT, INSERT, UPDATE, DELETE',
+    'django_admin_log': 'SELECT, INSERT',
+}
+
+# pg_advisory_lock key serializing pool schema builds
+POOL_LOCK_ID = 726135002
+
+_CURRENT_TENANT = "NULLIF(current_setting('app.tenant_id', true), '')::integer"
+
+
+def get_pool_schema():
+    return getattr(settings, 'TENANT_POOL_SCHEMA', 'tenant_pool')
+
+
+def get_pool_role():
+    return getattr(settings, 'TENANT_POOL_ROLE', 'helpdesk_pooled_tenant')
+
+
+def _pool_tables(cursor, pool):
+    cursor.execute(
+        "SELECT c.relname FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE n.nspname = %s AND c.relkind IN ('r', 'p') AND NOT c.relispartition ORDER BY c.relname",
+        [pool]
+    )
+    return [row[0] for row in cursor.fetchall() if row[0] not in SHARED_POOL_TABLES]
+
+
+def _unique_constraints(cursor, pool, table):
+    """[(name, [columns])] of the table's UNIQUE constraints (primary keys excluded)"""
+    cursor.execute(
+        "SELECT con.conname, array_agg(a.attname ORDER BY k.ord) "
+        "FROM pg_constraint con "
+        "JOIN pg_class c ON c.oid = con.conrelid JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "CROSS JOIN LATERAL unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord) "
+        "JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = k.attnum "
+        "WHERE n.nspname = %s AND c.relname = %s AND con.contype = 'u' "
+        "GROUP BY con.conname ORDER BY con.conname",
+        [pool, table]
+    )
+    return cursor.fetchall()
+
+
+def apply_pool_policies(using=DEFAULT_DB_ALIAS):
+    """
+    Add the tenant_id column, its index and the isolation policy to every
+    pool table, scope UNIQUE constraints per tenant and grant the pool role
+    what the app needs. Idempotent; run as the schema owner.
+    """
+    pool = get_pool_schema()
+    role = get_pool_role()
+    shard = connections[using]
+    quote = shard.ops.quote_name
+    shard.set_schema_to_public()
+
+    with transaction.atomic(using=using), shard.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_roles WHERE rolname = %s', [role])
+        if not cursor.fetchone():
+            cursor.execute(f'CREATE ROLE {quote(role)} NOLOGIN')
+        # The app's login role switches to it with SET ROLE
+        cursor.execute(f'GRANT {quote(role)} TO CURRENT_USER')
+
+        for table in _pool_tables(cursor, pool):
+            qualified = f'{quote(pool)}.{quote(table)}'
+            cursor.execute(
+                f'ALTER TABLE {qualified} ADD COLUMN IF NOT EXISTS {TENANT_COLUMN} integer NOT NULL '
+                f'DEFAULT {_CURRENT_TENANT}'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {quote(table[:44] + "_pool_tenant_idx")} '
+                f'ON {qualified} ({TENANT_COLUMN})'
+            )
+            cursor.execute(f'ALTER TABLE {qualified} ENABLE ROW LEVEL SECURITY')
+            cursor.execute(f'ALTER TABLE {qualified} FORCE ROW LEVEL SECURITY')
+            cursor.execute(f'DROP POLICY IF EXISTS {POLICY_NAME} ON {qualified}')
+            cursor.execute(
+                f'CREATE POLICY {POLICY_NAME} ON {qualified} '
+                f'USING ({TENANT_COLUMN} = {_CURRENT_TENANT}) '
+                f'WITH CHECK ({TENANT_COLUMN} = {_CURRENT_TENANT})'
+            )
+            # customers.email, auth_user.username, ... are unique per tenant, not per pool
+            for name, columns in _unique_constraints(cursor, pool, table):
+                if TENANT_COLUMN in columns:
+                    continue
+                scoped = ', '.join(quote(column) for column in [TENANT_COLUMN] + list(columns))
+                cursor.execute(
+                    f'ALTER TABLE {qualified} DROP CONSTRAINT {quote(name)}, '
+                    f'ADD CONSTRAINT {quote(name)} UNIQUE ({scoped})'
+                )
+
+        cursor.execute(f'GRANT USAGE ON SCHEMA {quote(pool)} TO {quote(role)}')
+        cursor.execute(f'GRANT SELECT, INSERT, UPDATE, DELETE ON ALL TABLES IN SCHEMA {quote(pool)} TO {quote(role)}')
+        cursor.execute(f'GRANT USAGE, SELECT, UPDATE ON ALL SEQUENCES IN SCHEMA {quote(pool)} TO {quote(role)}')
+
+        # Public holds the tenant catalog and other unprotected shared tables:
+        # drop any earlier blanket grant and allow only what requests need
+        cursor.execute(f'GRANT USAGE ON SCHEMA public TO {quote(role)}')
+        cursor.execute(f'REVOKE ALL ON ALL TABLES IN SCHEMA public FROM {quote(role)}')
+        cursor.execute(f'REVOKE ALL ON ALL SEQUENCES IN SCHEMA public FROM {quote(role)}')
+        for table, privileges in SHARED_PUBLIC_GRANTS.items():
+            cursor.execute('SELECT to_regclass(%s)', [f'public.{quote(table)}'])
+            if cursor.fetchone()[0] is not None:
+                cursor.execute(f'GRANT {privileges} ON TABLE public.{quote(table)} TO {quote(role)}')
+
+
+def ensure_pool(force=False, verbosity=0, using=DEFAULT_DB_ALIAS):
+    """
+    Create and migrate the shard's pool schema when it is missing or built
+    from an older set of migrations. Returns True when it was (re)built.
+    """
+    pool = get_pool_schema()
+    fingerprint = migration_fingerprint()
+    shard = connections[using]
+    shard.set_schema_to_public()
+    if not force and schema_exists(pool, using) and get_schema_fingerprint(pool, using) == fingerprint:
+        return False
+
+    with advisory_lock(POOL_LOCK_ID, using):
+        if not force and schema_exists(pool, using) and get_schema_fingerprint(pool, using) == fingerprint:
+            return False
+
+        logger.info(f'[pooling] Migrating pool schema "{pool}" on {using}')
+        with shard.cursor() as cursor:
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {shard.ops.quote_name(pool)}')
+        migrate_schema_only(pool, verbosity, using)
+        apply_pool_policies(using)
+        set_schema_fingerprint(pool, fingerprint, using)
+        return True
+
+
+def create_pooled_tenant(schema_name, name, domain_url, brand_colors=None, shard=None):
+    """
+    Register a pooled tenant on `shard` (or the one pick_shard() chooses)
+    and seed its default SLA policies. schema_name stays the tenant's
+    unique key; no schema of that name is created.
+    """
+    if not getattr(settings, 'TENANT_POOLED_TENANCY', False):
+        raise ProvisioningError('Pooled tenancy is disabled (TENANT_POOLED_TENANCY)')
+    shard = shard or pick_shard()
+    if shard not in get_shards():
+        raise ProvisioningError(f'"{shard}" is not a configured tenant shard')
+    if not is_valid_schema_name(schema_name) or schema_name in (get_pool_schema(), get_template_schema()):
+        raise ProvisioningError(f'"{schema_name}" is not a valid tenant schema name')
+    if Client.objects.filter(schema_name=schema_name).exists() or schema_exists(schema_name, shard):
+        raise ProvisioningError(f'Schema "{schema_name}" already exists')
+    if Client.objects.filter(domain_url=domain_url).exists():
+        raise ProvisioningError(f'Tenant with domain_url "{domain_url}" already exists')
+
+    ensure_pool(using=shard)
+
+    connections[DEFAULT_DB_ALIAS].set_schema_to_public()
+    with transaction.atomic():
+        tenant = Client(
+            schema_name=schema_name,
+            name=name,
+            domain_url=domain_url,
+            brand_colors=brand_colors or {},
+            shard=shard,
+            tenancy=Client.TENANCY_POOLED,
+        )
+        tenant.auto_create_schema = False
+        tenant.save()
+        Domain.objects.create(domain=domain_url, tenant=tenant, is_primary=True)
+
+    with tenant_shard_context(tenant):
+        call_command('setup_default_sla_policies', verbosity=0)
+    return tenant
@@ -0,0 +1,274 @@
+"""
+Tenant provisioning by cloning a template schema
+
+Running every tenant migration against an empty schema takes seconds per
+tenant. Instead, one template schema is kept fully migrated and seeded
+(default SLA policies); a new tenant is a server-side copy of it made by
+django-tenants' clone_schema() function, including the django_migrations
+rows, so nothing has to be migrated or faked afterwards.
+
+A small pool of spare schemas, already cloned from the template, makes
+sign-up a rename: ALTER SCHEMA spare_x RENAME TO acme.
+
+Every schema made here is stamped with the migration fingerprint of the
+code that built it (COMMENT ON SCHEMA), so stale templates and spares are
+detected and rebuilt after a deploy that adds migrations.
+
+Each shard (see tenants.sharding) keeps its own template and spare pool;
+the functions below take the shard's database alias as `using`.
+"""
+import hashlib
+import logging
+import uuid
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connection, connections, transaction
+from django.db.migrations.loader import MigrationLoader
+from django_tenants.clone import CLONE_SCHEMA_FUNCTION
+from django_tenants.postgresql_backend.base import is_valid_schema_name
+from django_tenants.utils import schema_context, schema_exists
+
+from helpdesk_system.sharding import get_shards, shard_context
+
+from .models import Client, Domain
+from .sharding import pick_shard
+
+logger = logging.getLogger(__name__)
+
+SPARE_SCHEMA_PREFIX = 'spare_'
+
+# pg_advisory_lock key serializing template rebuilds
+TEMPLATE_LOCK_ID = 726135001
+
+
+class ProvisioningError(Exception):
+    pass
+
+
+def get_template_schema():
+    return getattr(settings, 'TENANT_TEMPLATE_SCHEMA', 'tenant_template')
+
+
+def _tenant_app_labels():
+    tenant_apps = set(settings.TENANT_APPS)
+    return {config.label for config in apps.get_app_configs() if config.name in tenant_apps}
+
+
+def migration_fingerprint():
+    """Hash of every tenant-app migration shipped with the code"""
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    labels = _tenant_app_labels()
+    names = sorted(f'{app}.{name}' for app, name in loader.disk_migrations if app in labels)
+    return hashlib.sha256('\n'.join(names).encode('utf-8')).hexdigest()[:32]
+
+
+def get_schema_fingerprint(schema_name, using=DEFAULT_DB_ALIAS):
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT obj_description(oid, 'pg_namespace') FROM pg_namespace WHERE nspname = %s",
+            [schema_name]
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def set_schema_fingerprint(schema_name, fingerprint, using=DEFAULT_DB_ALIAS):
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'COMMENT ON SCHEMA {connection.ops.quote_name(schema_name)} IS %s',
+            [fingerprint]
+        )
+
+
+def drop_schema(schema_name, using=DEFAULT_DB_ALIAS):
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DROP SCHEMA IF EXISTS {connection.ops.quote_name(schema_name)} CASCADE')
+
+
+def _ensure_clone_function(using=DEFAULT_DB_ALIAS):
+    """
+    Install django-tenants' clone_schema() SQL function up front. Its
+    CloneSchema wrapper would probe for it with a failing query and commit
+    (neither may happen inside the provisioning transaction), and it only
+    knows the default database.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT to_regproc('public.clone_schema') IS NOT NULL")
+        if not cursor.fetchone()[0]:
+            db_user = settings.DATABASES[using].get('USER') or 'postgres'
+            cursor.execute(CLONE_SCHEMA_FUNCTION.format(db_user=db_user))
+
+
+def clone_schema(source, dest, fingerprint, using=DEFAULT_DB_ALIAS):
+    connections[using].set_schema_to_public()
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT clone_schema(%s, %s, true, false)', [source, dest])
+    set_schema_fingerprint(dest, fingerprint, using)
+
+
+@contextmanager
+def advisory_lock(lock_id, using=DEFAULT_DB_ALIAS):
+    """
+    Hold a session-level pg_advisory_lock on a dedicated connection to the
+    shard. migrate_schemas closes the shard's regular connection once it is
+    done, which would silently release a lock taken there.
+    """
+    lock_connection = connections.create_connection(using)
+    try:
+        with lock_connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_lock(%s)', [lock_id])
+        yield
+    finally:
+        # Closing the session releases the lock
+        lock_connection.close()
+
+
+def migrate_schema_only(schema_name, verbosity=0, using=DEFAULT_DB_ALIAS):
+    """
+    Apply the tenant-app migrations to one schema on one shard. A bare
+    `migrate` would run migrate_schemas over public and every Client
+    instead, and never reach a schema that is not a tenant.
+    """
+    call_command('migrate_schemas', schema_name=schema_name, database=using,
+                 interactive=False, verbosity=verbosity)
+    connections[using].set_schema_to_public()
+
+
+def _template_is_current(template, fingerprint, using):
+    return schema_exists(template, using) and get_schema_fingerprint(template, using) == fingerprint
+
+
+def ensure_template(force=False, verbosity=0, using=DEFAULT_DB_ALIAS):
+    """
+    Build (or rebuild, when the code has new migrations) the template schema
+    on one shard. Returns True when it was rebuilt.
+    """
+    template = get_template_schema()
+    fingerprint = migration_fingerprint()
+    shard = connections[using]
+    shard.set_schema_to_public()
+    _ensure_clone_function(using)
+    if not force and _template_is_current(template, fingerprint, using):
+        return False
+
+    # Several processes may notice a stale template after a deploy; one rebuilds it
+    with advisory_lock(TEMPLATE_LOCK_ID, using):
+        if not force and _template_is_current(template, fingerprint, using):
+            return False
+
+        logger.info(f'[provisioning] Building template schema "{template}" on {using}')
+        drop_schema(template, using)
+        with shard.cursor() as cursor:
+            cursor.execute(f'CREATE SCHEMA {shard.ops.quote_name(template)}')
+        migrate_schema_only(template, verbosity, using)
+        # migrate_schemas leaves the connection on public (and closed)
+        with schema_context(template), shard_context(using, schema_name=template):
+            call_command('setup_default_sla_policies', verbosity=verbosity)
+        shard.set_schema_to_public()
+        set_schema_fingerprint(template, fingerprint, using)
+        return True
+
+
+def list_spares(using=DEFAULT_DB_ALIAS):
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT nspname, obj_description(oid, 'pg_namespace') FROM pg_namespace "
+            "WHERE nspname LIKE %s ORDER BY nspname",
+            [SPARE_SCHEMA_PREFIX.replace('_', '\\_') + '%']
+        )
+        return cursor.fetchall()
+
+
+def refill_spare_pool(size=None, using=DEFAULT_DB_ALIAS):
+    """
+    Drop spares built from an older schema and clone new ones from the
+    template until the shard's pool holds `size` current spares. Returns
+    the count created.
+    """
+    size = getattr(settings, 'TENANT_SPARE_POOL_SIZE', 2) if size is None else size
+    ensure_template(using=using)
+    fingerprint = get_schema_fingerprint(get_template_schema(), using)
+
+    current = 0
+    for schema_name, spare_fingerprint in list_spares(using):
+        if spare_fingerprint == fingerprint:
+            current += 1
+        else:
+            drop_schema(schema_name, using)
+
+    created = 0
+    while current + created < size:
+        clone_schema(get_template_schema(), f'{SPARE_SCHEMA_PREFIX}{uuid.uuid4().hex[:12]}', fingerprint, using)
+        created += 1
+    return created
+
+
+def _claim_spare(schema_name, fingerprint, using=DEFAULT_DB_ALIAS):
+    """Rename a current spare to schema_name. Returns False when none is left."""
+    for spare, spare_fingerprint in list_spares(using):
+        if spare_fingerprint != fingerprint:
+            continue
+        try:
+            # Concurrent claimers block on the same rename; the loser gets an error and moves on
+            with transaction.atomic(using=using), connections[using].cursor() as cursor:
+                cursor.execute(
+                    f'ALTER SCHEMA {connection.ops.quote_name(spare)} '
+                    f'RENAME TO {connection.ops.quote_name(schema_name)}'
+                )
+            return True
+        except DatabaseError:
+            continue
+    return False
+
+
+def provision_tenant(schema_name, name, domain_url, brand_colors=None, use_spare=True, refill_async=True,
+                     shard=None):
+    """
+    Create a tenant from the template: claim a spare schema if one is ready,
+    otherwise clone the template. The schema goes to `shard`, or to the one
+    pick_shard() chooses. Returns (tenant, source) with source 'spare' or
+    'template'. Claiming a spare queues a pool refill unless refill_async
+    is False.
+    """
+    shard = shard or pick_shard()
+    if shard not in get_shards():
+        raise ProvisioningError(f'"{shard}" is not a configured tenant shard')
+    if not is_valid_schema_name(schema_name) or schema_name.startswith(SPARE_SCHEMA_PREFIX) \
+            or schema_name in (get_template_schema(), getattr(settings, 'TENANT_POOL_SCHEMA', 'tenant_pool')):
+        raise ProvisioningError(f'"{schema_name}" is not a valid tenant schema name')
+    if Client.objects.filter(schema_name=schema_name).exists() or schema_exists(schema_name, shard):
+        raise ProvisioningError(f'Schema "{schema_name}" already exists')
+    if Client.objects.filter(domain_url=domain_url).exists():
+        raise ProvisioningError(f'Tenant with domain_url "{domain_url}" already exists')
+
+    ensure_template(using=shard)
+    fingerprint = get_schema_fingerprint(get_template_schema(), shard)
+
+    connection.set_schema_to_public()
+    # On the default shard this is one transaction. On another shard the
+    # catalog rows commit first; a failure writing them rolls the schema back.
+    with transaction.atomic(using=shard):
+        source = 'spare' if use_spare and _claim_spare(schema_name, fingerprint, shard) else 'template'
+        if source == 'template':
+            clone_schema(get_template_schema(), schema_name, fingerprint, shard)
+
+        with transaction.atomic():
+            tenant = Client(
+                schema_name=schema_name,
+                name=name,
+                domain_url=domain_url,
+                brand_colors=brand_colors or {},
+                shard=shard,
+            )
+            # The schema already exists and is fully migrated
+            tenant.auto_create_schema = False
+            tenant.save()
+            Domain.objects.create(domain=domain_url, tenant=tenant, is_primary=True)
+
+    if source == 'spare' and refill_async:
+        from .tasks import refill_tenant_spare_pool
+        refill_tenant_spare_pool.delay(shard)
+    return tenant, source
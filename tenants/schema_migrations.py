@@ -0,0 +1,93 @@
+"""
+Deploy-time schema migrations that skip schemas which are already current
+
+Every tenant schema carries the migration fingerprint of the code that last
+migrated it (COMMENT ON SCHEMA, see tenants.provisioning). One query reads
+all fingerprints; only schemas whose fingerprint differs from the code are
+migrated, by a bounded pool of worker processes, each with its own
+database connection. Every shard is handled the same way.
+
+The shard's pool schema (tenants.pooling) is migrated like a tenant schema
+and gets its row-level security policies re-applied; pooled tenants have
+no schema of their own and are skipped.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django_tenants.utils import get_public_schema_name
+
+from .models import Client
+from .pooling import apply_pool_policies, get_pool_schema
+from .provisioning import set_schema_fingerprint
+
+
+def public_schema_is_current(using=DEFAULT_DB_ALIAS):
+    """True when the shard's public schema has no unapplied migrations"""
+    connections[using].set_schema_to_public()
+    executor = MigrationExecutor(connections[using])
+    return not executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+def schemas_to_migrate(fingerprint, force=False, using=DEFAULT_DB_ALIAS):
+    """Split the shard's tenant schemas into (stale, current) with a single catalog query"""
+    schema_names = list(Client.objects.exclude(schema_name=get_public_schema_name()).filter(shard=using)
+                        .exclude(tenancy=Client.TENANCY_POOLED)
+                        .order_by('schema_name').values_list('schema_name', flat=True))
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT nspname, obj_description(oid, 'pg_namespace') FROM pg_namespace WHERE nspname = ANY(%s)",
+            [schema_names + [get_pool_schema()]]
+        )
+        stamped = dict(cursor.fetchall())
+    if get_pool_schema() in stamped:
+        schema_names.append(get_pool_schema())
+
+    stale, current = [], []
+    for schema_name in schema_names:
+        if not force and stamped.get(schema_name) == fingerprint:
+            current.append(schema_name)
+        else:
+            stale.append(schema_name)
+    return stale, current
+
+
+def migrate_schema(schema_name, fingerprint, verbosity=0, using=DEFAULT_DB_ALIAS):
+    """
+    Migrate one tenant schema and stamp it. Runs inside a worker process.
+    Returns (schema_name, seconds, error message or None).
+    """
+    started = time.perf_counter()
+    try:
+        call_command('migrate_schemas', schema_name=schema_name, database=using,
+                     interactive=False, verbosity=verbosity)
+        connections[using].set_schema_to_public()
+        if schema_name == get_pool_schema():
+            apply_pool_policies(using)
+        set_schema_fingerprint(schema_name, fingerprint, using)
+        error = None
+    except Exception as exc:
+        error = f'{exc.__class__.__name__}: {exc}'
+    finally:
+        connections[using].close()
+    return schema_name, time.perf_counter() - started, error
+
+
+def migrate_schemas_in_parallel(schema_names, fingerprint, workers, verbosity=0, using=DEFAULT_DB_ALIAS):
+    """Yield (schema_name, seconds, error) as each schema finishes"""
+    if workers <= 1 or len(schema_names) <= 1:
+        for schema_name in schema_names:
+            yield migrate_schema(schema_name, fingerprint, verbosity, using)
+        return
+
+    # Forked workers must not share the parent's connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=min(workers, len(schema_names))) as pool:
+        futures = [
+            pool.submit(migrate_schema, schema_name, fingerprint, verbosity, using)
+            for schema_name in schema_names
+        ]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,55 @@
+"""
+Tenant -> shard mapping
+
+Client.shard names the DATABASES alias holding the tenant's schema. Code
+that works on a tenant outside a request uses tenant_shard_context()
+instead of django-tenants' tenant_context(); periodic jobs iterate
+tenants_by_shard() so each shard is processed separately.
+"""
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count
+from django_tenants.utils import get_public_schema_name, tenant_context
+
+from helpdesk_system.sharding import get_shards, shard_context
+
+from .models import Client
+
+
+def get_tenant_shard(tenant):
+    alias = getattr(tenant, 'shard', None) or DEFAULT_DB_ALIAS
+    if alias not in settings.DATABASES:
+        raise ImproperlyConfigured(
+            f'Tenant "{tenant.schema_name}" is on shard "{alias}", which is not in DATABASES'
+        )
+    return alias
+
+
+@contextmanager
+def tenant_shard_context(tenant):
+    """tenant_context() that also routes tenant models to the tenant's shard"""
+    with tenant_context(tenant), shard_context(get_tenant_shard(tenant), tenant=tenant):
+        yield
+
+
+def tenants_by_shard(queryset=None):
+    """OrderedDict of shard alias -> tenants on it, in TENANT_SHARDS order"""
+    if queryset is None:
+        queryset = Client.objects.exclude(schema_name=get_public_schema_name())
+    grouped = OrderedDict((alias, []) for alias in get_shards())
+    for tenant in queryset.order_by('shard', 'schema_name'):
+        grouped.setdefault(tenant.shard, []).append(tenant)
+    return grouped
+
+
+def pick_shard():
+    """TENANT_NEW_SHARD, or else the configured shard holding the fewest tenants"""
+    configured = getattr(settings, 'TENANT_NEW_SHARD', '')
+    if configured:
+        return configured
+    counts = dict(Client.objects.values_list('shard').annotate(total=Count('id')).order_by())
+    return min(get_shards(), key=lambda alias: counts.get(alias, 0))
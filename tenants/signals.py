@@ -0,0 +1,14 @@
+"""
+Signal handlers for tenant metadata changes
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .middleware import invalidate_domain_cache
+from .models import Client, Domain
+
+
+@receiver([post_save, post_delete], sender=Client)
+@receiver([post_save, post_delete], sender=Domain)
+def clear_domain_cache(sender, **kwargs):
+    invalidate_domain_cache()
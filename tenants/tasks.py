@@ -0,0 +1,17 @@
+"""
+Celery tasks for tenant provisioning
+"""
+from celery import shared_task
+
+from helpdesk_system.sharding import get_shards
+from .provisioning import refill_spare_pool
+
+
+@shared_task
+def refill_tenant_spare_pool(shard=None):
+    """
+    Keep TENANT_SPARE_POOL_SIZE pre-cloned schemas ready for new tenants on each shard
+    Runs every few minutes via Celery Beat and right after a spare is claimed
+    """
+    created = {alias: refill_spare_pool(using=alias) for alias in ([shard] if shard else get_shards())}
+    return f"Spare tenant schemas created: {created}"
@@ -0,0 +1,524 @@
+"""
+Moving a tenant schema between shards
+
+A tenant is exported as a portable archive: a tar holding one gzip'd CSV
+COPY stream per table and manifest.json (tenant metadata, migration
+fingerprint, row count and sha256 per table, sequence values). Tables are
+copied in parallel, each worker on its own connection but all reading the
+same exported snapshot, so the archive is consistent without locking.
+
+Importing clones the target shard's template schema (same structure, see
+tenants.provisioning), empties it and loads the tables in foreign-key
+order, tables of one level in parallel. While the tenant stays live on the
+source, delta passes copy the rows changed since the previous pass (by
+updated_at, or created_at for append-only tables; other tables are copied
+whole) and remove deleted rows.
+The cut-over runs one last delta with the source tables locked against
+writes, compares row counts and checksums of every table on both sides
+and only then points Client.shard at the target.
+"""
+import gzip
+import hashlib
+import json
+import os
+import tarfile
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django_tenants.utils import schema_exists
+
+from .models import Client, Domain
+from .provisioning import (
+    clone_schema, drop_schema, ensure_template, get_schema_fingerprint, get_template_schema,
+    migration_fingerprint
+)
+from .sharding import get_tenant_shard
+
+ARCHIVE_FORMAT = 1
+MANIFEST_NAME = 'manifest.json'
+
+# Spool delta COPY streams to disk past this size
+_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+# updated_at is set from the application clock before commit, so a row can
+# become visible after a pass whose watermark is later than its updated_at
+DELTA_OVERLAP = timedelta(minutes=2)
+
+# Tables whose rows never change after insert: table -> insert timestamp column
+APPEND_ONLY_TABLES = {'ticket_activity': 'created_at'}
+
+_TABLES_SQL = """
+SELECT c.relname,
+       array_agg(a.attname::text ORDER BY a.attnum),
+       (SELECT array_agg(pa.attname::text ORDER BY array_position(i.indkey::int2[], pa.attnum))
+          FROM pg_index i
+          JOIN pg_attribute pa ON pa.attrelid = i.indrelid AND pa.attnum = ANY(i.indkey)
+         WHERE i.indrelid = c.oid AND i.indisprimary)
+  FROM pg_class c
+  JOIN pg_namespace n ON n.oid = c.relnamespace
+  JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped AND a.attgenerated = ''
+ WHERE n.nspname = %s AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+ GROUP BY c.oid, c.relname
+ ORDER BY c.relname
+"""
+
+_FOREIGN_KEYS_SQL = """
+SELECT c.relname, p.relname
+  FROM pg_constraint k
+  JOIN pg_class c ON c.oid = k.conrelid
+  JOIN pg_class p ON p.oid = k.confrelid
+  JOIN pg_namespace n ON n.oid = c.relnamespace
+ WHERE k.contype = 'f' AND n.nspname = %s AND p.relnamespace = n.oid
+"""
+
+
+class TransferError(Exception):
+    pass
+
+
+class _DigestWriter:
+    """File-like sink for COPY ... TO STDOUT that hashes what passes through"""
+
+    def __init__(self, target=None):
+        self.sha256 = hashlib.sha256()
+        self.target = target
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.sha256.update(data)
+        if self.target is not None:
+            self.target.write(data)
+        return len(data)
+
+
+def _qn(*names):
+    quote = connections['default'].ops.quote_name
+    return '.'.join(quote(name) for name in names)
+
+
+def _column_list(columns):
+    return ', '.join(_qn(column) for column in columns)
+
+
+def describe_tables(cursor, schema_name):
+    """Tables of a schema as dicts: name, columns, pk, depends_on (FK parents in the schema)"""
+    cursor.execute(_TABLES_SQL, [schema_name])
+    tables = [
+        {'name': name, 'columns': list(columns), 'pk': list(pk or []), 'depends_on': []}
+        for name, columns, pk in cursor.fetchall()
+    ]
+    by_name = {table['name']: table for table in tables}
+    cursor.execute(_FOREIGN_KEYS_SQL, [schema_name])
+    for child, parent in cursor.fetchall():
+        if child in by_name and parent != child and parent not in by_name[child]['depends_on']:
+            by_name[child]['depends_on'].append(parent)
+    return tables
+
+
+def _load_levels(tables):
+    """Group tables so every table comes after the tables it references"""
+    remaining = {table['name']: set(table['depends_on']) for table in tables}
+    levels = []
+    while remaining:
+        ready = sorted(name for name, parents in remaining.items() if not parents & remaining.keys())
+        if not ready:
+            # Reference cycle: load the rest one after another in one transaction
+            levels.append((sorted(remaining), False))
+            break
+        levels.append((ready, True))
+        for name in ready:
+            del remaining[name]
+    return levels
+
+
+def _select_sql(schema_name, table, where=''):
+    order_by = _column_list(table['pk'] or table['columns'])
+    return (f'SELECT {_column_list(table["columns"])} FROM {_qn(schema_name, table["name"])}'
+            f'{where} ORDER BY {order_by}')
+
+
+def _copy_out(cursor, schema_name, table, sink, where=''):
+    cursor.copy_expert(f'COPY ({_select_sql(schema_name, table, where)}) TO STDOUT WITH (FORMAT csv)', sink)
+    return cursor.rowcount
+
+
+def _sequence_values(cursor, schema_name):
+    cursor.execute('SELECT sequencename, last_value FROM pg_sequences WHERE schemaname = %s', [schema_name])
+    return dict(cursor.fetchall())
+
+
+def _set_sequences(cursor, schema_name, sequences):
+    for name, value in sequences.items():
+        cursor.execute('SELECT setval(%s::regclass, %s, %s)',
+                       [_qn(schema_name, name), value or 1, value is not None])
+
+
+def _use_snapshot(cursor, snapshot):
+    cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY')
+    cursor.execute('SET TRANSACTION SNAPSHOT %s', [snapshot])
+
+
+def _in_worker(using, func, *args):
+    """Run func in a pool thread on that thread's own connection, closed afterwards"""
+    try:
+        return func(*args)
+    finally:
+        connections[using].close()
+
+
+def _table_digest(using, schema_name, table):
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        sink = _DigestWriter()
+        rows = _copy_out(cursor, schema_name, table, sink)
+    return table['name'], rows, sink.sha256.hexdigest()
+
+
+def table_digests(using, schema_name, tables, workers=4):
+    """{table: (rows, sha256)} computed the same way as for the archive"""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(
+            lambda table: _in_worker(using, _table_digest, using, schema_name, table), tables
+        )
+        return {name: (rows, digest) for name, rows, digest in results}
+
+
+def _export_table(using, snapshot, schema_name, table, directory):
+    entry = dict(table, file=f'{table["name"]}.csv.gz')
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        _use_snapshot(cursor, snapshot)
+        with gzip.open(os.path.join(directory, entry['file']), 'wb') as stream:
+            sink = _DigestWriter(stream)
+            entry['rows'] = _copy_out(cursor, schema_name, table, sink)
+    entry['sha256'] = sink.sha256.hexdigest()
+    return entry
+
+
+def _check_isolated(tenant):
+    if tenant.is_pooled:
+        raise TransferError(f'Tenant "{tenant.schema_name}" is pooled; only tenants with their own schema can be moved')
+
+
+def export_tenant(tenant, output_path, workers=4):
+    """
+    Write the tenant's schema to a tar archive at output_path. Returns the manifest;
+    manifest['exported_at'] is the starting point for the first delta pass.
+    """
+    _check_isolated(tenant)
+    using = get_tenant_shard(tenant)
+    schema_name = tenant.schema_name
+    fingerprint = migration_fingerprint()
+    stamped = get_schema_fingerprint(schema_name, using)
+    if stamped and stamped != fingerprint:
+        raise TransferError(f'Schema "{schema_name}" is not migrated to the current code; run migrate_tenants first')
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The exported snapshot lives as long as this transaction
+        with transaction.atomic(using=using), connections[using].cursor() as cursor:
+            cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY')
+            cursor.execute('SELECT pg_export_snapshot(), now()')
+            snapshot, exported_at = cursor.fetchone()
+            tables = describe_tables(cursor, schema_name)
+            sequences = _sequence_values(cursor, schema_name)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                tables = list(pool.map(
+                    lambda table: _in_worker(using, _export_table, using, snapshot, schema_name, table, directory),
+                    tables
+                ))
+
+        manifest = {
+            'format': ARCHIVE_FORMAT,
+            'fingerprint': fingerprint,
+            'exported_at': exported_at.isoformat(),
+            'source_shard': using,
+            'tenant': {
+                'schema_name': schema_name,
+                'name': tenant.name,
+                'domain_url': tenant.domain_url,
+                'brand_colors': tenant.brand_colors,
+                'domains': list(Domain.objects.filter(tenant=tenant).values_list('domain', 'is_primary')),
+            },
+            'sequences': sequences,
+            'tables': tables,
+        }
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+        with open(manifest_path, 'w') as handle:
+            json.dump(manifest, handle, indent=2)
+
+        with tarfile.open(output_path, 'w') as archive:
+            archive.add(manifest_path, arcname=MANIFEST_NAME)
+            for table in tables:
+                archive.add(os.path.join(directory, table['file']), arcname=table['file'])
+    return manifest
+
+
+@contextmanager
+def open_archive(path):
+    """Unpack an archive into a temporary directory; yields (manifest, directory)"""
+    with tempfile.TemporaryDirectory() as directory, tarfile.open(path, 'r') as archive:
+        manifest = json.load(archive.extractfile(MANIFEST_NAME))
+        if manifest.get('format') != ARCHIVE_FORMAT:
+            raise TransferError(f'Unsupported archive format {manifest.get("format")}')
+        for table in manifest['tables']:
+            # Never trust member paths from the archive
+            with archive.extractfile(table['file']) as source, \
+                    open(os.path.join(directory, os.path.basename(table['file'])), 'wb') as target:
+                for chunk in iter(lambda: source.read(1024 * 1024), b''):
+                    target.write(chunk)
+        yield manifest, directory
+
+
+def _load_table(using, schema_name, table, directory):
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        with gzip.open(os.path.join(directory, os.path.basename(table['file'])), 'rb') as stream:
+            cursor.copy_expert(
+                f'COPY {_qn(schema_name, table["name"])} ({_column_list(table["columns"])}) '
+                f'FROM STDIN WITH (FORMAT csv)',
+                stream
+            )
+
+
+def import_tenant(manifest, directory, using, schema_name=None, workers=4):
+    """
+    Load an unpacked archive into a new schema on shard `using` and verify
+    every table against the manifest. Creates no catalog rows. The schema is
+    dropped again if anything fails.
+    """
+    schema_name = schema_name or manifest['tenant']['schema_name']
+    fingerprint = migration_fingerprint()
+    if manifest['fingerprint'] != fingerprint:
+        raise TransferError('The archive was made by code with different migrations than this one')
+    if schema_exists(schema_name, using):
+        raise TransferError(f'Schema "{schema_name}" already exists on {using}')
+
+    ensure_template(using=using)
+    connections[using].set_schema_to_public()
+    clone_schema(get_template_schema(), schema_name, fingerprint, using)
+    try:
+        tables = manifest['tables']
+        with transaction.atomic(using=using), connections[using].cursor() as cursor:
+            target_tables = describe_tables(cursor, schema_name)
+            expected = {table['name']: table['columns'] for table in tables}
+            if {table['name']: table['columns'] for table in target_tables} != expected:
+                raise TransferError(f'Tables in the archive do not match the schema on {using}')
+            # Template seed data (default SLA policies) is replaced by the tenant's own
+            cursor.execute(f'TRUNCATE {", ".join(_qn(schema_name, name) for name in expected)}')
+
+        by_name = {table['name']: table for table in tables}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for names, parallel in _load_levels(tables):
+                if parallel:
+                    list(pool.map(
+                        lambda name: _in_worker(using, _load_table, using, schema_name, by_name[name], directory),
+                        names
+                    ))
+                else:
+                    with transaction.atomic(using=using):
+                        for name in names:
+                            _load_table(using, schema_name, by_name[name], directory)
+
+        with connections[using].cursor() as cursor:
+            _set_sequences(cursor, schema_name, manifest['sequences'])
+
+        digests = table_digests(using, schema_name, tables, workers)
+        mismatches = [
+            table['name'] for table in tables
+            if digests[table['name']] != (table['rows'], table['sha256'])
+        ]
+        if mismatches:
+            raise TransferError(f'Row count or checksum mismatch after import: {", ".join(mismatches)}')
+    except Exception:
+        drop_schema(schema_name, using)
+        raise
+    return schema_name
+
+
+@contextmanager
+def _source_transaction(schema_name, using, lock=False):
+    """
+    Transaction on the source shard yielding (cursor, tables, now).
+    Without lock it reads one snapshot; with lock, writes to every table of
+    the schema are blocked until it ends (reads still go through).
+    """
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        if not lock:
+            cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY')
+        tables = describe_tables(cursor, schema_name)
+        if lock:
+            cursor.execute(
+                f'LOCK TABLE {", ".join(_qn(schema_name, table["name"]) for table in tables)} IN EXCLUSIVE MODE'
+            )
+        cursor.execute('SELECT now()')
+        yield cursor, tables, cursor.fetchone()[0]
+
+
+def _upsert_rows(source, target, schema_name, table, since):
+    columns = _column_list(table['columns'])
+    where = ''
+    changed_column = 'updated_at' if 'updated_at' in table['columns'] else APPEND_ONLY_TABLES.get(table['name'])
+    if since is not None and table['pk'] and changed_column in table['columns']:
+        where = source.mogrify(f' WHERE {_qn(changed_column)} >= %s', [since]).decode()
+
+    with tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE) as buffer:
+        rows = _copy_out(source, schema_name, table, buffer, where)
+        if not rows and table['pk']:
+            return 0
+        buffer.seek(0)
+        target.execute(
+            f'CREATE TEMP TABLE _transfer_rows (LIKE {_qn(schema_name, table["name"])} INCLUDING DEFAULTS)'
+        )
+        target.copy_expert(f'COPY _transfer_rows ({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+    qualified = _qn(schema_name, table['name'])
+    if table['pk']:
+        updates = ', '.join(
+            f'{_qn(column)} = EXCLUDED.{_qn(column)}' for column in table['columns'] if column not in table['pk']
+        )
+        conflict = f'DO UPDATE SET {updates}' if updates else 'DO NOTHING'
+        target.execute(
+            f'INSERT INTO {qualified} ({columns}) SELECT {columns} FROM _transfer_rows '
+            f'ON CONFLICT ({_column_list(table["pk"])}) {conflict}'
+        )
+    else:
+        # No key to match rows on: replace the table
+        target.execute(f'DELETE FROM {qualified}')
+        target.execute(f'INSERT INTO {qualified} ({columns}) SELECT {columns} FROM _transfer_rows')
+    target.execute('DROP TABLE _transfer_rows')
+    return rows
+
+
+def _delete_missing(source, target, schema_name, table):
+    if not table['pk']:
+        return 0
+    qualified = _qn(schema_name, table['name'])
+    keys = _column_list(table['pk'])
+    with tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE) as buffer:
+        source.copy_expert(f'COPY (SELECT {keys} FROM {qualified}) TO STDOUT WITH (FORMAT csv)', buffer)
+        buffer.seek(0)
+        target.execute(f'CREATE TEMP TABLE _transfer_keys AS SELECT {keys} FROM {qualified} WITH NO DATA')
+        target.copy_expert(f'COPY _transfer_keys ({keys}) FROM STDIN WITH (FORMAT csv)', buffer)
+    match = ' AND '.join(f'k.{_qn(column)} = t.{_qn(column)}' for column in table['pk'])
+    target.execute(
+        f'DELETE FROM {qualified} t WHERE NOT EXISTS (SELECT 1 FROM _transfer_keys k WHERE {match})'
+    )
+    deleted = target.rowcount
+    target.execute('DROP TABLE _transfer_keys')
+    return deleted
+
+
+def _apply_delta(source, schema_name, target_alias, tables, since):
+    if since is not None:
+        since -= DELTA_OVERLAP
+    copied = deleted = 0
+    # Django's foreign keys are deferrable, so table order does not matter here
+    with transaction.atomic(using=target_alias), connections[target_alias].cursor() as target:
+        target.execute('SET CONSTRAINTS ALL DEFERRED')
+        for table in tables:
+            copied += _upsert_rows(source, target, schema_name, table, since)
+            deleted += _delete_missing(source, target, schema_name, table)
+        _set_sequences(target, schema_name, _sequence_values(source, schema_name))
+    return copied, deleted
+
+
+def sync_delta(tenant, target, since):
+    """
+    Copy rows changed on the tenant's current shard since `since` into its
+    schema on `target`. Returns (watermark for the next pass, rows copied, rows deleted).
+    """
+    _check_isolated(tenant)
+    if isinstance(since, str):
+        since = parse_datetime(since)
+    with _source_transaction(tenant.schema_name, get_tenant_shard(tenant)) as (cursor, tables, now):
+        copied, deleted = _apply_delta(cursor, tenant.schema_name, target, tables, since)
+    return now, copied, deleted
+
+
+def set_maintenance(tenant, enabled):
+    tenant.maintenance_mode = enabled
+    tenant.save(update_fields=['maintenance_mode', 'updated_at'])
+
+
+def _compare(source, target, schema_name, tables, workers):
+    """Tables whose row count or checksum differs between the two shards"""
+    source_digests = table_digests(source, schema_name, tables, workers)
+    target_digests = table_digests(target, schema_name, tables, workers)
+    return [table for table in tables if source_digests[table['name']] != target_digests[table['name']]]
+
+
+def cut_over(tenant, target, since, workers=4):
+    """
+    Final pass with writes to the source blocked: copy the last changes,
+    compare every table on both shards and switch Client.shard to target.
+    Returns (rows copied, rows deleted). On a mismatch TransferError is
+    raised and the tenant stays where it was. The catalog is switched in
+    its own transaction once the source transaction has committed, so it
+    never points at the target for a pass that was rolled back.
+    """
+    _check_isolated(tenant)
+    if isinstance(since, str):
+        since = parse_datetime(since)
+    source = get_tenant_shard(tenant)
+    schema_name = tenant.schema_name
+    with _source_transaction(schema_name, source, lock=True) as (cursor, tables, _):
+        copied, deleted = _apply_delta(cursor, schema_name, target, tables, since)
+
+        mismatched = _compare(source, target, schema_name, tables, workers)
+        if mismatched:
+            # Changes that did not touch updated_at (raw UPDATEs): copy those tables whole
+            extra_copied, extra_deleted = _apply_delta(cursor, schema_name, target, mismatched, None)
+            copied, deleted = copied + extra_copied, deleted + extra_deleted
+            mismatched = _compare(source, target, schema_name, mismatched, workers)
+        if mismatched:
+            raise TransferError(
+                f'Shards differ after the final pass: {", ".join(table["name"] for table in mismatched)}'
+            )
+
+    # Maintenance mode still keeps writers off the source until the switch
+    try:
+        with transaction.atomic():
+            tenant.shard = target
+            tenant.maintenance_mode = False
+            tenant.save(update_fields=['shard', 'maintenance_mode', 'updated_at'])
+            # Touch the domain rows too, so every routing cache keyed on them is dropped
+            for domain in Domain.objects.filter(tenant=tenant):
+                domain.save()
+    except BaseException:
+        tenant.shard, tenant.maintenance_mode = source, True
+        raise
+    return copied, deleted
+
+
+def retire_schema(schema_name, using, drop=False):
+    """Drop the old copy, or keep it renamed out of the way. Returns the name it was kept under."""
+    if drop:
+        drop_schema(schema_name, using)
+        return None
+    retired = f'moved_{timezone.now():%Y%m%d%H%M%S}_{schema_name}'[:63]
+    connection = connections[using]
+    connection.set_schema_to_public()
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER SCHEMA {_qn(schema_name)} RENAME TO {_qn(retired)}')
+    return retired
+
+
+def create_tenant_from_manifest(manifest, schema_name, using):
+    """Catalog rows for a tenant imported into a fresh deployment"""
+    meta = manifest['tenant']
+    with transaction.atomic():
+        tenant = Client(
+            schema_name=schema_name,
+            name=meta['name'],
+            domain_url=meta['domain_url'],
+            brand_colors=meta['brand_colors'],
+            shard=using,
+        )
+        tenant.auto_create_schema = False
+        tenant.save()
+        for domain, is_primary in meta['domains']:
+            Domain.objects.create(domain=domain, tenant=tenant, is_primary=is_primary)
+    return tenant
@@ -1,7 +1,7 @@
 from django.contrib import admin
 
-from .models import Ticket, SLAPolicy
-from .services import TicketService
+from .models import ArchivedTicket, Ticket, SLAPolicy
+from .services import TicketArchiveService, TicketService
 
 
 @admin.register(SLAPolicy)
@@ -21,12 +21,32 @@ class TicketAdmin(admin.ModelAdmin):
 
     def save_model(self, request, obj, form, change):
         """
-        Ensure SLA due_at is calculated for tickets created/edited via admin.
+        Ensure SLA deadlines are calculated for tickets created/edited via admin.
 
-        - If due_at is empty but we have an SLA policy (or at least a priority),
-          compute it using TicketService.
-        - If due_at is already set (e.g. manually overridden), respect that.
+        - If due_at or response_due_at is empty but we have an SLA policy (or at
+          least a priority), compute it using TicketService.
+        - If a deadline is already set (e.g. manually overridden), respect that.
         """
-        if not obj.due_at:
-            obj.due_at = TicketService.calculate_due_at(obj, obj.sla_policy if hasattr(obj, "sla_policy") else None)
+        TicketService.set_sla_deadlines(obj, obj.sla_policy if hasattr(obj, "sla_policy") else None)
         super().save_model(request, obj, form, change)
+
+
+@admin.register(ArchivedTicket)
+class ArchivedTicketAdmin(admin.ModelAdmin):
+    """Archived tickets are read-only; restore moves them back to the live table"""
+    list_display = ('id', 'title', 'status', 'priority', 'customer', 'created_at', 'archived_at')
+    list_filter = ('status', 'priority')
+    search_fields = ('title', 'customer__email')
+    list_select_related = ('customer',)
+    actions = ['restore_tickets']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description='Restore selected tickets')
+    def restore_tickets(self, request, queryset):
+        restored = TicketArchiveService.restore(queryset.values_list('id', flat=True))
+        self.message_user(request, f'Restored {len(restored)} tickets')
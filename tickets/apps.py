@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class TicketsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tickets'
+
+    def ready(self):
+        from helpdesk_system.cache import register_model_invalidation
+        from .models import Ticket, SLAPolicy
+        register_model_invalidation(Ticket, SLAPolicy)
@@ -0,0 +1,283 @@
+"""
+High-throughput ticket import
+Streams CSV/JSONL input, upserts customers in batches and loads tickets with COPY
+"""
+import csv
+import io
+import json
+import time
+from datetime import timezone as dt_timezone
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from psycopg2.extras import execute_values
+
+from customers.models import Customer
+from customers.services import CustomerStatsService
+from helpdesk_system.cache import invalidate_models
+from helpdesk_system.events import TICKETS_IMPORTED, publish_on_commit
+from helpdesk_system.sharding import tenant_connection, tenant_db_alias
+from .models import Ticket
+from .services import TicketService
+
+DEFAULT_BATCH_SIZE = 5000
+SUPPORTED_FORMATS = ('csv', 'jsonl')
+
+# Columns written by COPY, in order
+COPY_COLUMNS = [
+    'title', 'description', 'status', 'priority', 'customer_id',
+    'due_at', 'response_due_at', 'first_response_at', 'resolved_at',
+    'created_at', 'updated_at', 'tags', 'attachments',
+]
+# Record keys holding timestamps
+TIMESTAMP_FIELDS = ('due_at', 'response_due_at', 'first_response_at', 'resolved_at', 'created_at')
+
+
+def detect_format(filename: str) -> str:
+    """Guess the input format from a file name"""
+    if filename and filename.lower().endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return 'csv'
+
+
+class MalformedRecord:
+    """Stands in for an input line that could not be parsed, so it is reported instead of ending the import"""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+
+
+def iter_records(stream, fmt: str):
+    """
+    Yield one dict (or MalformedRecord) per input record without reading the whole file.
+    stream must be a text stream.
+    """
+    if fmt == 'jsonl':
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield MalformedRecord(f'invalid JSON ({exc.msg})')
+                continue
+            yield record if isinstance(record, dict) else MalformedRecord('expected a JSON object')
+    else:
+        yield from csv.DictReader(stream)
+
+
+def _copy_value(value) -> str:
+    """Encode a value for COPY ... (FORMAT csv, NULL '\\N')"""
+    if value is None:
+        return '\\N'
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _is_pooled() -> bool:
+    return getattr(tenant_connection().tenant, 'is_pooled', False)
+
+
+def _parse_list(value):
+    """Tags/attachments arrive as JSON lists (JSONL) or comma-separated strings (CSV)"""
+    if not value:
+        return []
+    if isinstance(value, list):
+        return value
+    try:
+        parsed = json.loads(value)
+        if isinstance(parsed, list):
+            return parsed
+    except (json.JSONDecodeError, TypeError):
+        pass
+    return [item.strip() for item in str(value).split(',') if item.strip()]
+
+
+def _parse_timestamp(value):
+    """None for an empty value; ValueError for text that is not a valid datetime"""
+    if not value:
+        return None
+    # parse_datetime raises ValueError for impossible dates and returns None for other text
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        raise ValueError('not an ISO 8601 datetime')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+class TicketImporter:
+    """
+    Import tickets into the current tenant schema.
+    Callers are responsible for activating the tenant (tenant_context).
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, progress_callback=None):
+        self.batch_size = batch_size
+        self.progress_callback = progress_callback
+        self.imported = 0
+        self.skipped = 0
+        self.errors = []
+        self.started_at = None
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0
+        return round(self.imported / elapsed, 1) if elapsed > 0 else 0.0
+
+    def progress(self) -> dict:
+        return {
+            'imported': self.imported,
+            'skipped': self.skipped,
+            'rows_per_second': self.rows_per_second,
+            'errors': self.errors[:20],
+        }
+
+    def run(self, records) -> dict:
+        """Consume an iterable of dict records in batches"""
+        self.started_at = time.monotonic()
+        batch = []
+        for line_number, record in enumerate(records, start=1):
+            row = self._normalize(record, line_number)
+            if row is None:
+                continue
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._load_batch(batch)
+                batch = []
+        if batch:
+            self._load_batch(batch)
+        return self.progress()
+
+    def _reject(self, line_number: int, reason: str):
+        self.skipped += 1
+        self.errors.append(f'Record {line_number}: {reason}')
+        return None
+
+    def _normalize(self, record, line_number: int):
+        """Validate one record; invalid records are skipped and reported"""
+        if isinstance(record, MalformedRecord):
+            return self._reject(line_number, record.reason)
+
+        title = (record.get('title') or '').strip()
+        email = (record.get('customer_email') or '').strip()
+        if not title or not email:
+            return self._reject(line_number, 'title and customer_email are required')
+
+        # Missing values take the model defaults; unknown ones are rejected rather than guessed
+        status = record.get('status') or 'New'
+        if status not in dict(Ticket.STATUS_CHOICES):
+            return self._reject(line_number, f'unknown status "{status}"')
+        priority = record.get('priority') or 'Medium'
+        if priority not in dict(Ticket.PRIORITY_CHOICES):
+            return self._reject(line_number, f'unknown priority "{priority}"')
+
+        timestamps = {}
+        for field in TIMESTAMP_FIELDS:
+            try:
+                timestamps[field] = _parse_timestamp(record.get(field))
+            except ValueError as exc:
+                return self._reject(line_number, f'invalid {field} "{record.get(field)}" ({exc})')
+
+        return {
+            'title': title[:200],
+            'description': record.get('description') or '',
+            'status': status,
+            'priority': priority,
+            'customer_email': email,
+            'customer_name': (record.get('customer_name') or email.split('@')[0])[:200],
+            **timestamps,
+            'tags': _parse_list(record.get('tags')),
+            'attachments': _parse_list(record.get('attachments')),
+        }
+
+    def _load_batch(self, batch):
+        now = timezone.now()
+        with transaction.atomic(using=tenant_db_alias()):
+            customer_ids = self._upsert_customers(batch, now)
+            deadlines = TicketService.calculate_deadlines_by_priority(now)
+
+            rows = [
+                (
+                    row['title'],
+                    row['description'],
+                    row['status'],
+                    row['priority'],
+                    customer_ids[row['customer_email']],
+                    row['due_at'] or deadlines[row['priority']][0],
+                    None if row['first_response_at'] or row['status'] in ('Resolved', 'Closed')
+                    else row['response_due_at'] or deadlines[row['priority']][1],
+                    row['first_response_at'],
+                    row['resolved_at'],
+                    row['created_at'] or now,
+                    now,
+                    json.dumps(row['tags']),
+                    json.dumps(row['attachments']),
+                )
+                for row in batch
+            ]
+            if _is_pooled():
+                self._insert_tickets(rows)
+            else:
+                self._copy_tickets(rows)
+            CustomerStatsService.apply((None, (row[4], row[2], row[9], row[8])) for row in rows)
+            # COPY returns no rows to patch in; panels offer a reload instead
+            publish_on_commit(tenant_connection().schema_name, TICKETS_IMPORTED, using=tenant_db_alias(),
+                              count=len(batch))
+
+        self.imported += len(batch)
+        invalidate_models(Ticket, Customer)
+        if self.progress_callback:
+            self.progress_callback(self.progress())
+
+    @staticmethod
+    def _copy_tickets(rows):
+        buffer = io.StringIO()
+        for values in rows:
+            buffer.write(','.join(_copy_value(value) for value in values))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        with tenant_connection().cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {Ticket._meta.db_table} ({', '.join(COPY_COLUMNS)}) "
+                f"FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer
+            )
+
+    def _insert_tickets(self, rows):
+        """Multi-row INSERT for pooled tenants: COPY FROM is not allowed on row-level secured tables"""
+        with tenant_connection().cursor() as cursor:
+            execute_values(
+                cursor.cursor,
+                f"INSERT INTO {Ticket._meta.db_table} ({', '.join(COPY_COLUMNS)}) VALUES %s",
+                rows,
+                page_size=self.batch_size
+            )
+
+    def _upsert_customers(self, batch, now) -> dict:
+        """
+        Insert unseen customers with one INSERT ... ON CONFLICT (email) DO NOTHING
+        and resolve ids for the whole batch with one SELECT.
+        """
+        customers = {}
+        for row in batch:
+            customers.setdefault(row['customer_email'], row['customer_name'])
+
+        table = Customer._meta.db_table
+        # Pooled tenants' emails are unique per tenant (see tenants.pooling)
+        conflict = '(tenant_id, email)' if _is_pooled() else '(email)'
+        with tenant_connection().cursor() as cursor:
+            execute_values(
+                cursor.cursor,
+                f'INSERT INTO {table} (email, name, phone, company, created_at, updated_at) '
+                f'VALUES %s ON CONFLICT {conflict} DO NOTHING',
+                [(email, name, '', '', now, now) for email, name in customers.items()],
+                page_size=self.batch_size
+            )
+            cursor.execute(
+                f'SELECT email, id FROM {table} WHERE email = ANY(%s)',
+                [list(customers)]
+            )
+            return dict(cursor.fetchall())
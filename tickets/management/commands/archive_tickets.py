@@ -0,0 +1,62 @@
+"""
+Management command to move old Resolved/Closed tickets to the archive table
+Usage: python manage.py archive_tickets [--schema_name acme] [--older_than_days 365] [--batch_size 1000] [--max_batches 10]
+
+Without --schema_name every active tenant is archived. --restore 12,13 moves
+archived tickets of --schema_name back instead.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from tenants.models import Client
+from tenants.sharding import tenant_shard_context, tenants_by_shard
+from tickets.services import TicketArchiveService
+
+
+class Command(BaseCommand):
+    help = 'Move Resolved/Closed tickets older than the cut-off from tickets to tickets_archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema_name', type=str, default=None, help='Tenant schema (default: all active)')
+        parser.add_argument('--older_than_days', type=int, default=None,
+                          help='Archive tickets untouched for this many days (default: TICKET_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--batch_size', type=int, default=None,
+                          help='Tickets moved per transaction (default: TICKET_ARCHIVE_BATCH_SIZE)')
+        parser.add_argument('--max_batches', type=int, default=None, help='Stop after this many batches per tenant')
+        parser.add_argument('--restore', type=str, default=None,
+                          help='Comma-separated archived ticket ids to move back (needs --schema_name)')
+
+    def handle(self, *args, **options):
+        if options['schema_name']:
+            tenant = Client.objects.filter(schema_name=options['schema_name']).first()
+            if not tenant:
+                raise CommandError(f'Tenant "{options["schema_name"]}" not found')
+            tenants = [tenant]
+        elif options['restore']:
+            raise CommandError('--restore needs --schema_name')
+        else:
+            tenants = [
+                tenant for shard_tenants in tenants_by_shard(Client.objects.filter(is_active=True)).values()
+                for tenant in shard_tenants
+            ]
+
+        if options['restore']:
+            try:
+                ticket_ids = [int(value) for value in options['restore'].split(',') if value.strip()]
+            except ValueError:
+                raise CommandError('--restore takes comma-separated ticket ids')
+            with tenant_shard_context(tenants[0]):
+                restored = TicketArchiveService.restore(ticket_ids)
+            self.stdout.write(self.style.SUCCESS(f'Restored {len(restored)} tickets: {restored}'))
+            return
+
+        total = 0
+        for tenant in tenants:
+            with tenant_shard_context(tenant):
+                moved = TicketArchiveService.archive(
+                    older_than_days=options['older_than_days'],
+                    batch_size=options['batch_size'],
+                    max_batches=options['max_batches'],
+                )
+            total += moved
+            self.stdout.write(f'{tenant.schema_name}: {moved} tickets archived')
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} tickets across {len(tenants)} tenants'))
@@ -0,0 +1,67 @@
+"""
+Management command to compare the ticket list serializer against the read-model path
+Usage: python manage.py benchmark_ticket_list --schema_name acme [--sizes 20,200,2000] [--iterations 20]
+
+Both paths fetch and serialize the newest N tickets, exactly as the list
+endpoint does for one page; the result is reported as rows per second.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tenants.models import Client
+from tenants.sharding import tenant_shard_context
+from tickets.models import Ticket
+from tickets.serializers import TICKET_LIST_READ_MODEL, TicketListSerializer
+from tickets.services import TicketService
+
+
+class Command(BaseCommand):
+    help = 'Benchmark TicketListSerializer against the values()-based read model'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema_name', type=str, required=True, help='Tenant schema to query')
+        parser.add_argument('--sizes', type=str, default='20,200,2000', help='Comma-separated page sizes')
+        parser.add_argument('--iterations', type=int, default=20, help='Runs per size and path')
+
+    def handle(self, *args, **options):
+        tenant = Client.objects.filter(schema_name=options['schema_name']).first()
+        if not tenant:
+            raise CommandError(f'Tenant "{options["schema_name"]}" not found')
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+
+        with tenant_shard_context(tenant):
+            available = Ticket.objects.count()
+            for size in sizes:
+                if size > available:
+                    self.stdout.write(self.style.WARNING(f'Only {available} tickets available for size {size}'))
+                serializer_rate = self._measure(self._serializer_path, size, options['iterations'])
+                read_model_rate = self._measure(self._read_model_path, size, options['iterations'])
+                speedup = read_model_rate / serializer_rate if serializer_rate else 0
+                self.stdout.write(
+                    f'{size:>6} rows: serializer {serializer_rate:>10.0f} rows/s  '
+                    f'read model {read_model_rate:>10.0f} rows/s  ({speedup:.1f}x)'
+                )
+
+    @staticmethod
+    def _serializer_path(size):
+        queryset = Ticket.objects.select_related('customer', 'assignee', 'sla_policy')[:size]
+        return TicketListSerializer(queryset, many=True).data
+
+    @staticmethod
+    def _read_model_path(size):
+        queryset = TicketService.annotate_is_overdue(Ticket.objects.all())
+        return TICKET_LIST_READ_MODEL.map(TICKET_LIST_READ_MODEL.rows(queryset)[:size])
+
+    @staticmethod
+    def _measure(path, size, iterations):
+        path(size)  # warm up
+        rows = 0
+        started = time.perf_counter()
+        for _ in range(iterations):
+            rows += len(path(size))
+        elapsed = time.perf_counter() - started
+        return rows / elapsed if elapsed else 0
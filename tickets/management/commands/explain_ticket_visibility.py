@@ -0,0 +1,45 @@
+"""
+Management command to compare query plans of the portal visibility filter
+Usage: python manage.py explain_ticket_visibility --schema_name acme --username jane [--analyze]
+
+"before" is the old email join OR-ed with assignee; "after" is the
+UNION of two index scans on tickets.assignee_id and tickets.customer_id.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from tenants.models import Client
+from tenants.sharding import tenant_shard_context
+from tickets.models import Ticket
+from tickets.services import TicketService
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Print before/after query plans for the portal ticket visibility filter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema_name', type=str, required=True, help='Tenant schema to inspect')
+        parser.add_argument('--username', type=str, required=True, help='Portal user to build the filter for')
+        parser.add_argument('--analyze', action='store_true', help='Run EXPLAIN ANALYZE (executes the queries)')
+
+    def handle(self, *args, **options):
+        tenant = Client.objects.filter(schema_name=options['schema_name']).first()
+        if not tenant:
+            raise CommandError(f'Tenant "{options["schema_name"]}" not found')
+
+        with tenant_shard_context(tenant):
+            user = User.objects.filter(username=options['username']).first()
+            if not user:
+                raise CommandError(f'User "{options["username"]}" not found in "{tenant.schema_name}"')
+
+            before = Ticket.objects.filter(Q(assignee=user) | Q(customer__email=user.email))
+            after = Ticket.objects.filter(id__in=TicketService.visible_ticket_ids(user))
+
+            explain_options = {'analyze': True, 'buffers': True} if options['analyze'] else {}
+            for label, queryset in (('before (email join, OR)', before), ('after (customer_id, UNION)', after)):
+                self.stdout.write(self.style.SUCCESS(label))
+                self.stdout.write(queryset.explain(**explain_options))
+                self.stdout.write('')
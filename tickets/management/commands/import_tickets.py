@@ -0,0 +1,53 @@
+"""
+Management command to bulk import tickets into a tenant schema
+Usage: python manage.py import_tickets --schema_name acme --file tickets.csv [--format jsonl] [--batch_size 5000]
+
+CSV columns / JSONL keys: title, description, status, priority, customer_email,
+customer_name, tags, attachments, created_at, due_at, response_due_at, first_response_at, resolved_at
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from tenants.models import Client
+from tenants.sharding import tenant_shard_context
+from tickets.importer import (
+    DEFAULT_BATCH_SIZE, SUPPORTED_FORMATS, TicketImporter, detect_format, iter_records
+)
+
+
+class Command(BaseCommand):
+    help = 'Bulk import tickets from CSV or JSONL using COPY'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema_name', type=str, required=True, help='Target tenant schema')
+        parser.add_argument('--file', type=str, required=True, help='Path to the CSV/JSONL file')
+        parser.add_argument('--format', type=str, choices=SUPPORTED_FORMATS, default=None,
+                          help='Input format (default: detected from file extension)')
+        parser.add_argument('--batch_size', type=int, default=DEFAULT_BATCH_SIZE,
+                          help='Rows per COPY batch')
+
+    def handle(self, *args, **options):
+        tenant = Client.objects.filter(schema_name=options['schema_name']).first()
+        if not tenant:
+            raise CommandError(f'Tenant "{options["schema_name"]}" not found')
+
+        fmt = options['format'] or detect_format(options['file'])
+
+        def report(progress):
+            self.stdout.write(
+                f"Imported {progress['imported']} tickets "
+                f"({progress['rows_per_second']} rows/s, {progress['skipped']} skipped)"
+            )
+
+        importer = TicketImporter(batch_size=options['batch_size'], progress_callback=report)
+        with tenant_shard_context(tenant), open(options['file'], newline='', encoding='utf-8') as stream:
+            result = importer.run(iter_records(stream, fmt))
+
+        for error in result['errors']:
+            self.stdout.write(self.style.WARNING(error))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Import complete: {result['imported']} tickets imported, "
+                f"{result['skipped']} skipped, {result['rows_per_second']} rows/s"
+            )
+        )
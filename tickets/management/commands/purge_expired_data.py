@@ -0,0 +1,46 @@
+"""
+Management command to apply tenants' retention policies now
+Usage: python manage.py purge_expired_data [--schema_name acme] [--batch_size 500] [--pause 0.2]
+
+Deletes what the daily purge_expired_data task would, in the same throttled
+batches, printing progress as it goes.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from tenants.models import Client
+from tenants.sharding import tenant_shard_context
+from tickets.services import RetentionService
+
+
+class Command(BaseCommand):
+    help = "Purge expired tickets and customers according to each tenant's retention policy"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema_name', type=str, default=None,
+                          help='Tenant schema (default: every active tenant with a policy)')
+        parser.add_argument('--batch_size', type=int, default=None,
+                          help='Rows deleted per transaction (default: RETENTION_BATCH_SIZE)')
+        parser.add_argument('--pause', type=float, default=None,
+                          help='Seconds to sleep between batches (default: RETENTION_BATCH_PAUSE)')
+
+    def handle(self, *args, **options):
+        tenants = Client.objects.filter(is_active=True).exclude(
+            ticket_retention_days=None, customer_retention_days=None
+        )
+        if options['schema_name']:
+            tenants = tenants.filter(schema_name=options['schema_name'])
+            if not tenants:
+                raise CommandError(f'Tenant "{options["schema_name"]}" not found or has no retention policy')
+
+        for tenant in tenants.order_by('shard', 'schema_name'):
+            def report(resource, deleted):
+                self.stdout.write(f'{tenant.schema_name}: {deleted} {resource} deleted so far')
+
+            with tenant_shard_context(tenant):
+                result = RetentionService.purge_tenant(
+                    tenant, report, batch_size=options['batch_size'], pause=options['pause']
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f'{tenant.schema_name}: ' + (', '.join(f'{count} {resource}' for resource, count in result.items())
+                                             or 'nothing to purge')
+            ))
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.8 on 2026-10-19 13:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0002_archived_ticket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketActivity',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('ticket_id', models.BigIntegerField()),
+                ('event', models.CharField(choices=[('created', 'Created'), ('status', 'Status'), ('assignee', 'Assignee'), ('priority', 'Priority'), ('sla_policy', 'SLA policy'), ('due_at', 'Due at')], max_length=16)),
+                ('old_value', models.CharField(blank=True, max_length=64, null=True)),
+                ('new_value', models.CharField(blank=True, max_length=64, null=True)),
+                ('actor_id', models.BigIntegerField(blank=True, help_text='User who made the change, if known', null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'ticket_activity',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['ticket_id', 'created_at'], name='ticket_activity_timeline_idx'), models.Index(fields=['created_at'], name='ticket_activity_created_idx')],
+            },
+        ),
+    ]
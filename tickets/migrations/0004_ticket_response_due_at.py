@@ -0,0 +1,25 @@
+# Generated by Django 5.0.8 on 2026-10-19 13:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0003_customer_user'),
+        ('tickets', '0003_ticket_activity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='response_due_at',
+            field=models.DateTimeField(blank=True, help_text='First response deadline from the SLA policy; cleared once first_response_at is set', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('first_response_at__isnull', True), ('response_due_at__isnull', False)), fields=['response_due_at'], name='tickets_response_due_idx'),
+        ),
+    ]
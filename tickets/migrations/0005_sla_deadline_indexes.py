@@ -0,0 +1,36 @@
+# Generated by Django 5.0.8 on 2026-10-19 13:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Resolved/Closed tickets no longer keep a first-response deadline
+CLEAR_RESPONSE_DUE_SQL = """
+UPDATE tickets SET response_due_at = NULL
+ WHERE response_due_at IS NOT NULL AND status IN ('Resolved', 'Closed')
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0003_customer_user'),
+        ('tickets', '0004_ticket_response_due_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedticket',
+            name='response_due_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='ticket',
+            name='response_due_at',
+            field=models.DateTimeField(blank=True, help_text='First response deadline from the SLA policy; cleared once first_response_at is set or the ticket is resolved or closed', null=True),
+        ),
+        migrations.RunSQL(CLEAR_RESPONSE_DUE_SQL, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('due_at__isnull', False), models.Q(('status__in', ['Resolved', 'Closed']), _negated=True)), fields=['due_at'], name='tickets_open_due_idx'),
+        ),
+    ]
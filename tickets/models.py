@@ -1,10 +1,12 @@
-from django.db import models
+from django.db import connections, models, router, transaction
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 import json
 
+from helpdesk_system.events import TICKET_CREATED, TICKET_UPDATED, publish_on_commit
+
 User = get_user_model()
 
 
@@ -70,6 +72,11 @@ class Ticket(models.Model):
     
     # SLA tracking
     due_at = models.DateTimeField(null=True, blank=True, help_text="Calculated based on SLA policy")
+    response_due_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text="First response deadline from the SLA policy; cleared once first_response_at is set "
+                  "or the ticket is resolved or closed"
+    )
     first_response_at = models.DateTimeField(null=True, blank=True)
     resolved_at = models.DateTimeField(null=True, blank=True)
     
@@ -81,13 +88,37 @@ class Ticket(models.Model):
     tags = models.JSONField(default=list, blank=True)
     attachments = models.JSONField(default=list, blank=True, help_text="List of attachment URLs/paths")
 
+    # Columns the Customer aggregates are computed from, in CustomerStatsService.apply() order
+    CUSTOMER_STATS_FIELDS = ('customer_id', 'status', 'created_at', 'resolved_at')
+
     class Meta:
         db_table = 'tickets'
         ordering = ['-created_at']
+        indexes = [
+            # Only tickets still awaiting a first response, scanned by the SLA monitor
+            models.Index(
+                fields=['response_due_at'], name='tickets_response_due_idx',
+                condition=models.Q(first_response_at__isnull=True, response_due_at__isnull=False),
+            ),
+            # Only unresolved tickets with a resolution deadline, scanned by the SLA monitor
+            models.Index(
+                fields=['due_at'], name='tickets_open_due_idx',
+                condition=models.Q(due_at__isnull=False) & ~models.Q(status__in=['Resolved', 'Closed']),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.status}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Old state for the customer aggregate deltas (customers.signals)
+        instance._loaded_stats = instance.customer_stats()
+        # Baseline for the TicketActivity events written by save()
+        instance._loaded_activity = TicketActivity.snapshot(instance)
+        return instance
+
     def clean(self):
         """Business constraint validation"""
         # Cannot move from Resolved to New without reason
@@ -96,6 +127,166 @@ class Ticket(models.Model):
             if old_instance.status == 'Resolved' and self.status == 'New':
                 raise ValidationError("A ticket cannot move from Resolved to New without a reason")
 
-    def save(self, *args, **kwargs):
+    def save(self, *args, actor=None, **kwargs):
+        """Save and append TicketActivity events for the tracked changes, in one transaction"""
         self.full_clean()
-        super().save(*args, **kwargs)
+        if self.response_due_at and (self.first_response_at or self.status in ('Resolved', 'Closed')):
+            # Met or moot; also drops the ticket from tickets_response_due_idx
+            self.response_due_at = None
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'response_due_at' not in update_fields:
+                kwargs['update_fields'] = [*update_fields, 'response_due_at']
+        created = self._state.adding
+        using = kwargs.get('using') or router.db_for_write(Ticket, instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            current = TicketActivity.snapshot(self)
+            previous = None if created else getattr(self, '_loaded_activity', None)
+            update_fields = kwargs.get('update_fields')
+            if previous is not None and update_fields is not None:
+                saved = {Ticket._meta.get_field(name).attname for name in update_fields}
+                current = {field: value for field, value in current.items() if field in saved}
+            TicketActivity.objects.using(using).bulk_create(
+                TicketActivity.changes(self.pk, previous, current, getattr(actor, 'pk', actor))
+            )
+            # Open tickets per agent for auto-assignment; a claimed agent is already counted
+            from .services import AgentWorkloadService
+            workload_before = getattr(self, '_workload_claim', None) or previous
+            AgentWorkloadService.track([(workload_before, {**(previous or {}), **current})], using=using)
+            publish_on_commit(connections[using].schema_name, TICKET_CREATED if created else TICKET_UPDATED,
+                              using=using, **self.event_data())
+        self._loaded_activity = TicketActivity.snapshot(self)
+        self._workload_claim = None
+
+    def customer_stats(self):
+        """Loaded values of CUSTOMER_STATS_FIELDS, the columns customer aggregates depend on"""
+        return tuple(self.__dict__.get(field) for field in self.CUSTOMER_STATS_FIELDS)
+
+    def event_data(self):
+        """Fields the live panels patch in place (helpdesk_system.events)"""
+        return {
+            'id': self.pk,
+            'title': self.title,
+            'status': self.status,
+            'priority': self.priority,
+            'customer_id': self.customer_id,
+            'assignee_id': self.assignee_id,
+            'due_at': self.due_at,
+            'response_due_at': self.response_due_at,
+            'updated_at': self.updated_at,
+        }
+
+
+class TicketActivity(models.Model):
+    """
+    Tenant Schema Model - Append-only ticket history
+    One compact row per tracked change, written in the transaction that made
+    it. Rows are never updated; ticket_id is a plain column so the history
+    survives archival (tickets_archive) and is removed only by retention purges.
+    """
+    EVENT_CREATED = 'created'
+    EVENT_CHOICES = [
+        (EVENT_CREATED, 'Created'),
+        ('status', 'Status'),
+        ('assignee', 'Assignee'),
+        ('priority', 'Priority'),
+        ('sla_policy', 'SLA policy'),
+        ('due_at', 'Due at'),
+    ]
+    # Ticket attribute -> event
+    TRACKED_FIELDS = {
+        'status': 'status',
+        'assignee_id': 'assignee',
+        'priority': 'priority',
+        'sla_policy_id': 'sla_policy',
+        'due_at': 'due_at',
+    }
+
+    id = models.BigAutoField(primary_key=True)
+    ticket_id = models.BigIntegerField()
+    event = models.CharField(max_length=16, choices=EVENT_CHOICES)
+    old_value = models.CharField(max_length=64, null=True, blank=True)
+    new_value = models.CharField(max_length=64, null=True, blank=True)
+    actor_id = models.BigIntegerField(null=True, blank=True, help_text="User who made the change, if known")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'ticket_activity'
+        ordering = ['created_at', 'id']
+        indexes = [
+            # Keyset-paginated timeline of one ticket
+            models.Index(fields=['ticket_id', 'created_at'], name='ticket_activity_timeline_idx'),
+            # Streaming consumers reading the whole log in order
+            models.Index(fields=['created_at'], name='ticket_activity_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.ticket_id} {self.event}: {self.old_value} -> {self.new_value}"
+
+    @staticmethod
+    def encode(value):
+        if value is None:
+            return None
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return str(value)
+
+    @classmethod
+    def snapshot(cls, ticket) -> dict:
+        # Deferred fields are left out rather than read as None
+        return {field: ticket.__dict__[field] for field in cls.TRACKED_FIELDS if field in ticket.__dict__}
+
+    @classmethod
+    def changes(cls, ticket_id, previous, current, actor_id=None, at=None) -> list:
+        """
+        Unsaved events for the differences between two snapshots. previous is
+        None for a new ticket: one 'created' event carrying the status.
+        """
+        at = at or timezone.now()
+        if previous is None:
+            return [cls(ticket_id=ticket_id, event=cls.EVENT_CREATED, new_value=cls.encode(current.get('status')),
+                        actor_id=actor_id, created_at=at)]
+        return [
+            cls(ticket_id=ticket_id, event=cls.TRACKED_FIELDS[field], old_value=cls.encode(previous.get(field)),
+                new_value=cls.encode(value), actor_id=actor_id, created_at=at)
+            for field, value in current.items()
+            if field in previous and previous[field] != value
+        ]
+
+
+class ArchivedTicket(models.Model):
+    """
+    Tenant Schema Model - Resolved/Closed tickets moved out of the hot
+    tickets table by TicketArchiveService; same columns, same ids
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    status = models.CharField(max_length=20, choices=Ticket.STATUS_CHOICES)
+    priority = models.CharField(max_length=20, choices=Ticket.PRIORITY_CHOICES)
+
+    customer = models.ForeignKey('customers.Customer', on_delete=models.CASCADE, related_name='archived_tickets')
+    assignee = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='archived_assigned_tickets')
+    sla_policy = models.ForeignKey(SLAPolicy, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='archived_tickets')
+
+    due_at = models.DateTimeField(null=True, blank=True)
+    response_due_at = models.DateTimeField(null=True, blank=True)
+    first_response_at = models.DateTimeField(null=True, blank=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    tags = models.JSONField(default=list, blank=True)
+    attachments = models.JSONField(default=list, blank=True)
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'tickets_archive'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='tickets_archive_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} - {self.status} (archived)"
@@ -1,11 +1,22 @@
 from rest_framework import serializers
-from .models import Ticket, SLAPolicy
+from .models import ArchivedTicket, Ticket, TicketActivity, SLAPolicy
+from .services import BULK_MAX_IDS
 from customers.models import Customer
+from customers.serializers import CustomerListSerializer
+from helpdesk_system.read_models import RowMapper
+from helpdesk_system.sparse_fields import DynamicFieldsMixin
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 
+class UserSummarySerializer(serializers.ModelSerializer):
+    """Compact user representation for ?expand="""
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'email']
+
+
 class SLAPolicySerializer(serializers.ModelSerializer):
     class Meta:
         model = SLAPolicy
@@ -13,7 +24,7 @@ class SLAPolicySerializer(serializers.ModelSerializer):
         read_only_fields = ('created_at', 'updated_at')
 
 
-class TicketSerializer(serializers.ModelSerializer):
+class TicketSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     customer_email = serializers.EmailField(write_only=True, required=False)
     customer_name = serializers.CharField(write_only=True, required=False)
     assignee_username = serializers.CharField(source='assignee.username', read_only=True)
@@ -28,11 +39,16 @@ class TicketSerializer(serializers.ModelSerializer):
             'customer', 'customer_email', 'customer_name',
             'customer_name_display', 'customer_email_display',
             'assignee', 'assignee_username', 'sla_policy', 'sla_policy_name',
-            'due_at', 'first_response_at', 'resolved_at',
+            'due_at', 'response_due_at', 'first_response_at', 'resolved_at',
             'tags', 'attachments',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ('created_at', 'updated_at', 'first_response_at', 'resolved_at', 'due_at')
+        read_only_fields = ('created_at', 'updated_at', 'first_response_at', 'resolved_at', 'due_at', 'response_due_at')
+        expandable_fields = {
+            'customer': (CustomerListSerializer, {}),
+            'assignee': (UserSummarySerializer, {}),
+            'sla_policy': (SLAPolicySerializer, {}),
+        }
     
     def validate_due_at(self, value):
         """Ensure due_at is a future timestamp"""
@@ -54,13 +70,13 @@ class TicketSerializer(serializers.ModelSerializer):
             )
             validated_data['customer'] = customer
         
-        # Calculate due_at if not provided
+        # Calculate SLA deadlines if not provided
         ticket = Ticket(**validated_data)
-        if not ticket.due_at:
-            from .services import TicketService
-            ticket.due_at = TicketService.calculate_due_at(ticket)
+        from .services import TicketAssignmentService, TicketService
+        TicketService.set_sla_deadlines(ticket)
+        TicketAssignmentService.auto_assign(ticket)
         
-        ticket.save()
+        ticket.save(actor=self._actor())
         return ticket
     
     def update(self, instance, validated_data):
@@ -78,17 +94,22 @@ class TicketSerializer(serializers.ModelSerializer):
         # Track status changes
         if 'status' in validated_data:
             from .services import TicketService
-            TicketService.update_ticket_status(instance, validated_data['status'])
+            TicketService.update_ticket_status(instance, validated_data['status'], self._actor())
             validated_data.pop('status')  # Already handled by service
         
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         
-        instance.save()
+        instance.save(actor=self._actor())
         return instance
+    
+    def _actor(self):
+        """User recorded on TicketActivity events"""
+        request = self.context.get('request')
+        return getattr(request, 'user', None) if request else None
 
 
-class TicketListSerializer(serializers.ModelSerializer):
+class TicketListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Lightweight serializer for list views"""
     customer_name = serializers.CharField(source='customer.name', read_only=True)
     assignee_username = serializers.CharField(source='assignee.username', read_only=True)
@@ -101,8 +122,81 @@ class TicketListSerializer(serializers.ModelSerializer):
             'customer_name', 'assignee_username',
             'due_at', 'is_overdue', 'created_at'
         ]
+        expandable_fields = {
+            'customer': (CustomerListSerializer, {}),
+            'assignee': (UserSummarySerializer, {}),
+        }
     
     def get_is_overdue(self, obj):
         from .services import TicketService
         return TicketService.check_sla_breach(obj)
 
+
+class ArchivedTicketSerializer(serializers.ModelSerializer):
+    """Read-only representation of an archived ticket"""
+    customer_name = serializers.CharField(source='customer.name', read_only=True)
+    assignee_username = serializers.CharField(source='assignee.username', read_only=True)
+    
+    class Meta:
+        model = ArchivedTicket
+        fields = [
+            'id', 'title', 'description', 'status', 'priority',
+            'customer', 'customer_name', 'assignee', 'assignee_username', 'sla_policy',
+            'due_at', 'first_response_at', 'resolved_at',
+            'tags', 'attachments',
+            'created_at', 'updated_at', 'archived_at'
+        ]
+        read_only_fields = fields
+
+
+class TicketActivitySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TicketActivity
+        fields = ['id', 'ticket_id', 'event', 'old_value', 'new_value', 'actor_id', 'created_at']
+        read_only_fields = fields
+
+
+# Read-model equivalent of TicketListSerializer for the list endpoint; is_overdue is a SQL annotation
+TICKET_LIST_READ_MODEL = RowMapper([
+    ('id', 'id', None),
+    ('title', 'title', None),
+    ('status', 'status', None),
+    ('priority', 'priority', None),
+    ('customer_name', 'customer__name', None),
+    ('assignee_username', 'assignee__username', None),
+    ('due_at', 'due_at', 'datetime'),
+    ('is_overdue', 'is_overdue', None),
+    ('created_at', 'created_at', 'datetime'),
+])
+
+
+class TicketBulkActionSerializer(serializers.Serializer):
+    """Validates payloads for the bulk ticket endpoint"""
+    OPERATION_CHOICES = ['assign', 'status', 'priority', 'tags', 'close']
+    TAG_MODE_CHOICES = ['add', 'remove', 'set']
+    REQUIRED_FIELDS = {
+        'assign': 'assignee_id',
+        'status': 'status',
+        'priority': 'priority',
+        'tags': 'tags',
+    }
+    
+    operation = serializers.ChoiceField(choices=OPERATION_CHOICES)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_MAX_IDS
+    )
+    assignee_id = serializers.IntegerField(required=False, allow_null=True)
+    status = serializers.ChoiceField(choices=Ticket.STATUS_CHOICES, required=False)
+    priority = serializers.ChoiceField(choices=Ticket.PRIORITY_CHOICES, required=False)
+    tags = serializers.ListField(child=serializers.CharField(max_length=100), required=False)
+    tag_mode = serializers.ChoiceField(choices=TAG_MODE_CHOICES, default='add')
+    
+    def validate(self, attrs):
+        """Ensure the operation-specific field is present and de-duplicate ids"""
+        field = self.REQUIRED_FIELDS.get(attrs['operation'])
+        if field and field not in attrs:
+            raise serializers.ValidationError({field: f"{field} is required for {attrs['operation']}"})
+        attrs['ids'] = list(dict.fromkeys(attrs['ids']))
+        return attrs
@@ -2,10 +2,130 @@
 Business Logic Layer for Tickets
 Complex logic abstracted from Views
 """
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import BooleanField, Case, Count, F, Q, Value, When
+from django.db.models.functions import Now
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
+from django_redis import get_redis_connection
 from datetime import datetime, time as dt_time
-from .models import Ticket, SLAPolicy
+from customers.models import Customer
+from customers.services import CustomerService, CustomerStatsService
+from helpdesk_system.cache import invalidate_models
+from helpdesk_system.db_routers import mark_written
+from helpdesk_system.events import TICKET_UPDATED, publish_many_on_commit
+from helpdesk_system.purge import BatchedDelete
+from helpdesk_system.sharding import tenant_connection, tenant_db_alias
+from .models import ArchivedTicket, Ticket, TicketActivity, SLAPolicy
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on ids accepted by a single bulk operation
+BULK_MAX_IDS = 5000
+
+ARCHIVE_STATUSES = ('Resolved', 'Closed')
+# Columns tickets and tickets_archive have in common, moved unchanged
+_ARCHIVE_COLUMNS = (
+    'id, title, description, status, priority, customer_id, assignee_id, sla_policy_id, '
+    'due_at, response_due_at, first_response_at, resolved_at, created_at, updated_at, tags, attachments'
+)
+
+# One batch: the oldest matching tickets are deleted and inserted into the
+# archive by the same statement. SKIP LOCKED leaves tickets being edited alone.
+_ARCHIVE_SQL = f"""
+WITH moved AS (
+    DELETE FROM {Ticket._meta.db_table}
+     WHERE id IN (
+        SELECT id FROM {Ticket._meta.db_table}
+         WHERE status = ANY(%(statuses)s) AND updated_at < %(cutoff)s
+         ORDER BY id
+         LIMIT %(limit)s
+         FOR UPDATE SKIP LOCKED
+     )
+    RETURNING {_ARCHIVE_COLUMNS}
+)
+INSERT INTO {ArchivedTicket._meta.db_table} ({_ARCHIVE_COLUMNS}, archived_at)
+SELECT {_ARCHIVE_COLUMNS}, %(now)s FROM moved
+"""
+
+# Retention purges: one keyed batch per statement, rows locked by live requests are skipped
+_PURGE_TICKETS_SQL = """
+DELETE FROM {table}
+ WHERE id IN (
+    SELECT id FROM {table}
+     WHERE status = ANY(%(statuses)s) AND updated_at < %(cutoff)s
+     ORDER BY id
+     LIMIT %(limit)s
+     FOR UPDATE SKIP LOCKED
+ )
+RETURNING id, customer_id, attachments, status, created_at, resolved_at
+"""
+
+_PURGE_CUSTOMERS_SQL = f"""
+DELETE FROM {Customer._meta.db_table}
+ WHERE id IN (
+    SELECT c.id FROM {Customer._meta.db_table} AS c
+     WHERE c.updated_at < %(cutoff)s
+       AND NOT EXISTS (SELECT 1 FROM {Ticket._meta.db_table} AS t WHERE t.customer_id = c.id)
+       AND NOT EXISTS (SELECT 1 FROM {ArchivedTicket._meta.db_table} AS a WHERE a.customer_id = c.id)
+     ORDER BY c.id
+     LIMIT %(limit)s
+     FOR UPDATE SKIP LOCKED
+ )
+RETURNING id
+"""
+
+_RESTORE_SQL = f"""
+WITH moved AS (
+    DELETE FROM {ArchivedTicket._meta.db_table} WHERE id = ANY(%(ids)s)
+    RETURNING {_ARCHIVE_COLUMNS}
+)
+INSERT INTO {Ticket._meta.db_table} ({_ARCHIVE_COLUMNS})
+SELECT {_ARCHIVE_COLUMNS} FROM moved
+RETURNING id
+"""
+
+# Agent workload index (AgentWorkloadService): one Redis sorted set per
+# tenant, member = staff user id, score = open tickets * 2**32 + the agent's
+# last assignment sequence number. The lowest score is the least-loaded agent
+# and, among equally loaded ones, the least recently assigned (round-robin).
+WORKLOAD_KEY_PREFIX = 'helpdesk:workload'
+WORKLOAD_INDEX_TTL = 3600
+# Tickets in these statuses no longer count towards their assignee's workload
+WORKLOAD_DONE_STATUSES = ARCHIVE_STATUSES
+_WORKLOAD_SHIFT = 2 ** 32
+
+# Take the lowest-scored agent and count one more ticket against them.
+# KEYS: index, sequence (also marks the index as built); ARGV: capacity, shift.
+# Returns the agent id, nil when everyone is at capacity, -1 when not built.
+_CLAIM_LUA = """
+if redis.call('EXISTS', KEYS[2]) == 0 then return -1 end
+local lowest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+if #lowest == 0 then return nil end
+local shift = tonumber(ARGV[2])
+local load = math.floor(tonumber(lowest[2]) / shift)
+if load >= tonumber(ARGV[1]) then return nil end
+local sequence = redis.call('INCR', KEYS[2]) % shift
+redis.call('ZADD', KEYS[1], string.format('%.0f', (load + 1) * shift + sequence), lowest[1])
+return lowest[1]
+"""
+
+# ARGV: agent id, score increment, ... Agents missing from the index are not eligible and stay out.
+_ADJUST_LUA = """
+for i = 1, #ARGV, 2 do
+    if redis.call('ZSCORE', KEYS[1], ARGV[i]) then
+        redis.call('ZINCRBY', KEYS[1], ARGV[i + 1], ARGV[i])
+    end
+end
+return 0
+"""
 
 
 class TicketService:
@@ -13,6 +133,20 @@ class TicketService:
     Service class for ticket business logic
     """
     
+    @staticmethod
+    def visible_ticket_ids(user):
+        """
+        Ids of the tickets a regular (non-staff) user may see: assigned to them,
+        or raised by their customer record.
+        Built as a UNION of two index scans (assignee_id, customer_id) rather
+        than an OR across a join on customers.email, which forces a full scan.
+        """
+        visible = Ticket.objects.filter(assignee=user).order_by().values('id')
+        customer_id = CustomerService.get_id_for_user(user)
+        if customer_id is not None:
+            visible = visible.union(Ticket.objects.filter(customer_id=customer_id).order_by().values('id'))
+        return visible
+    
     @staticmethod
     def _get_default_resolution_minutes(priority: str) -> int:
         defaults = {
@@ -23,33 +157,107 @@ class TicketService:
         }
         return defaults.get(priority, 24 * 60)
     
+    @staticmethod
+    def _get_default_response_minutes(priority: str) -> int:
+        defaults = {
+            'Critical': 60,       # 1 hour
+            'High': 2 * 60,       # 2 hours
+            'Medium': 4 * 60,     # 4 hours
+            'Low': 8 * 60,        # 8 hours
+        }
+        return defaults.get(priority, 4 * 60)
+    
+    @staticmethod
+    def _get_active_policy(priority: str):
+        return SLAPolicy.objects.filter(priority=priority, is_active=True).first()
+    
+    @staticmethod
+    def _deadline(base_time: datetime, minutes, default_minutes: int, sla_policy: SLAPolicy = None) -> datetime:
+        """base_time plus the policy's minutes (or the default), in business hours if the policy says so"""
+        if not minutes or minutes <= 0:
+            minutes = default_minutes
+        if sla_policy and sla_policy.business_hours_only:
+            return TicketService._calculate_business_hours_due(base_time, minutes)
+        return base_time + relativedelta(minutes=minutes)
+    
     @staticmethod
     def calculate_due_at(ticket: Ticket, sla_policy: SLAPolicy = None) -> datetime:
         """
         Calculate due_at timestamp based on SLA policy and business hours
         """
-        base_time = timezone.now()
-        
-        if not sla_policy:
-            sla_policy = SLAPolicy.objects.filter(
-                priority=ticket.priority,
-                is_active=True
-            ).first()
-        
-        if sla_policy:
-            resolution_minutes = sla_policy.resolution_time or 0
-            if resolution_minutes <= 0:
-                resolution_minutes = TicketService._get_default_resolution_minutes(ticket.priority)
-            if sla_policy.business_hours_only:
-                return TicketService._calculate_business_hours_due(
-                    base_time,
-                    resolution_minutes
-                )
-            return base_time + relativedelta(minutes=resolution_minutes)
+        sla_policy = sla_policy or TicketService._get_active_policy(ticket.priority)
+        return TicketService._deadline(
+            timezone.now(),
+            sla_policy.resolution_time if sla_policy else None,
+            TicketService._get_default_resolution_minutes(ticket.priority),
+            sla_policy
+        )
+    
+    @staticmethod
+    def calculate_response_due_at(ticket: Ticket, sla_policy: SLAPolicy = None) -> datetime:
+        """
+        Calculate the first response deadline from SLAPolicy.response_time
+        """
+        sla_policy = sla_policy or TicketService._get_active_policy(ticket.priority)
+        return TicketService._deadline(
+            timezone.now(),
+            sla_policy.response_time if sla_policy else None,
+            TicketService._get_default_response_minutes(ticket.priority),
+            sla_policy
+        )
+    
+    @staticmethod
+    def set_sla_deadlines(ticket: Ticket, sla_policy: SLAPolicy = None, recalculate: bool = False) -> Ticket:
+        """
+        Fill in due_at and response_due_at with one SLA policy lookup.
+        Deadlines already set are kept unless recalculate is True; a ticket
+        that already had its first response, or is resolved or closed, gets
+        no response deadline.
+        """
+        awaiting_response = not ticket.first_response_at and ticket.status not in ARCHIVE_STATUSES
+        needs_due = recalculate or not ticket.due_at
+        needs_response = awaiting_response and (recalculate or not ticket.response_due_at)
+        if needs_due or needs_response:
+            sla_policy = sla_policy or TicketService._get_active_policy(ticket.priority)
+            if needs_due:
+                ticket.due_at = TicketService.calculate_due_at(ticket, sla_policy)
+            if needs_response:
+                ticket.response_due_at = TicketService.calculate_response_due_at(ticket, sla_policy)
+        if not awaiting_response:
+            ticket.response_due_at = None
+        return ticket
+    
+    @staticmethod
+    def calculate_deadlines_by_priority(base_time: datetime = None) -> dict:
+        """
+        Calculate (due_at, response_due_at) for every priority with a single
+        SLA policy query. Used by set-based code paths that cannot afford a
+        lookup per ticket.
+        """
+        base_time = base_time or timezone.now()
+        policies = {
+            policy.priority: policy
+            for policy in SLAPolicy.objects.filter(is_active=True)
+        }
         
-        # No SLA policy found, use sensible defaults per priority
-        fallback_minutes = TicketService._get_default_resolution_minutes(ticket.priority)
-        return base_time + relativedelta(minutes=fallback_minutes)
+        deadlines = {}
+        for priority, _ in Ticket.PRIORITY_CHOICES:
+            policy = policies.get(priority)
+            deadlines[priority] = (
+                TicketService._deadline(base_time, policy.resolution_time if policy else None,
+                                        TicketService._get_default_resolution_minutes(priority), policy),
+                TicketService._deadline(base_time, policy.response_time if policy else None,
+                                        TicketService._get_default_response_minutes(priority), policy),
+            )
+        return deadlines
+    
+    @staticmethod
+    def calculate_due_at_by_priority(base_time: datetime = None) -> dict:
+        """Calculate due_at for every priority with a single SLA policy query"""
+        return {
+            priority: due_at
+            for priority, (due_at, _) in TicketService.calculate_deadlines_by_priority(base_time).items()
+        }
             
     @staticmethod
     def _calculate_business_hours_due(start_time: datetime, minutes: int) -> datetime:
@@ -120,18 +328,17 @@ class TicketService:
         elif new_status != 'Resolved' and old_status == 'Resolved':
             ticket.resolved_at = None
         
-        ticket.save()
+        ticket.save(actor=user)
         return ticket
     
     @staticmethod
-    def assign_ticket(ticket: Ticket, assignee, sla_policy: SLAPolicy = None):
+    def assign_ticket(ticket: Ticket, assignee, sla_policy: SLAPolicy = None, user=None):
         """
-        Assign ticket and recalculate due_at
+        Assign ticket and recalculate its SLA deadlines
         """
         ticket.assignee = assignee
-        if sla_policy or not ticket.due_at:
-            ticket.due_at = TicketService.calculate_due_at(ticket, sla_policy)
-        ticket.save()
+        TicketService.set_sla_deadlines(ticket, sla_policy, recalculate=bool(sla_policy))
+        ticket.save(actor=user)
         return ticket
     
     @staticmethod
@@ -144,19 +351,55 @@ class TicketService:
         
         return timezone.now() > ticket.due_at and ticket.status not in ['Resolved', 'Closed']
 
+    @staticmethod
+    def check_response_breach(ticket: Ticket) -> bool:
+        """
+        Check if ticket is past its first response deadline without a response
+        """
+        if not ticket.response_due_at or ticket.first_response_at:
+            return False
+        
+        return timezone.now() > ticket.response_due_at and ticket.status not in ['Resolved', 'Closed']
+
     @staticmethod
     def get_time_to_escalation(ticket: Ticket):
         if not ticket.due_at:
             return None
         return ticket.due_at - timezone.now()
 
+    @staticmethod
+    def overdue_q(now=None) -> Q:
+        """Same rule as check_sla_breach, as a filter evaluated in SQL; matches tickets_open_due_idx"""
+        return Q(due_at__lt=now or Now()) & ~Q(status__in=['Resolved', 'Closed'])
+    
+    @staticmethod
+    def response_overdue_q(now=None) -> Q:
+        """Same rule as check_response_breach; matches tickets_response_due_idx"""
+        return Q(first_response_at__isnull=True, response_due_at__lt=now or Now()) & ~Q(status__in=['Resolved', 'Closed'])
+    
+    @staticmethod
+    def annotate_is_overdue(queryset):
+        """Add an is_overdue boolean computed by the database"""
+        return queryset.annotate(
+            is_overdue=Case(
+                When(TicketService.overdue_q(), then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            )
+        )
+
     @staticmethod
     def format_time_to_escalation(ticket: Ticket):
+        return TicketService.format_escalation(ticket.status, ticket.due_at)
+    
+    @staticmethod
+    def format_escalation(status: str, due_at, now=None):
+        """Escalation timer from plain values; pass now to reuse one clock across many rows"""
         # Don't show timer for resolved or closed tickets
-        if ticket.status in ['Resolved', 'Closed']:
+        if status in ['Resolved', 'Closed']:
             return None
         
-        delta = TicketService.get_time_to_escalation(ticket)
+        delta = due_at - (now or timezone.now()) if due_at else None
         if delta is None:
             return {
                 'label': 'No SLA deadline',
@@ -192,3 +435,533 @@ class TicketService:
             'seconds': total_seconds,
         }
 
+
+class TicketActivityService:
+    """
+    Writes and reads the append-only TicketActivity log.
+    ORM saves record their own events (Ticket.save); set-based writes call
+    record_bulk inside their transaction. Analytics read the log instead of
+    scanning tickets.
+    """
+    
+    @staticmethod
+    def record_bulk(rows, tracked, actor_id=None, at=None) -> int:
+        """
+        Store events for rows of (id, customer_id, old_field, new_field, ...)
+        in the order of `tracked`, as returned by TicketBulkService._execute
+        """
+        events = []
+        for row in rows:
+            values = row[2:]
+            previous = {field: values[2 * index] for index, field in enumerate(tracked)}
+            current = {field: values[2 * index + 1] for index, field in enumerate(tracked)}
+            events.extend(TicketActivity.changes(row[0], previous, current, actor_id, at))
+        TicketActivity.objects.using(tenant_db_alias()).bulk_create(events)
+        return len(events)
+    
+    @staticmethod
+    def time_in_status(ticket_id: int, now=None) -> dict:
+        """Seconds the ticket has spent in each status, from one index range scan of its timeline"""
+        now = now or timezone.now()
+        events = TicketActivity.objects.filter(
+            ticket_id=ticket_id, event__in=[TicketActivity.EVENT_CREATED, 'status']
+        ).order_by('created_at', 'id').values_list('new_value', 'created_at')
+        durations = {}
+        previous = None
+        for status, changed_at in list(events) + [(None, now)]:
+            if previous:
+                durations[previous[0]] = durations.get(previous[0], 0) + (changed_at - previous[1]).total_seconds()
+            previous = (status, changed_at)
+        return {status: int(seconds) for status, seconds in durations.items()}
+    
+    @staticmethod
+    def reassignment_counts(since) -> dict:
+        """Assignee changes per ticket since a point in time, read from the created_at index"""
+        counts = TicketActivity.objects.filter(created_at__gte=since, event='assignee').values('ticket_id') \
+            .annotate(total=Count('id')).order_by()
+        return {row['ticket_id']: row['total'] for row in counts}
+
+
+class TicketBulkService:
+    """
+    Set-based ticket operations.
+    Each operation is a single UPDATE ... WHERE id = ANY(...) instead of a
+    get/clean/save round trip per ticket.
+    """
+    
+    @staticmethod
+    def _execute(set_sql: str, params: dict, ticket_ids, user=None, where_sql: str = '',
+                 track_customer_stats: bool = False):
+        """
+        Run one UPDATE against the tenant's tickets table and return the updated ids.
+        Non-managers may only touch tickets assigned to them.
+        """
+        params = dict(params, ids=list(ticket_ids), now=timezone.now())
+        scope_sql = TicketBulkService._scope_sql(params, user)
+        # The locked pre-update values feed the TicketActivity events and the
+        # customer aggregate deltas; they are renamed so unqualified columns in
+        # set_sql/where_sql stay unambiguous
+        tracked = list(TicketActivity.TRACKED_FIELDS)
+        sql = (
+            f"WITH old AS (SELECT id AS old_id, {', '.join(f'{field} AS old_{field}' for field in tracked)}, "
+            f'resolved_at AS old_resolved_at '
+            f'FROM {Ticket._meta.db_table} WHERE id = ANY(%(ids)s) FOR UPDATE) '
+            f'UPDATE {Ticket._meta.db_table} '
+            f'SET {set_sql}, updated_at = %(now)s '
+            f'FROM old WHERE id = old_id{scope_sql}{where_sql} '
+            f"RETURNING id, customer_id, {', '.join(f'old_{field}, {field}' for field in tracked)}, "
+            f'created_at, old_resolved_at, resolved_at'
+        )
+        with transaction.atomic(using=tenant_db_alias()):
+            with tenant_connection().cursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+            # The raw UPDATE bypasses db_for_write; pin this client to the primary all the same
+            if rows:
+                mark_written()
+            if track_customer_stats:
+                status = 2 + 2 * tracked.index('status')
+                CustomerStatsService.apply(
+                    ((row[1], row[status], row[-3], row[-2]), (row[1], row[status + 1], row[-3], row[-1]))
+                    for row in rows
+                )
+            TicketActivityService.record_bulk(rows, tracked, getattr(user, 'pk', None), params['now'])
+            AgentWorkloadService.track((
+                ({field: row[2 + 2 * index] for index, field in enumerate(tracked)},
+                 {field: row[3 + 2 * index] for index, field in enumerate(tracked)})
+                for row in rows
+            ), using=tenant_db_alias())
+            publish_many_on_commit(tenant_connection().schema_name, [
+                (TICKET_UPDATED, {
+                    'id': row[0], 'customer_id': row[1], 'updated_at': params['now'],
+                    **{field: row[3 + 2 * index] for index, field in enumerate(tracked)},
+                })
+                for row in rows
+            ], using=tenant_db_alias())
+        updated_ids = [row[0] for row in rows]
+        # Raw UPDATEs bypass post_save, so invalidate cached ticket data explicitly
+        if updated_ids:
+            invalidate_models(Ticket)
+        return updated_ids
+    
+    @staticmethod
+    def _scope_sql(params: dict, user) -> str:
+        if user is None or user.is_staff or getattr(user, 'is_manager', False):
+            return ''
+        params['scope_user_id'] = user.pk
+        return ' AND assignee_id = %(scope_user_id)s'
+    
+    @staticmethod
+    def _result(operation: str, ticket_ids, updated_ids, user=None, rejected_code: str = 'NOT_FOUND') -> dict:
+        """
+        Build a compact per-id result.
+        Ids that were not updated are checked with one extra query to tell
+        missing tickets apart from rejected transitions.
+        """
+        updated = set(updated_ids)
+        pending = [ticket_id for ticket_id in ticket_ids if ticket_id not in updated]
+        failed = {}
+        if pending:
+            params = {'ids': pending}
+            scope_sql = TicketBulkService._scope_sql(params, user)
+            with tenant_connection().cursor() as cursor:
+                cursor.execute(
+                    f'SELECT id FROM {Ticket._meta.db_table} WHERE id = ANY(%(ids)s){scope_sql}',
+                    params
+                )
+                existing = {row[0] for row in cursor.fetchall()}
+            for ticket_id in pending:
+                failed[str(ticket_id)] = rejected_code if ticket_id in existing else 'NOT_FOUND'
+        
+        return {
+            'operation': operation,
+            'updated': sorted(updated),
+            'failed': failed,
+        }
+    
+    @staticmethod
+    def update_status(ticket_ids, new_status: str, user=None, operation: str = 'status') -> dict:
+        """
+        Bulk status change applying the same state machine as
+        TicketService.update_ticket_status, evaluated per row in SQL.
+        """
+        set_sql = (
+            "first_response_at = CASE "
+            "WHEN status = 'New' AND %(status)s IN ('Open', 'In Progress') "
+            "AND first_response_at IS NULL THEN %(now)s "
+            "ELSE first_response_at END, "
+            "response_due_at = CASE "
+            "WHEN %(status)s IN ('Resolved', 'Closed') THEN NULL "
+            "WHEN status = 'New' AND %(status)s IN ('Open', 'In Progress') THEN NULL "
+            "WHEN first_response_at IS NOT NULL THEN NULL "
+            "ELSE response_due_at END, "
+            "resolved_at = CASE "
+            "WHEN %(status)s = 'Resolved' AND status <> 'Resolved' THEN %(now)s "
+            "WHEN %(status)s <> 'Resolved' AND status = 'Resolved' THEN NULL "
+            "ELSE resolved_at END, "
+            "status = %(status)s"
+        )
+        # Same business constraint as Ticket.clean()
+        where_sql = " AND NOT (status = 'Resolved' AND %(status)s = 'New')"
+        updated_ids = TicketBulkService._execute(
+            set_sql, {'status': new_status}, ticket_ids, user, where_sql, track_customer_stats=True
+        )
+        return TicketBulkService._result(operation, ticket_ids, updated_ids, user, 'INVALID_TRANSITION')
+    
+    @staticmethod
+    def close(ticket_ids, user=None) -> dict:
+        """Bulk force close"""
+        return TicketBulkService.update_status(ticket_ids, 'Closed', user, operation='close')
+    
+    @staticmethod
+    def assign(ticket_ids, assignee_id, user=None) -> dict:
+        """
+        Bulk assignment. Tickets without a due_at (or, still awaiting a first
+        response, without a response_due_at) get one computed per priority,
+        mirroring TicketService.assign_ticket.
+        """
+        params = {'assignee_id': assignee_id}
+        due_cases = []
+        response_cases = []
+        for priority, (due_at, response_due_at) in TicketService.calculate_deadlines_by_priority().items():
+            key = f'due_{priority.lower()}'
+            params[f'{key}_priority'] = priority
+            params[key] = due_at
+            params[f'{key}_response'] = response_due_at
+            due_cases.append(f'WHEN %({key}_priority)s THEN %({key})s')
+            response_cases.append(f'WHEN %({key}_priority)s THEN %({key}_response)s')
+        set_sql = (
+            'assignee_id = %(assignee_id)s, '
+            f"due_at = COALESCE(due_at, CASE priority {' '.join(due_cases)} END), "
+            'response_due_at = CASE WHEN first_response_at IS NULL '
+            f"THEN COALESCE(response_due_at, CASE priority {' '.join(response_cases)} END) END"
+        )
+        updated_ids = TicketBulkService._execute(set_sql, params, ticket_ids, user)
+        return TicketBulkService._result('assign', ticket_ids, updated_ids, user)
+    
+    @staticmethod
+    def update_priority(ticket_ids, priority: str, user=None) -> dict:
+        """Bulk priority change"""
+        updated_ids = TicketBulkService._execute(
+            'priority = %(priority)s', {'priority': priority}, ticket_ids, user
+        )
+        return TicketBulkService._result('priority', ticket_ids, updated_ids, user)
+    
+    @staticmethod
+    def update_tags(ticket_ids, tags, mode: str = 'add', user=None) -> dict:
+        """
+        Bulk tag change. mode is one of add, remove or set.
+        Tag order is preserved and duplicates are not introduced.
+        """
+        if mode == 'set':
+            set_sql = 'tags = %(tags)s::jsonb'
+        elif mode == 'remove':
+            set_sql = (
+                "tags = (SELECT COALESCE(jsonb_agg(t.value ORDER BY t.ordinality), '[]'::jsonb) "
+                "FROM jsonb_array_elements(tags) WITH ORDINALITY AS t(value, ordinality) "
+                "WHERE NOT %(tags)s::jsonb @> jsonb_build_array(t.value))"
+            )
+        else:
+            set_sql = (
+                "tags = tags || (SELECT COALESCE(jsonb_agg(t.value ORDER BY t.ordinality), '[]'::jsonb) "
+                "FROM jsonb_array_elements(%(tags)s::jsonb) WITH ORDINALITY AS t(value, ordinality) "
+                "WHERE NOT tags @> jsonb_build_array(t.value))"
+            )
+        updated_ids = TicketBulkService._execute(
+            set_sql, {'tags': json.dumps(list(dict.fromkeys(tags)))}, ticket_ids, user
+        )
+        return TicketBulkService._result('tags', ticket_ids, updated_ids, user)
+
+
+class TicketArchiveService:
+    """
+    Hot/archive split of the tickets table.
+    Resolved and Closed tickets untouched for TICKET_ARCHIVE_AFTER_DAYS move to
+    tickets_archive in batches, each its own short transaction, so the indexes
+    and scans behind open-ticket queries only cover live tickets. The archive
+    is read only where asked for explicitly (archived ticket API and admin).
+    """
+    
+    @staticmethod
+    def archive(older_than_days: int = None, batch_size: int = None, max_batches: int = None) -> int:
+        """Move old closed tickets of the current tenant to the archive, returns the number moved"""
+        if older_than_days is None:
+            older_than_days = settings.TICKET_ARCHIVE_AFTER_DAYS
+        batch_size = batch_size or settings.TICKET_ARCHIVE_BATCH_SIZE
+        now = timezone.now()
+        params = {
+            'statuses': list(ARCHIVE_STATUSES),
+            'cutoff': now - timedelta(days=older_than_days),
+            'limit': batch_size,
+            'now': now,
+        }
+        
+        moved = batches = 0
+        while max_batches is None or batches < max_batches:
+            with transaction.atomic(using=tenant_db_alias()), tenant_connection().cursor() as cursor:
+                cursor.execute(_ARCHIVE_SQL, params)
+                count = cursor.rowcount
+            moved += count
+            batches += 1
+            if count < batch_size:
+                break
+        # Customer aggregates count archived tickets too, so they stay as they are
+        if moved:
+            invalidate_models(Ticket, ArchivedTicket)
+        return moved
+    
+    @staticmethod
+    def restore(ticket_ids) -> list:
+        """Move archived tickets back to the tickets table (e.g. to reopen them), returns the restored ids"""
+        with transaction.atomic(using=tenant_db_alias()), tenant_connection().cursor() as cursor:
+            cursor.execute(_RESTORE_SQL, {'ids': list(ticket_ids)})
+            restored = [row[0] for row in cursor.fetchall()]
+        if restored:
+            invalidate_models(Ticket, ArchivedTicket)
+        return restored
+
+
+class RetentionService:
+    """
+    Applies a tenant's retention policy (Client.ticket_retention_days,
+    Client.customer_retention_days). Rows are deleted in small keyed,
+    throttled batches (helpdesk_system.purge.BatchedDelete), never through
+    QuerySet.delete(), which loads every object to cascade.
+    """
+    
+    @staticmethod
+    def purge_tenant(tenant, progress_callback=None, **options) -> dict:
+        """
+        Purge the current tenant's expired data, returns rows deleted per resource.
+        progress_callback(resource, deleted) is called after every batch.
+        """
+        result = {}
+        if tenant.ticket_retention_days is not None:
+            result['tickets'] = RetentionService.purge_tickets(
+                tenant.ticket_retention_days, progress_callback, **options
+            )
+        # After the tickets, so customers they belonged to can go in the same run
+        if tenant.customer_retention_days is not None:
+            result['customers'] = RetentionService.purge_customers(
+                tenant.customer_retention_days, progress_callback, **options
+            )
+        return result
+    
+    @staticmethod
+    def purge_tickets(retention_days: int, progress_callback=None, **options) -> int:
+        """Delete Resolved/Closed tickets, live and archived, unchanged for retention_days"""
+        params = {
+            'statuses': list(ARCHIVE_STATUSES),
+            'cutoff': timezone.now() - timedelta(days=retention_days),
+        }
+        deleted = 0
+        for model in (Ticket, ArchivedTicket):
+            job = BatchedDelete(
+                _PURGE_TICKETS_SQL.format(table=model._meta.db_table), params,
+                on_batch=RetentionService._purge_ticket_batch,
+                on_commit=RetentionService._delete_attachments,
+                **options
+            )
+            job.run(RetentionService._progress('tickets', deleted, progress_callback))
+            deleted += job.deleted
+        if deleted:
+            invalidate_models(Ticket, ArchivedTicket)
+        return deleted
+    
+    @staticmethod
+    def purge_customers(retention_days: int, progress_callback=None, **options) -> int:
+        """Delete customers without any ticket, unchanged for retention_days"""
+        job = BatchedDelete(
+            _PURGE_CUSTOMERS_SQL, {'cutoff': timezone.now() - timedelta(days=retention_days)}, **options
+        )
+        deleted = job.run(RetentionService._progress('customers', 0, progress_callback))
+        if deleted:
+            invalidate_models(Customer)
+        return deleted
+    
+    @staticmethod
+    def _progress(resource: str, offset: int, progress_callback):
+        if progress_callback is None:
+            return None
+        return lambda deleted, batches: progress_callback(resource, offset + deleted)
+    
+    @staticmethod
+    def _purge_ticket_batch(rows):
+        """Inside the batch transaction: take the tickets off their customers' aggregates and drop their history"""
+        CustomerStatsService.apply(((row[1], *row[3:]), None) for row in rows)
+        with tenant_connection().cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {TicketActivity._meta.db_table} WHERE ticket_id = ANY(%s)',
+                [[row[0] for row in rows]]
+            )
+    
+    @staticmethod
+    def _delete_attachments(rows):
+        """Remove stored attachment files of purged tickets; external URLs are left alone"""
+        for _, _, attachments, *_ in rows:
+            for path in attachments or []:
+                if not isinstance(path, str) or path.startswith(('http://', 'https://')):
+                    continue
+                try:
+                    default_storage.delete(path)
+                except Exception as exc:
+                    logger.warning(f'[retention] Could not delete attachment {path}: {exc}')
+
+
+class AgentWorkloadService:
+    """
+    Per-tenant index of open tickets per staff agent, kept in Redis.
+    Ticket.save and TicketBulkService apply +1/-1 deltas once their
+    transaction commits; claim() pops the least-loaded agent in O(log n)
+    instead of counting tickets per agent. rebuild() recounts from the
+    database with one grouped query, on demand and from the periodic
+    auto_assign_tickets task, which also corrects any drift (deleted tickets,
+    rolled-back claims, staff changes). Only tenants with Client.auto_assign
+    maintain an index.
+    """
+    
+    @staticmethod
+    def enabled() -> bool:
+        return getattr(tenant_connection().tenant, 'auto_assign', False)
+    
+    @staticmethod
+    def capacity() -> int:
+        capacity = getattr(tenant_connection().tenant, 'agent_capacity', None)
+        return settings.AUTO_ASSIGN_CAPACITY if capacity is None else capacity
+    
+    @staticmethod
+    def _keys():
+        key = f'{WORKLOAD_KEY_PREFIX}:{tenant_connection().schema_name}'
+        return key, f'{key}:seq'
+    
+    @staticmethod
+    def load_of(snapshot):
+        """Assignee a ticket snapshot (status, assignee_id) counts against, or None"""
+        if not snapshot or 'status' not in snapshot or 'assignee_id' not in snapshot:
+            return None
+        if snapshot['status'] in WORKLOAD_DONE_STATUSES:
+            return None
+        return snapshot['assignee_id']
+    
+    @staticmethod
+    def track(changes, using=None):
+        """
+        Queue the workload deltas of (previous, current) ticket snapshots,
+        applied when the transaction commits. previous is None for a new ticket.
+        """
+        if not AgentWorkloadService.enabled():
+            return
+        deltas = {}
+        for previous, current in changes:
+            if previous is not None and ('status' not in previous or 'assignee_id' not in previous):
+                continue  # deferred fields; the next rebuild catches up
+            before, after = AgentWorkloadService.load_of(previous), AgentWorkloadService.load_of(current)
+            if before == after:
+                continue
+            if before is not None:
+                deltas[before] = deltas.get(before, 0) - 1
+            if after is not None:
+                deltas[after] = deltas.get(after, 0) + 1
+        deltas = {agent_id: delta for agent_id, delta in deltas.items() if delta}
+        if deltas:
+            keys = AgentWorkloadService._keys()
+            transaction.on_commit(lambda: AgentWorkloadService._adjust(keys, deltas), using=using)
+    
+    @staticmethod
+    def _adjust(keys, deltas):
+        args = []
+        for agent_id, delta in deltas.items():
+            args.extend([agent_id, delta * _WORKLOAD_SHIFT])
+        try:
+            get_redis_connection('default').eval(_ADJUST_LUA, 1, keys[0], *args)
+        except Exception as exc:
+            logger.warning(f'[workload] Could not adjust {keys[0]}: {exc}')
+    
+    @staticmethod
+    def claim():
+        """Least-loaded agent below capacity with the ticket counted against them, or None"""
+        keys = AgentWorkloadService._keys()
+        try:
+            client = get_redis_connection('default')
+            agent_id = client.eval(_CLAIM_LUA, 2, *keys, AgentWorkloadService.capacity(), _WORKLOAD_SHIFT)
+            if agent_id == -1:
+                AgentWorkloadService.rebuild()
+                agent_id = client.eval(_CLAIM_LUA, 2, *keys, AgentWorkloadService.capacity(), _WORKLOAD_SHIFT)
+        except Exception as exc:
+            logger.warning(f'[workload] Could not claim an agent from {keys[0]}: {exc}')
+            return None
+        return int(agent_id) if agent_id not in (None, -1) else None
+    
+    @staticmethod
+    def rebuild() -> int:
+        """Recount open tickets per active staff user and replace the index, returns the number of agents"""
+        agents = list(get_user_model().objects.filter(is_staff=True, is_active=True).values_list('pk', flat=True))
+        loads = dict(
+            Ticket.objects.filter(assignee_id__in=agents).exclude(status__in=WORKLOAD_DONE_STATUSES)
+            .values('assignee_id').annotate(total=Count('id')).order_by().values_list('assignee_id', 'total')
+        )
+        key, sequence_key = AgentWorkloadService._keys()
+        client = get_redis_connection('default')
+        # Agents keep their place in the rotation
+        previous = {int(member): int(score) % _WORKLOAD_SHIFT for member, score in client.zrange(key, 0, -1, withscores=True)}
+        pipeline = client.pipeline()
+        pipeline.delete(key)
+        if agents:
+            pipeline.zadd(key, {
+                agent_id: loads.get(agent_id, 0) * _WORKLOAD_SHIFT + previous.get(agent_id, 0) for agent_id in agents
+            })
+            pipeline.expire(key, WORKLOAD_INDEX_TTL)
+        pipeline.set(sequence_key, 0, nx=True)
+        pipeline.expire(sequence_key, WORKLOAD_INDEX_TTL)
+        pipeline.execute()
+        return len(agents)
+    
+    @staticmethod
+    def current_loads() -> dict:
+        """Agent id -> open tickets, least loaded first"""
+        key, _ = AgentWorkloadService._keys()
+        try:
+            rows = get_redis_connection('default').zrange(key, 0, -1, withscores=True)
+        except Exception as exc:
+            logger.warning(f'[workload] Could not read {key}: {exc}')
+            return {}
+        return {int(member): int(score) // _WORKLOAD_SHIFT for member, score in rows}
+
+
+class TicketAssignmentService:
+    """
+    Automatic assignment of tickets to the least-loaded staff agent, for
+    tenants with Client.auto_assign. New tickets are assigned as they are
+    created; agents holding the tenant's capacity of open tickets are
+    skipped, and tickets nobody can take stay unassigned until
+    assign_backlog() finds room.
+    """
+    
+    @staticmethod
+    def auto_assign(ticket) -> bool:
+        """Give an unassigned open ticket an agent before it is saved, True when one was found"""
+        if ticket.assignee_id or ticket.status in WORKLOAD_DONE_STATUSES or not AgentWorkloadService.enabled():
+            return False
+        agent_id = AgentWorkloadService.claim()
+        if agent_id is None:
+            return False
+        ticket.assignee_id = agent_id
+        # Already counted by claim(); Ticket.save must not count it again
+        ticket._workload_claim = {'status': ticket.status, 'assignee_id': agent_id}
+        return True
+    
+    @staticmethod
+    def assign_backlog(limit: int = None) -> int:
+        """Assign open unassigned tickets, earliest deadline first, until agents are full. Returns the number assigned."""
+        limit = limit or settings.AUTO_ASSIGN_BACKLOG_BATCH
+        assigned = 0
+        with transaction.atomic(using=tenant_db_alias()):
+            backlog = Ticket.objects.filter(assignee__isnull=True).exclude(status__in=WORKLOAD_DONE_STATUSES) \
+                .order_by(F('due_at').asc(nulls_last=True), 'id').select_for_update(skip_locked=True)[:limit]
+            for ticket in backlog:
+                if not TicketAssignmentService.auto_assign(ticket):
+                    break
+                TicketService.set_sla_deadlines(ticket)
+                ticket.save()
+                assigned += 1
+        return assigned
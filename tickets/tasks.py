@@ -4,61 +4,222 @@ Celery tasks for ticket management
 from celery import shared_task
 from django.core.mail import send_mail
 from django.conf import settings
-from django_tenants.utils import tenant_context
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from datetime import timedelta
+import io
 
+from helpdesk_system.db_routers import use_replica
+from helpdesk_system.events import TICKET_BREACHED, publish_many
 from tenants.models import Client
+from tenants.sharding import tenant_shard_context, tenants_by_shard
 from .models import Ticket
-from .services import TicketService
+from .services import (AgentWorkloadService, RetentionService, TicketArchiveService, TicketAssignmentService,
+                       TicketService)
 
 
 def _get_active_tenants():
     return Client.objects.filter(is_active=True)
 
 
+def _get_writable_tenants():
+    # Tenants being moved between shards (maintenance mode) must not be written
+    # to: the cut-over would leave those writes behind on the old shard
+    return _get_active_tenants().filter(maintenance_mode=False)
+
+
+# Tickets whose deadline passed this recently are pushed to live panels as
+# breached; the one-minute scan window plus slack for a late beat
+BREACH_EVENT_WINDOW = timedelta(minutes=2)
+
+
 @shared_task
 def monitor_sla_deadlines():
     """
     Periodic task to monitor SLA deadlines and trigger escalations
-    Runs every minute via Celery Beat
+    Runs every minute via Celery Beat; each shard is scanned by its own task
+    """
+    shards = [shard for shard, tenants in tenants_by_shard(_get_active_tenants()).items() if tenants]
+    for shard in shards:
+        monitor_shard_sla_deadlines.delay(shard)
+    return f"Queued SLA checks for shards: {', '.join(shards)}"
+
+
+@shared_task
+@use_replica
+def monitor_shard_sla_deadlines(shard):
+    """
+    Check SLA deadlines for every active tenant on one shard
     """
     summary = []
-    total_checked = 0
     total_breached = 0
+    now = timezone.now()
+    recent = now - BREACH_EVENT_WINDOW
 
-    for tenant in _get_active_tenants():
-        with tenant_context(tenant):
-            active_tickets = Ticket.objects.filter(
-                status__in=['New', 'Open', 'In Progress', 'Reopened']
-            ).select_related('assignee', 'customer', 'sla_policy')
+    for tenant in _get_active_tenants().filter(shard=shard):
+        with tenant_shard_context(tenant):
+            # One query per deadline so each is read from its partial index
+            # (tickets_open_due_idx, tickets_response_due_idx) instead of an OR scan
+            breached = {ticket.pk: ticket for ticket in Ticket.objects.filter(TicketService.overdue_q(now))}
+            for ticket in Ticket.objects.filter(TicketService.response_overdue_q(now)):
+                breached.setdefault(ticket.pk, ticket)
+            breached_tickets = list(breached.values())
 
-            breached_tickets = []
-            for ticket in active_tickets:
-                if TicketService.check_sla_breach(ticket):
-                    breached_tickets.append(ticket)
-                    notify_sla_breach.delay(ticket.id, tenant.schema_name)
+            events = []
+            for ticket in breached_tickets:
+                for breach, deadline in _breaches(ticket, now):
+                    newly_breached = deadline >= recent
+                    # Resolution breaches escalate on every run; a missed first
+                    # response is emailed once, when its deadline has just passed
+                    if breach == 'resolution' or newly_breached:
+                        notify_sla_breach.delay(ticket.id, tenant.schema_name, breach)
+                    # Only newly breached tickets; panels already show the older ones as overdue
+                    if newly_breached:
+                        events.append((TICKET_BREACHED, {**ticket.event_data(), 'breach': breach}))
+            publish_many(tenant.schema_name, events)
 
-            summary.append(f"{tenant.schema_name}: {len(breached_tickets)}/{active_tickets.count()}")
-            total_checked += active_tickets.count()
+            summary.append(f"{tenant.schema_name}: {len(breached_tickets)}")
             total_breached += len(breached_tickets)
 
-    return f"Checked {total_checked} tickets across tenants. Breaches: {total_breached}. Breakdown: {', '.join(summary)}"
+    return f"SLA breaches on shard {shard}: {total_breached}. Breakdown: {', '.join(summary)}"
+
+
+def _breaches(ticket, now):
+    """(kind, deadline) for each SLA deadline the ticket has missed"""
+    missed = []
+    if ticket.response_due_at and not ticket.first_response_at and ticket.response_due_at < now:
+        missed.append(('response', ticket.response_due_at))
+    if ticket.due_at and ticket.due_at < now:
+        missed.append(('resolution', ticket.due_at))
+    return missed
+
+
+@shared_task
+def archive_closed_tickets():
+    """
+    Periodic task moving old Resolved/Closed tickets to the archive table
+    Runs daily via Celery Beat; each shard is handled by its own task
+    """
+    shards = [shard for shard, tenants in tenants_by_shard(_get_writable_tenants()).items() if tenants]
+    for shard in shards:
+        archive_shard_closed_tickets.delay(shard)
+    return f"Queued ticket archival for shards: {', '.join(shards)}"
 
 
 @shared_task
-def notify_sla_breach(ticket_id, schema_name):
+def archive_shard_closed_tickets(shard):
     """
-    Send notification when SLA is breached
+    Archive old closed tickets for every active tenant on one shard
+    """
+    summary = []
+    for tenant in _get_writable_tenants().filter(shard=shard):
+        with tenant_shard_context(tenant):
+            summary.append(f"{tenant.schema_name}: {TicketArchiveService.archive()}")
+    return f"Archived tickets on shard {shard}: {', '.join(summary)}"
+
+
+def _tenants_with_retention():
+    return _get_writable_tenants().exclude(ticket_retention_days=None, customer_retention_days=None)
+
+
+@shared_task
+def purge_expired_data():
+    """
+    Periodic task applying tenants' retention policies
+    Runs daily via Celery Beat; each shard is purged by its own task
+    """
+    shards = [shard for shard, tenants in tenants_by_shard(_tenants_with_retention()).items() if tenants]
+    for shard in shards:
+        purge_shard_expired_data.delay(shard)
+    return f"Queued retention purges for shards: {', '.join(shards)}"
+
+
+@shared_task(bind=True)
+def purge_shard_expired_data(self, shard):
+    """
+    Purge expired tickets and customers for every tenant with a retention
+    policy on one shard, in throttled batches. Progress is published as task meta.
+    """
+    summary = {}
+    for tenant in _tenants_with_retention().filter(shard=shard):
+        def report(resource, deleted):
+            self.update_state(state='PROGRESS', meta={
+                'tenant': tenant.schema_name, 'resource': resource, 'deleted': deleted, 'done': summary,
+            })
+
+        with tenant_shard_context(tenant):
+            summary[tenant.schema_name] = RetentionService.purge_tenant(tenant, report)
+    return summary
+
+
+def _tenants_with_auto_assign():
+    return _get_writable_tenants().filter(auto_assign=True)
+
+
+@shared_task
+def auto_assign_tickets():
+    """
+    Periodic task assigning tickets that are still unassigned
+    Runs every minute via Celery Beat; each shard is handled by its own task
+    """
+    shards = [shard for shard, tenants in tenants_by_shard(_tenants_with_auto_assign()).items() if tenants]
+    for shard in shards:
+        auto_assign_shard_tickets.delay(shard)
+    return f"Queued auto-assignment for shards: {', '.join(shards)}"
+
+
+@shared_task
+def auto_assign_shard_tickets(shard):
+    """
+    Recount agent workloads and assign the unassigned backlog for every
+    tenant with auto-assignment on one shard
+    """
+    summary = []
+    for tenant in _tenants_with_auto_assign().filter(shard=shard):
+        with tenant_shard_context(tenant):
+            AgentWorkloadService.rebuild()
+            summary.append(f"{tenant.schema_name}: {TicketAssignmentService.assign_backlog()}")
+    return f"Auto-assigned tickets on shard {shard}: {', '.join(summary)}"
+
+
+@shared_task
+def notify_sla_breach(ticket_id, schema_name, breach='resolution'):
+    """
+    Send notification when SLA is breached (breach: 'resolution' or 'response')
     """
     tenant = Client.objects.filter(schema_name=schema_name).first()
     if not tenant:
         return f"Tenant {schema_name} not found"
 
-    with tenant_context(tenant):
+    with tenant_shard_context(tenant):
         try:
             ticket = Ticket.objects.select_related('assignee', 'customer', 'sla_policy').get(pk=ticket_id)
         except Ticket.DoesNotExist:
             return f"Ticket {ticket_id} not found in tenant {schema_name}"
     
+    if breach == 'response':
+        if ticket.first_response_at:
+            return f"Ticket {ticket_id} has been responded to"
+        # Only the assignee; the customer hears about resolution breaches
+        if ticket.assignee and ticket.assignee.email:
+            send_mail(
+                subject=f'First Response Overdue: {ticket.title}',
+                message=f'''
+Ticket #{ticket.id} has not had a first response within its SLA.
+
+Title: {ticket.title}
+Priority: {ticket.priority}
+Response Due At: {ticket.response_due_at}
+Current Status: {ticket.status}
+
+Please respond to the customer.
+                ''',
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[ticket.assignee.email],
+                fail_silently=True,
+            )
+        return f"Response breach notification sent for ticket {ticket_id}"
+    
     # Email to assignee if exists
     if ticket.assignee and ticket.assignee.email:
         send_mail(
@@ -104,7 +265,7 @@ def send_ticket_notification(ticket_id, schema_name, notification_type='created'
     if not tenant:
         return f"Tenant {schema_name} not found"
 
-    with tenant_context(tenant):
+    with tenant_shard_context(tenant):
         try:
             ticket = Ticket.objects.select_related('assignee', 'customer').get(pk=ticket_id)
         except Ticket.DoesNotExist:
@@ -151,3 +312,33 @@ Priority: {ticket.priority}
     
     return f"Notification sent for ticket {ticket_id}"
 
+
+@shared_task(bind=True)
+def import_tickets_job(self, file_path, schema_name, fmt='csv', batch_size=None):
+    """
+    Import an uploaded CSV/JSONL file into a tenant schema.
+    Progress (rows imported, rows per second) is published as task meta,
+    always with the schema_name the job belongs to.
+    """
+    from .importer import DEFAULT_BATCH_SIZE, TicketImporter, iter_records
+
+    tenant = Client.objects.filter(schema_name=schema_name).first()
+    if not tenant:
+        return {'schema_name': schema_name, 'error': f"Tenant {schema_name} not found"}
+    if tenant.maintenance_mode:
+        default_storage.delete(file_path)
+        return {'schema_name': schema_name, 'error': f"Tenant {schema_name} is in maintenance mode, retry the import later"}
+
+    def report(progress):
+        self.update_state(state='PROGRESS', meta={'schema_name': schema_name, **progress})
+
+    importer = TicketImporter(batch_size=batch_size or DEFAULT_BATCH_SIZE, progress_callback=report)
+    try:
+        with tenant_shard_context(tenant), default_storage.open(file_path, 'rb') as raw:
+            stream = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+            return {'schema_name': schema_name, **importer.run(iter_records(stream, fmt))}
+    except Exception as exc:
+        # Reported in the meta like other errors, so only the owning tenant can read it
+        return {'schema_name': schema_name, **importer.progress(), 'error': str(exc)}
+    finally:
+        default_storage.delete(file_path)
@@ -1,3 +1,32 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from .importer import TicketImporter
+
+
+class TicketImporterNormalizeTests(SimpleTestCase):
+    """Record validation in TicketImporter._normalize (no database needed)"""
+
+    def setUp(self):
+        self.importer = TicketImporter()
+
+    def _record(self, **fields):
+        return {'title': 'Printer on fire', 'customer_email': 'ann@example.com', **fields}
+
+    def test_valid_timestamp_is_parsed(self):
+        row = self.importer._normalize(self._record(created_at='2024-02-28 10:00'), 1)
+        self.assertEqual(row['created_at'].isoformat(), '2024-02-28T10:00:00+00:00')
+        self.assertEqual(self.importer.skipped, 0)
+
+    def test_empty_timestamp_is_none(self):
+        row = self.importer._normalize(self._record(created_at=''), 1)
+        self.assertIsNone(row['created_at'])
+
+    def test_impossible_date_is_rejected(self):
+        self.assertIsNone(self.importer._normalize(self._record(created_at='2024-02-30 10:00'), 3))
+        self.assertEqual(self.importer.skipped, 1)
+        self.assertIn('Record 3: invalid created_at "2024-02-30 10:00"', self.importer.errors[0])
+
+    def test_unparseable_text_is_rejected(self):
+        self.assertIsNone(self.importer._normalize(self._record(due_at='yesterday'), 4))
+        self.assertEqual(self.importer.skipped, 1)
+        self.assertIn('Record 4: invalid due_at "yesterday"', self.importer.errors[0])
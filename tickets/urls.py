@@ -1,9 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TicketViewSet, SLAPolicyViewSet
+from .views import ArchivedTicketViewSet, TicketActivityViewSet, TicketViewSet, SLAPolicyViewSet
 
 router = DefaultRouter()
+router.register(r'tickets/archive', ArchivedTicketViewSet, basename='archived-ticket')
 router.register(r'tickets', TicketViewSet, basename='ticket')
+router.register(r'ticket-activity', TicketActivityViewSet, basename='ticket-activity')
 router.register(r'sla-policies', SLAPolicyViewSet, basename='sla-policy')
 
 urlpatterns = [
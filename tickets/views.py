@@ -1,21 +1,60 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
+from django.db import connection
 from django.db.models import Q
-from .models import Ticket, SLAPolicy
-from .serializers import TicketSerializer, TicketListSerializer, SLAPolicySerializer
-from .permissions import IsTenantMember, IsAssigneeOrManager, CanForceCloseTicket
-from .services import TicketService
+from django.core.files.storage import default_storage
+from celery.result import AsyncResult
+import uuid
+from .models import ArchivedTicket, Ticket, TicketActivity, SLAPolicy
+from .serializers import (
+    TICKET_LIST_READ_MODEL, ArchivedTicketSerializer, TicketActivitySerializer, TicketSerializer,
+    TicketListSerializer, SLAPolicySerializer, TicketBulkActionSerializer
+)
+from .permissions import IsTenantMember, IsAssigneeOrManager, IsManager, CanForceCloseTicket
+from .services import AgentWorkloadService, TicketArchiveService, TicketService, TicketBulkService
+from .importer import SUPPORTED_FORMATS, detect_format
+from .tasks import import_tickets_job
+from helpdesk_system.cache import cache_response_data
+from helpdesk_system.conditional import ConditionalGetMixin
+from helpdesk_system.db_routers import ReplicaReadMixin
+from helpdesk_system.export import ExportMixin
+from helpdesk_system.read_models import ReadModelListMixin
+from helpdesk_system.sparse_fields import SparseFieldsetMixin
+from customers.services import CustomerService
 
 
-class TicketViewSet(viewsets.ModelViewSet):
+class TicketActivityPagination(CursorPagination):
+    """Keyset pages over TicketActivity, served by the (ticket_id, created_at) / (created_at) indexes"""
+    ordering = ('created_at', 'id')
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+
+
+def ticket_activity_response(request, view, ticket_id):
+    paginator = TicketActivityPagination()
+    page = paginator.paginate_queryset(TicketActivity.objects.filter(ticket_id=ticket_id), request, view=view)
+    return paginator.get_paginated_response(TicketActivitySerializer(page, many=True).data)
+
+
+class TicketViewSet(ReplicaReadMixin, ConditionalGetMixin, SparseFieldsetMixin, ReadModelListMixin, ExportMixin,
+                    viewsets.ModelViewSet):
     """
     ViewSet for Ticket CRUD operations
     Automatically filters by tenant schema
     """
     permission_classes = [IsAuthenticated, IsTenantMember]
     serializer_class = TicketSerializer
+    export_resource = 'tickets'
+    read_model = TICKET_LIST_READ_MODEL
+    replica_actions = ('list', 'overdue')
+    conditional_actions = ('retrieve',)
+    sparse_actions = ('list', 'retrieve', 'overdue')
+    # customer name/email are part of the representation
+    validator_fields = ('updated_at', 'customer__updated_at')
     
     def get_queryset(self):
         """
@@ -27,9 +66,7 @@ class TicketViewSet(viewsets.ModelViewSet):
         # Additional filtering based on user role
         if not (self.request.user.is_staff or getattr(self.request.user, 'is_manager', False)):
             # Regular users only see their assigned tickets or tickets they created
-            queryset = queryset.filter(
-                Q(assignee=self.request.user) | Q(customer__email=self.request.user.email)
-            )
+            queryset = queryset.filter(id__in=TicketService.visible_ticket_ids(self.request.user))
         
         # Filter by status if provided
         status_filter = self.request.query_params.get('status', None)
@@ -53,7 +90,11 @@ class TicketViewSet(viewsets.ModelViewSet):
                 Q(title__icontains=search) | Q(description__icontains=search)
             )
         
-        return queryset.select_related('customer', 'assignee', 'sla_policy')
+        # Joins and columns are narrowed to the serialized fields by SparseFieldsetMixin
+        return queryset
+    
+    def get_read_model_queryset(self, queryset):
+        return TicketService.annotate_is_overdue(queryset)
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -63,9 +104,10 @@ class TicketViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """Create ticket with automatic SLA calculation"""
         ticket = serializer.save()
-        # Ensure due_at is calculated
-        if not ticket.due_at:
-            ticket.due_at = TicketService.calculate_due_at(ticket)
+        # Ensure the SLA deadlines are calculated; save again only if one was actually filled in
+        deadlines = (ticket.due_at, ticket.response_due_at)
+        TicketService.set_sla_deadlines(ticket)
+        if (ticket.due_at, ticket.response_due_at) != deadlines:
             ticket.save()
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsAssigneeOrManager])
@@ -90,7 +132,7 @@ class TicketViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        TicketService.assign_ticket(ticket, assignee)
+        TicketService.assign_ticket(ticket, assignee, user=request.user)
         serializer = self.get_serializer(ticket)
         return Response(serializer.data)
     
@@ -124,15 +166,171 @@ class TicketViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(ticket)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Apply one operation (assign, status, priority, tags, close) to many tickets.
+        Each operation runs as a single set-based UPDATE.
+        """
+        serializer = TicketBulkActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        operation = data['operation']
+        ticket_ids = data['ids']
+        
+        if operation == 'close':
+            if not IsManager().has_permission(request, self):
+                return Response(
+                    {'code': 'PERMISSION_DENIED', 'message': 'Only managers can force close tickets'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            result = TicketBulkService.close(ticket_ids, request.user)
+        elif operation == 'assign':
+            assignee_id = data['assignee_id']
+            if assignee_id is not None:
+                from django.contrib.auth import get_user_model
+                if not get_user_model().objects.filter(pk=assignee_id).exists():
+                    return Response(
+                        {'code': 'NOT_FOUND', 'message': 'Assignee not found'},
+                        status=status.HTTP_404_NOT_FOUND
+                    )
+            result = TicketBulkService.assign(ticket_ids, assignee_id, request.user)
+        elif operation == 'status':
+            result = TicketBulkService.update_status(ticket_ids, data['status'], request.user)
+        elif operation == 'priority':
+            result = TicketBulkService.update_priority(ticket_ids, data['priority'], request.user)
+        else:
+            result = TicketBulkService.update_tags(ticket_ids, data['tags'], data['tag_mode'], request.user)
+        
+        return Response(result)
+    
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAuthenticated, IsManager])
+    def import_tickets(self, request):
+        """
+        Queue a bulk import of an uploaded CSV/JSONL file.
+        Poll import/{job_id}/ for progress.
+        """
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response(
+                {'code': 'VALIDATION_ERROR', 'message': 'file is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        fmt = request.data.get('format') or detect_format(upload.name)
+        if fmt not in SUPPORTED_FORMATS:
+            return Response(
+                {'code': 'VALIDATION_ERROR', 'message': f"format must be one of {', '.join(SUPPORTED_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        file_path = default_storage.save(f'imports/{uuid.uuid4().hex}.{fmt}', upload)
+        # Job ids are global; the owning schema is in the meta from the start so import_status can check it
+        job_id = str(uuid.uuid4())
+        import_tickets_job.backend.store_result(job_id, {'schema_name': connection.schema_name}, 'PENDING')
+        import_tickets_job.apply_async((file_path, connection.schema_name, fmt), task_id=job_id)
+        return Response({'job_id': job_id, 'status': 'PENDING'}, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=False, methods=['get'], url_path=r'import/(?P<job_id>[^/.]+)',
+            permission_classes=[IsAuthenticated, IsManager])
+    def import_status(self, request, job_id=None):
+        """Report the state and progress of an import job queued by this tenant"""
+        job = AsyncResult(job_id)
+        progress = job.info if isinstance(job.info, dict) else {}
+        if progress.get('schema_name') != request.tenant.schema_name:
+            # Unknown, expired or another tenant's job
+            return Response(
+                {'code': 'NOT_FOUND', 'message': 'Import job not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        progress = {key: value for key, value in progress.items() if key != 'schema_name'}
+        return Response({'job_id': job_id, 'status': job.state, **progress})
+    
+    @action(detail=True, methods=['get'])
+    def activity(self, request, pk=None):
+        """Change history of the ticket, oldest first, cursor-paginated"""
+        return ticket_activity_response(request, self, self.get_object().pk)
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsManager])
+    def workload(self, request):
+        """Open tickets per agent as seen by auto-assignment, least loaded first"""
+        enabled = AgentWorkloadService.enabled()
+        loads = AgentWorkloadService.current_loads() if enabled else {}
+        return Response({
+            'auto_assign': enabled,
+            'capacity': AgentWorkloadService.capacity(),
+            'agents': [{'agent_id': agent_id, 'open_tickets': count} for agent_id, count in loads.items()],
+        })
+    
     @action(detail=False, methods=['get'])
     def overdue(self, request):
         """Get all overdue tickets"""
-        queryset = self.get_queryset()
-        overdue_tickets = [ticket for ticket in queryset if TicketService.check_sla_breach(ticket)]
+        overdue_tickets = self.filter_queryset(self.get_queryset()).filter(TicketService.overdue_q())
         serializer = self.get_serializer(overdue_tickets, many=True)
         return Response(serializer.data)
 
 
+class ArchivedTicketViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only access to tickets moved to tickets_archive
+    Kept apart from TicketViewSet so the hot ticket queries never touch the archive
+    """
+    permission_classes = [IsAuthenticated, IsTenantMember]
+    serializer_class = ArchivedTicketSerializer
+    replica_actions = ('list', 'retrieve')
+    
+    def get_queryset(self):
+        queryset = ArchivedTicket.objects.select_related('customer', 'assignee')
+        user = self.request.user
+        if not (user.is_staff or getattr(user, 'is_manager', False)):
+            visible = Q(assignee=user)
+            customer_id = CustomerService.get_id_for_user(user)
+            if customer_id is not None:
+                visible |= Q(customer_id=customer_id)
+            queryset = queryset.filter(visible)
+        
+        for param in ('status', 'priority'):
+            value = self.request.query_params.get(param)
+            if value:
+                queryset = queryset.filter(**{param: value})
+        customer_filter = self.request.query_params.get('customer')
+        if customer_filter:
+            queryset = queryset.filter(customer_id=customer_filter)
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = queryset.filter(Q(title__icontains=search) | Q(description__icontains=search))
+        return queryset
+    
+    @action(detail=True, methods=['get'])
+    def activity(self, request, pk=None):
+        """Change history of the archived ticket"""
+        return ticket_activity_response(request, self, self.get_object().pk)
+    
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsManager])
+    def restore(self, request, pk=None):
+        """Move the ticket back to the live tickets table"""
+        ticket = self.get_object()
+        TicketArchiveService.restore([ticket.pk])
+        return Response(TicketSerializer(Ticket.objects.get(pk=ticket.pk)).data)
+
+
+class TicketActivityViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    The tenant's whole activity log in created_at order, for streaming
+    consumers and analytics (Manager only). Follow `next` to keep reading.
+    """
+    permission_classes = [IsAuthenticated, IsManager]
+    serializer_class = TicketActivitySerializer
+    pagination_class = TicketActivityPagination
+    
+    def get_queryset(self):
+        queryset = TicketActivity.objects.all()
+        event = self.request.query_params.get('event')
+        if event:
+            queryset = queryset.filter(event=event)
+        return queryset
+
+
 class SLAPolicyViewSet(viewsets.ModelViewSet):
     """
     ViewSet for SLA Policy CRUD operations
@@ -147,3 +345,7 @@ class SLAPolicyViewSet(viewsets.ModelViewSet):
         if self.request.query_params.get('active_only') == 'true':
             queryset = queryset.filter(is_active=True)
         return queryset
+    
+    @cache_response_data(models=(SLAPolicy,), per_user=False)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)